@@ -8,63 +8,6 @@ def _jwt_error_response(message, status=401):
     return jsonify({"error": message}), status
 
 
-def _apply_sqlite_compat_migrations(app):
-    # hack: sqlite db from week 1 missing new columns - alter table by hand
-    uri = app.config.get("SQLALCHEMY_DATABASE_URI", "")
-    if not str(uri).startswith("sqlite"):
-        return
-
-    desired = {
-        "brains": {
-            "seed_nodes_created": "BOOLEAN NOT NULL DEFAULT 0",
-        },
-        "nodes": {
-            "markdown_content": "TEXT",
-            "tags": "JSON",
-            "node_type": "VARCHAR(32)",
-            "updated_at": "DATETIME",
-        },
-        "calendar_events": {
-            "course_label": "VARCHAR(128)",
-            "confidence": "FLOAT",
-            "notes": "TEXT",
-            "updated_at": "DATETIME",
-        },
-    }
-
-    with db.engine.begin() as conn:
-        conn.exec_driver_sql(
-            """
-            CREATE TABLE IF NOT EXISTS calendar_events (
-                id INTEGER PRIMARY KEY,
-                brain_id VARCHAR(64) NOT NULL,
-                source_file_id INTEGER,
-                title VARCHAR(512) NOT NULL,
-                event_type VARCHAR(32) NOT NULL DEFAULT 'other',
-                due_at DATETIME NOT NULL,
-                course_label VARCHAR(128),
-                confidence FLOAT,
-                notes TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(brain_id) REFERENCES brains(id),
-                FOREIGN KEY(source_file_id) REFERENCES source_files(id)
-            )
-            """
-        )
-        for table, cols in desired.items():
-            existing = {
-                row[1]
-                for row in conn.exec_driver_sql(f"PRAGMA table_info({table})").fetchall()
-            }
-            for col_name, col_def in cols.items():
-                if col_name in existing:
-                    continue
-                conn.exec_driver_sql(
-                    f"ALTER TABLE {table} ADD COLUMN {col_name} {col_def}"
-                )
-
-
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
@@ -90,31 +33,41 @@ def create_app(config_class=Config):
     cors.init_app(
         app,
         origins=_dev_origins,
-        allow_headers=["Content-Type", "Authorization"],
+        allow_headers=["Content-Type", "Authorization", "Content-Range", "X-Chunk-SHA256"],
+        expose_headers=["X-TTS-Clip-Url"],
         supports_credentials=True,
     )
 
-    from app.routes import auth, home, google_auth, brain
+    from app.routes import auth, home, google_auth, brain, metrics, uploads, usage
     app.register_blueprint(auth.bp, url_prefix="/api")
     app.register_blueprint(home.bp, url_prefix="/api")
     app.register_blueprint(google_auth.bp, url_prefix="/api/auth")
     app.register_blueprint(brain.bp, url_prefix="/api")
+    app.register_blueprint(usage.bp, url_prefix="/api")
+    app.register_blueprint(uploads.bp, url_prefix="/api")
+    app.register_blueprint(metrics.bp)
+
+    from app.services import change_versions, note_stats, request_profiling, tts_cache, usage_ledger, warmup
+    request_profiling.init_app(app)
+    usage_ledger.init_app(app)
+    change_versions.init_app(app)
+    note_stats.init_app(app)
+    tts_cache.init_app(app)
 
     with app.app_context():
-        try:
-            db.create_all()
-            _apply_sqlite_compat_migrations(app)
-            uri = app.config.get("SQLALCHEMY_DATABASE_URI", "")
-            if "sqlite" in str(uri).lower():
-                from sqlalchemy import event
-                @event.listens_for(db.engine, "connect")
-                def _set_sqlite_pragma(dbapi_conn, connection_record):
-                    cursor = dbapi_conn.cursor()
-                    cursor.execute("PRAGMA journal_mode=WAL")
-                    cursor.execute("PRAGMA busy_timeout=30000")
-                    cursor.close()
-        except Exception as e:
-            if "already exists" not in str(e).lower():
-                raise
+        uri = app.config.get("SQLALCHEMY_DATABASE_URI", "")
+        if "sqlite" in str(uri).lower():
+            # before the first connection, so migrations also wait on busy_timeout instead of failing
+            from sqlalchemy import event
+            @event.listens_for(db.engine, "connect")
+            def _set_sqlite_pragma(dbapi_conn, connection_record):
+                cursor = dbapi_conn.cursor()
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA busy_timeout=30000")
+                cursor.close()
+        # one-row version check when the schema is current (app/migrations.py)
+        from app import migrations
+        migrations.upgrade()
 
+    warmup.init_app(app)
     return app
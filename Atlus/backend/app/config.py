@@ -20,3 +20,57 @@ class Config:
     GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_CLIENT_ID", "")
     # Handwritten scans: saved under backend/<UPLOAD_FOLDER>/<brain_id>/
     UPLOAD_FOLDER = os.environ.get("ATLUS_UPLOAD_FOLDER", "uploads")
+    # Resumable uploads (/api/uploads): largest file, and hours an unfinished session is kept.
+    UPLOAD_MAX_MB = int(os.environ.get("ATLUS_UPLOAD_MAX_MB", 1024))
+    UPLOAD_SESSION_HOURS = float(os.environ.get("ATLUS_UPLOAD_SESSION_HOURS", 24))
+    # Rows per executemany when ingest / syllabus uploads write nodes and calendar events in bulk.
+    BULK_INSERT_BATCH_SIZE = int(os.environ.get("ATLUS_BULK_INSERT_BATCH_SIZE", 500))
+    # Long ingests commit nodes every N chunks so partial results show up while the LLM works.
+    INGEST_COMMIT_BATCH = int(os.environ.get("ATLUS_INGEST_COMMIT_BATCH", 16))
+    # A running ingestion job with no checkpoint for this long is treated as crashed and can be resumed.
+    INGEST_STALE_SECONDS = int(os.environ.get("ATLUS_INGEST_STALE_SECONDS", 600))
+    # Files from one multi-file upload processed side by side, and worker processes for PDF/DOCX/PPTX
+    # text extraction (0 = extract in the request's own process).
+    INGEST_FILE_WORKERS = int(os.environ.get("ATLUS_INGEST_FILE_WORKERS", 4))
+    INGEST_EXTRACT_PROCESSES = int(os.environ.get("ATLUS_INGEST_EXTRACT_PROCESSES", min(4, os.cpu_count() or 1)))
+    # Uploads / resumes that finish after their response (non-SQLite databases) run this many at a time per process.
+    INGEST_BACKGROUND_THREADS = int(os.environ.get("ATLUS_INGEST_BACKGROUND_THREADS", 4))
+    # Chunk -> LLM metadata calls in flight at once, shared by every upload in the process.
+    LLM_CONCURRENCY = int(os.environ.get("ATLUS_LLM_CONCURRENCY", 4))
+    # Syllabus uploads: one JSON call for markdown + profile + deadlines instead of three parallel ones.
+    SYLLABUS_COMBINED_CALL = os.environ.get("ATLUS_SYLLABUS_COMBINED", "").strip().lower() in ("1", "true", "yes")
+    # Rule-parser confidence (0-1) at which syllabus deadlines / profile skip the model; above 1 = always ask it.
+    SYLLABUS_RULES_CONFIDENCE = float(os.environ.get("ATLUS_SYLLABUS_RULES_CONFIDENCE", 0.75))
+    # Read-aloud: longest text /audio/tts accepts, and how many sentence segments synthesize at once per request.
+    TTS_MAX_CHARS = int(os.environ.get("ATLUS_TTS_MAX_CHARS", 60000))
+    TTS_CONCURRENCY = int(os.environ.get("ATLUS_TTS_CONCURRENCY", 4))
+    # Synthesized segments kept on disk for replays (default <instance>/tts_cache); 0 MB = no cache.
+    TTS_CACHE_DIR = os.environ.get("ATLUS_TTS_CACHE_DIR", "")
+    TTS_CACHE_MB = float(os.environ.get("ATLUS_TTS_CACHE_MB", 512))
+    # Lifetime of the signed replay URL /audio/tts hands back (X-TTS-Clip-Url).
+    TTS_CLIP_URL_SECONDS = int(os.environ.get("ATLUS_TTS_CLIP_URL_SECONDS", 3600))
+    # Lecture recordings: largest upload, seconds per Whisper piece (cut at a pause near this), pieces in flight.
+    TRANSCRIBE_MAX_MB = int(os.environ.get("ATLUS_TRANSCRIBE_MAX_MB", 500))
+    TRANSCRIBE_SEGMENT_SECONDS = int(os.environ.get("ATLUS_TRANSCRIBE_SEGMENT_SECONDS", 600))
+    TRANSCRIBE_CONCURRENCY = int(os.environ.get("ATLUS_TRANSCRIBE_CONCURRENCY", 4))
+    # Heavy SDK imports (openai, PDF/Office parsers, ...) after boot: background | sync | off; easyocr/torch too if set.
+    WARMUP = os.environ.get("ATLUS_WARMUP", "background")
+    WARMUP_EASYOCR = os.environ.get("ATLUS_WARMUP_EASYOCR", "").strip().lower() in ("1", "true", "yes")
+    # Bearer token Prometheus sends to GET /metrics; when unset only localhost may scrape.
+    METRICS_TOKEN = os.environ.get("ATLUS_METRICS_TOKEN", "")
+    # Request / SQL logging thresholds: any statement over SLOW_QUERY_MS; requests over SLOW_REQUEST_MS,
+    # with REQUEST_QUERY_WARN+ queries, or repeating one statement REQUEST_REPEAT_WARN+ times (N+1).
+    SLOW_QUERY_MS = float(os.environ.get("ATLUS_SLOW_QUERY_MS", 200))
+    SLOW_REQUEST_MS = float(os.environ.get("ATLUS_SLOW_REQUEST_MS", 1000))
+    REQUEST_QUERY_WARN = int(os.environ.get("ATLUS_REQUEST_QUERY_WARN", 50))
+    REQUEST_REPEAT_WARN = int(os.environ.get("ATLUS_REQUEST_REPEAT_WARN", 10))
+    # Browser cache lifetime (seconds) for /sources/<id>/file and its ?variant= previews; revalidated by ETag after.
+    PREVIEW_MAX_AGE = int(os.environ.get("ATLUS_PREVIEW_MAX_AGE", 3600))
+    # ETag / 304 on the polled JSON reads (brain list, notes, classes, calendar, home summary).
+    HTTP_ETAGS = os.environ.get("ATLUS_HTTP_ETAGS", "1").strip().lower() not in ("0", "false", "no")
+    # llm_usage ledger: buffered rows are written every USAGE_FLUSH_SECONDS; /api/usage rollups are
+    # cached USAGE_ROLLUP_TTL seconds (0 = always query).
+    USAGE_FLUSH_SECONDS = float(os.environ.get("ATLUS_USAGE_FLUSH_SECONDS", 2))
+    USAGE_ROLLUP_TTL = float(os.environ.get("ATLUS_USAGE_ROLLUP_TTL", 60))
+    # Dev only: GET /api/debug/profile?seconds=5 (admin) returns sampled stacks of every thread.
+    PROFILER_ENABLED = os.environ.get("ATLUS_PROFILER_ENABLED", "").strip().lower() in ("1", "true", "yes")
@@ -0,0 +1,253 @@
+"""Versioned schema migrations: a one-row schema_version table records which STEPS a database has had.
+
+create_app() calls upgrade(). On an up-to-date database that is a single SELECT of one row, with no
+table introspection. Otherwise the pending steps run in order, one transaction each, under a lock,
+so several workers booting at once apply each step exactly once:
+
+    SQLite    each step's transaction opens with an UPDATE of the version row, which takes the
+              database write lock; a second worker waits there (busy_timeout) and then sees the
+              new version
+    Postgres  pg_advisory_lock held for the whole run
+
+Steps must be safe against a database that already has what they add. Step 1 builds missing
+tables from the current models, so on a fresh database the columns and indexes declared on the
+models exist before later steps run. add_column() and create_index() check first.
+
+"online" steps run outside a transaction on Postgres, so create_index() can use CREATE INDEX
+CONCURRENTLY and writes keep going while the index builds. SQLite has no online index build; at
+this app's sizes the write lock is held for well under a second.
+
+Adding a migration: declare the column / index on the model as well, and append a Step with the
+next version number. Never renumber or edit a step that has shipped.
+"""
+import logging
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from app.extensions import db
+
+log = logging.getLogger(__name__)
+
+VERSION_TABLE = "schema_version"
+_PG_LOCK_KEY = 4910491  # any constant; only this runner takes it
+
+
+@dataclass(frozen=True)
+class Step:
+    version: int
+    name: str
+    apply: Callable[[Connection], None]
+    online: bool = False  # Postgres: run outside a transaction (CREATE INDEX CONCURRENTLY)
+
+
+def _is_pg(conn) -> bool:
+    return conn.dialect.name == "postgresql"
+
+
+def add_column(conn: Connection, table: str, column: str, ddl: str) -> None:
+    if column not in {c["name"] for c in inspect(conn).get_columns(table)}:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {ddl}"))
+
+
+def create_index(conn: Connection, name: str, table: str, columns: str, using: Optional[str] = None) -> None:
+    """CREATE INDEX IF NOT EXISTS; CONCURRENTLY on Postgres, so call it from online steps only."""
+    if _is_pg(conn):
+        # a CONCURRENTLY build that died halfway leaves an invalid index that IF NOT EXISTS would keep
+        invalid = conn.execute(
+            text(
+                "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid"
+                " WHERE c.relname = :name AND NOT i.indisvalid"
+            ),
+            {"name": name},
+        ).first()
+        if invalid:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY {name}"))
+        method = f" USING {using}" if using else ""
+        conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table}{method} ({columns})"))
+    else:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+# SQLite databases from before these columns were on the models (create_all never alters a table)
+_LEGACY_SQLITE_COLUMNS = {
+    "brains": {
+        "seed_nodes_created": "BOOLEAN NOT NULL DEFAULT 0",
+    },
+    "nodes": {
+        "markdown_content": "TEXT",
+        "tags": "JSON",
+        "node_type": "VARCHAR(32)",
+        "updated_at": "DATETIME",
+    },
+    "calendar_events": {
+        "course_label": "VARCHAR(128)",
+        "confidence": "FLOAT",
+        "notes": "TEXT",
+        "updated_at": "DATETIME",
+    },
+    "ingestion_jobs": {
+        "timings": "JSON",
+    },
+}
+
+
+def _baseline(conn: Connection) -> None:
+    from app import models  # noqa: F401 - every table on db.metadata
+
+    db.metadata.create_all(conn)  # checkfirst: only the tables that are missing
+    if conn.dialect.name == "sqlite":
+        for table, cols in _LEGACY_SQLITE_COLUMNS.items():
+            for column, ddl in cols.items():
+                add_column(conn, table, column, ddl)
+
+
+def _composite_indexes(conn: Connection) -> None:
+    # sidebar + all-notes gallery: one brain's notes newest first, and its notes of some types
+    create_index(conn, "ix_nodes_brain_updated", "nodes", "brain_id, updated_at")
+    create_index(conn, "ix_nodes_brain_type", "nodes", "brain_id, node_type")
+    # calendar reads are "these brains, this date range"
+    create_index(conn, "ix_calendar_events_brain_due", "calendar_events", "brain_id, due_at")
+    # every sidebar load asks for a brain's pending / running uploads
+    create_index(conn, "ix_ingestion_jobs_brain_status", "ingestion_jobs", "brain_id, status")
+
+
+# Postgres: services/note_search.py queries this exact expression, so the planner uses the index
+PG_NOTE_TSVECTOR = (
+    "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(summary, '') || ' ' || coalesce(markdown_content, ''))"
+)
+
+_SQLITE_NOTE_FTS = (
+    # external content: the text stays in nodes, nodes_fts holds only the index. Keyed by the
+    # implicit rowid, which VACUUM may renumber - run rebuild_note_fts() after one.
+    "CREATE VIRTUAL TABLE IF NOT EXISTS nodes_fts USING fts5("
+    "title, summary, markdown_content, content='nodes', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS nodes_fts_ai AFTER INSERT ON nodes BEGIN"
+    " INSERT INTO nodes_fts (rowid, title, summary, markdown_content)"
+    " VALUES (new.rowid, new.title, new.summary, new.markdown_content); END",
+    "CREATE TRIGGER IF NOT EXISTS nodes_fts_ad AFTER DELETE ON nodes BEGIN"
+    " INSERT INTO nodes_fts (nodes_fts, rowid, title, summary, markdown_content)"
+    " VALUES ('delete', old.rowid, old.title, old.summary, old.markdown_content); END",
+    "CREATE TRIGGER IF NOT EXISTS nodes_fts_au AFTER UPDATE OF title, summary, markdown_content ON nodes BEGIN"
+    " INSERT INTO nodes_fts (nodes_fts, rowid, title, summary, markdown_content)"
+    " VALUES ('delete', old.rowid, old.title, old.summary, old.markdown_content);"
+    " INSERT INTO nodes_fts (rowid, title, summary, markdown_content)"
+    " VALUES (new.rowid, new.title, new.summary, new.markdown_content); END",
+)
+
+
+def rebuild_note_fts(conn: Connection) -> None:
+    if conn.dialect.name == "sqlite":
+        conn.execute(text("INSERT INTO nodes_fts (nodes_fts) VALUES ('rebuild')"))
+
+
+def _note_fts(conn: Connection) -> None:
+    if _is_pg(conn):
+        create_index(conn, "ix_nodes_fts", "nodes", PG_NOTE_TSVECTOR, using="gin")
+        return
+    if conn.dialect.name != "sqlite":
+        return
+    try:
+        conn.execute(text(_SQLITE_NOTE_FTS[0]))
+    except OperationalError as e:
+        # SQLite built without FTS5: search keeps using ILIKE
+        log.warning("note full-text index skipped: %s", e)
+        return
+    for ddl in _SQLITE_NOTE_FTS[1:]:
+        conn.execute(text(ddl))
+    rebuild_note_fts(conn)
+
+
+def _lecture_note_stats(conn: Connection) -> None:
+    # "lecture" (transcribed recordings) joined note_stats.NOTE_TYPES; recount the brains that have them
+    from app.services import note_stats
+
+    brain_ids = [r[0] for r in conn.execute(text("SELECT DISTINCT brain_id FROM nodes WHERE node_type = 'lecture'"))]
+    note_stats.rebuild_brains(conn, brain_ids)
+
+
+STEPS = (
+    Step(1, "baseline tables + legacy SQLite columns", _baseline),
+    Step(2, "composite node / event / job indexes", _composite_indexes, online=True),
+    Step(3, "note full-text search", _note_fts, online=True),
+    Step(4, "count lecture transcripts as notes", _lecture_note_stats),
+)
+
+
+def head() -> int:
+    return STEPS[-1].version
+
+
+def _read_version(conn: Connection) -> Optional[int]:
+    """The recorded version; None when the table isn't there yet."""
+    try:
+        row = conn.execute(text(f"SELECT version FROM {VERSION_TABLE} WHERE id = 1")).first()
+    except (OperationalError, ProgrammingError):
+        conn.rollback()  # Postgres won't run anything else in a failed transaction
+        return None
+    return row[0] if row else 0
+
+
+def _ensure_version_table(engine: Engine) -> None:
+    with engine.begin() as conn:
+        conn.execute(
+            text(f"CREATE TABLE IF NOT EXISTS {VERSION_TABLE} (id INTEGER PRIMARY KEY, version INTEGER NOT NULL, updated_at TIMESTAMP)")
+        )
+        conn.execute(
+            text(f"INSERT INTO {VERSION_TABLE} (id, version) SELECT 1, 0 WHERE NOT EXISTS (SELECT 1 FROM {VERSION_TABLE} WHERE id = 1)")
+        )
+
+
+def _apply(step: Step, conn: Connection) -> None:
+    started = time.perf_counter()
+    step.apply(conn)
+    conn.execute(
+        text(f"UPDATE {VERSION_TABLE} SET version = :v, updated_at = CURRENT_TIMESTAMP WHERE id = 1"),
+        {"v": step.version},
+    )
+    log.info("schema migration %d (%s) applied in %.2fs", step.version, step.name, time.perf_counter() - started)
+
+
+def _run_pending(engine: Engine) -> int:
+    pg = engine.dialect.name == "postgresql"
+    with engine.connect() as lock:
+        if pg:
+            # session-level: held across the step transactions below, released when `lock` closes
+            lock.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _PG_LOCK_KEY})
+            lock.commit()
+        _ensure_version_table(engine)
+        while True:
+            with engine.begin() as conn:
+                # SQLite: this write takes the database lock until the step commits
+                conn.execute(text(f"UPDATE {VERSION_TABLE} SET version = version WHERE id = 1"))
+                version = _read_version(conn)
+                step = next((s for s in STEPS if s.version > version), None)
+                if step is None:
+                    return version
+                if not (pg and step.online):
+                    _apply(step, conn)
+                    continue
+            # Postgres online step: autocommit, under the advisory lock only
+            with engine.connect() as conn:
+                _apply(step, conn.execution_options(isolation_level="AUTOCOMMIT"))
+
+
+def upgrade() -> int:
+    """Bring the app's database to head(); returns the version it is at. Needs an app context."""
+    engine = db.engine
+    with engine.connect() as conn:
+        version = _read_version(conn)
+    if version is not None and version >= head():
+        if version > head():
+            log.warning("database schema is at version %d, newer than this code's %d", version, head())
+        return version
+    return _run_pending(engine)
+
+
+def current() -> Optional[int]:
+    with db.engine.connect() as conn:
+        return _read_version(conn)
@@ -1,2 +1,5 @@
 from app.models.user import User
-from app.models.brain import Brain, Node, SourceFile, CalendarEvent, CourseProfile
+from app.models.brain import Brain, Node, SourceFile, CalendarEvent, CourseProfile, IngestionJob
+from app.models.usage import LlmUsage
+from app.models.version import DataVersion
+from app.models.stats import BrainNoteStats
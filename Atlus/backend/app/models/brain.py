@@ -17,6 +17,7 @@ class Brain(db.Model):
     source_files = db.relationship("SourceFile", backref="brain", lazy="dynamic", cascade="all, delete-orphan")
     calendar_events = db.relationship("CalendarEvent", backref="brain", lazy="dynamic", cascade="all, delete-orphan")
     class_profile = db.relationship("CourseProfile", backref="brain", uselist=False, cascade="all, delete-orphan")
+    ingestion_jobs = db.relationship("IngestionJob", backref="brain", lazy="dynamic", cascade="all, delete-orphan")
 
 
 class SourceFile(db.Model):
@@ -56,6 +57,9 @@ class CalendarEvent(db.Model):
     created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
     updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), onupdate=db.func.now())
 
+    # calendar reads are always "these brains, this date range"
+    __table_args__ = (db.Index("ix_calendar_events_brain_due", "brain_id", "due_at"),)
+
 
 class CourseProfile(db.Model):
     """professor / room / meeting times from form"""
@@ -97,6 +101,35 @@ class Node(db.Model):
     updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), onupdate=db.func.now())
     related_node_ids = db.Column(db.JSON, nullable=True)  # was gonna use links - not really
 
+    # sidebar + all-notes gallery: one brain's notes newest first / of some types (migration 2)
+    __table_args__ = (
+        db.Index("ix_nodes_brain_updated", "brain_id", "updated_at"),
+        db.Index("ix_nodes_brain_type", "brain_id", "node_type"),
+    )
+
+
+class IngestionJob(db.Model):
+    """checkpoint for one uploaded doc - how many chunks made it into nodes so far"""
+    __tablename__ = "ingestion_jobs"
+
+    id = db.Column(db.String(64), primary_key=True)
+    brain_id = db.Column(db.String(64), db.ForeignKey("brains.id"), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    source_file_id = db.Column(db.Integer, db.ForeignKey("source_files.id"), nullable=True, index=True)
+    filename = db.Column(db.String(512), nullable=False)
+    status = db.Column(db.String(16), nullable=False, default="pending", index=True)  # pending running done failed
+    total_chunks = db.Column(db.Integer, nullable=False, default=0)
+    done_chunks = db.Column(db.Integer, nullable=False, default=0)
+    nodes_created = db.Column(db.Integer, nullable=False, default=0)
+    text_path = db.Column(db.String(1024), nullable=True)  # extracted text under uploads/, kept until done
+    error = db.Column(db.Text, nullable=True)
+    timings = db.Column(db.JSON, nullable=True)  # {stage: {count, total_ms, max_ms}, wall_ms} summed over attempts
+    created_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), server_default=db.func.now(), onupdate=db.func.now())
+
+    # sidebar polls a brain's pending / running jobs on every load
+    __table_args__ = (db.Index("ix_ingestion_jobs_brain_status", "brain_id", "status"),)
+
 
 class BrainShareLink(db.Model):
     """share url token"""
@@ -0,0 +1,12 @@
+from app.extensions import db
+
+
+class BrainNoteStats(db.Model):
+    """home-screen numbers for one brain, kept up to date on every node write (see services/note_stats)"""
+    __tablename__ = "brain_note_stats"
+
+    # no FK - the row is dropped in the same flush as the brain, after it
+    brain_id = db.Column(db.String(64), primary_key=True)
+    note_count = db.Column(db.Integer, nullable=False, default=0)
+    # newest notes first, capped: [{id, title, updated_at, created_at}, ...]
+    recent = db.Column(db.JSON, nullable=False, default=list)
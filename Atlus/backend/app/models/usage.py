@@ -0,0 +1,27 @@
+from app.extensions import db
+
+
+class LlmUsage(db.Model):
+    """one billed OpenAI call (each retry / hedge attempt that came back counts)"""
+    __tablename__ = "llm_usage"
+
+    id = db.Column(db.Integer, primary_key=True)
+    created_at = db.Column(db.DateTime(timezone=True), nullable=False, index=True)
+    # no FKs on purpose - the spend is still real after a brain / user is deleted
+    user_id = db.Column(db.Integer, nullable=True)
+    brain_id = db.Column(db.String(64), nullable=True)
+    feature = db.Column(db.String(64), nullable=False, default="other")  # route / job that asked, e.g. brain.ask_brain_route, ingest
+    operation = db.Column(db.String(64), nullable=False, default="chat")  # openai_service helper, e.g. node_gen, ask:summary
+    model = db.Column(db.String(64), nullable=False)
+    prompt_tokens = db.Column(db.Integer, nullable=False, default=0)
+    cached_tokens = db.Column(db.Integer, nullable=False, default=0)  # prompt tokens served from OpenAI's prompt cache
+    completion_tokens = db.Column(db.Integer, nullable=False, default=0)
+    tts_chars = db.Column(db.Integer, nullable=False, default=0)
+    audio_seconds = db.Column(db.Float, nullable=False, default=0)
+    cost_usd = db.Column(db.Float, nullable=False, default=0)
+    latency_ms = db.Column(db.Float, nullable=True)
+
+    __table_args__ = (
+        db.Index("ix_llm_usage_user_created", "user_id", "created_at"),
+        db.Index("ix_llm_usage_brain_created", "brain_id", "created_at"),
+    )
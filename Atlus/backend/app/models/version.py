@@ -0,0 +1,9 @@
+from app.extensions import db
+
+
+class DataVersion(db.Model):
+    """write counter per scope ("brain:<id>", "user:<id>") - GET endpoints hash these into their ETag"""
+    __tablename__ = "data_versions"
+
+    scope = db.Column(db.String(96), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
@@ -4,7 +4,6 @@ import mimetypes
 import os
 import re
 import uuid
-import threading
 from datetime import datetime, timezone, timedelta
 from zoneinfo import ZoneInfo
 from io import BytesIO
@@ -22,10 +21,14 @@ from app.models.brain import (
     BrainShareLink,
     CalendarEvent,
     CourseProfile,
+    IngestionJob,
     Node,
     SourceFile,
 )
 from app.models.user import User
+from app.services import background_jobs
+from app.services.calendar_events import event_to_json as _event_to_json
+from app.services.note_stats import NOTE_TYPES
 
 bp = Blueprint("brain", __name__)
 
@@ -48,7 +51,7 @@ def _classes_assistant_notes_section(brain_map: dict, brain_ids: list, *, max_ch
         Node.query.filter(Node.brain_id.in_(brain_ids))
         .filter(
             or_(
-                Node.node_type.in_(("note", "handwritten", "textbook_section")),
+                Node.node_type.in_(NOTE_TYPES),
                 Node.node_type.is_(None),
             )
         )
@@ -119,6 +122,25 @@ def _upload_root():
     return Path(current_app.root_path).parent / current_app.config.get("UPLOAD_FOLDER", "uploads")
 
 
+def _claimed_uploads(user_id: int) -> list:
+    # finalized resumable uploads (routes/uploads.py) named by upload_ids: form field "a,b" or json list
+    from app.services import upload_sessions
+
+    if request.is_json:
+        raw = (request.get_json(silent=True) or {}).get("upload_ids") or []
+    else:
+        raw = request.form.get("upload_ids") or ""
+    ids = raw if isinstance(raw, list) else raw.split(",")
+    return [upload_sessions.claim(str(i).strip(), user_id) for i in ids if str(i).strip()]
+
+
+def _discard_uploads(stored: list) -> None:
+    from app.services import upload_sessions
+
+    for s in stored:
+        upload_sessions.discard(s.upload_id)
+
+
 def _persist_upload_bytes(brain_id: str, filename: str, data: bytes) -> str:
     # dumps bytes into uploads/{id}/whatever
     upload_root = _upload_root()
@@ -133,22 +155,6 @@ def _persist_upload_bytes(brain_id: str, filename: str, data: bytes) -> str:
     return str(Path(brain_id) / stored)
 
 
-def _event_to_json(e: CalendarEvent):
-    return {
-        "id": e.id,
-        "brain_id": e.brain_id,
-        "source_file_id": e.source_file_id,
-        "title": e.title,
-        "event_type": e.event_type,
-        "due_at": e.due_at.isoformat() if e.due_at else None,
-        "course_label": e.course_label,
-        "confidence": e.confidence,
-        "notes": e.notes,
-        "created_at": e.created_at.isoformat() if e.created_at else None,
-        "updated_at": e.updated_at.isoformat() if e.updated_at else None,
-    }
-
-
 def _profile_to_json(profile: CourseProfile | None):
     if not profile:
         return None
@@ -211,20 +217,6 @@ def _extract_syllabus_sections(text: str):
     return sections
 
 
-def _syllabus_node_markdown(text: str):
-    # tries openai prettify then gives up and uses raw text
-    source = (text or "").strip()
-    if not source:
-        return ""
-    try:
-        from app.services.openai_service import format_syllabus_markdown
-
-        formatted = (format_syllabus_markdown(source) or "").strip()
-        return formatted or source
-    except Exception:
-        return source
-
-
 def _upsert_course_profile(brain_id: str, data: dict):
     profile = CourseProfile.query.filter_by(brain_id=brain_id).first()
     if not profile:
@@ -256,6 +248,33 @@ def _parse_datetime_value(value):
     return dt.astimezone(timezone.utc)
 
 
+def _bulk_save_calendar_events(brain_id: str, source_file_id: int, extracted: list, fallback_course=None):
+    # one executemany instead of session.add per event, then read the rows back for the response
+    from app.services.bulk_insert import bulk_insert_rows
+
+    rows = [
+        {
+            "brain_id": brain_id,
+            "source_file_id": source_file_id,
+            "title": item.get("title") or "Untitled event",
+            "event_type": (item.get("event_type") or "other").lower(),
+            "due_at": item.get("due_at"),
+            "course_label": item.get("course_label") or fallback_course,
+            "confidence": item.get("confidence"),
+            "notes": item.get("notes"),
+        }
+        for item in extracted
+    ]
+    if not rows:
+        return []
+    bulk_insert_rows(CalendarEvent, rows)
+    return (
+        CalendarEvent.query.filter_by(brain_id=brain_id, source_file_id=source_file_id)
+        .order_by(CalendarEvent.id.asc())
+        .all()
+    )
+
+
 # new workspace - json or multipart. sqlite cant really thread file ingest so sometimes its sync
 @bp.route("/brain/create", methods=["POST"])
 @jwt_required()
@@ -264,6 +283,13 @@ def create_brain():
     if not user:
         return jsonify({"error": "user not found"}), 404
 
+    from app.services.upload_sessions import UploadError
+
+    try:
+        stored = _claimed_uploads(user.id)
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status
+
     # json vs form upload
     if request.is_json:
         data = request.get_json() or {}
@@ -286,10 +312,10 @@ def create_brain():
     except Exception:
         pass
 
-    # read files now bc after we return the stream is gone
-    if files:
+    # read files now bc after we return the stream is gone (resumable uploads are already on disk)
+    if files or stored:
         import io
-        file_payloads = []
+        file_payloads = list(stored)
         for f in files:
             if not f or not getattr(f, "filename", None):
                 continue
@@ -314,6 +340,8 @@ def create_brain():
                     process_creation_files(brain_id_copy, user_id_copy, file_payloads)
                 except Exception:
                     db.session.rollback()
+                finally:
+                    _discard_uploads(stored)
             else:
                 app = current_app._get_current_object()
 
@@ -324,8 +352,10 @@ def create_brain():
                             process_creation_files(brain_id_copy, user_id_copy, file_payloads)
                         except Exception:
                             pass
+                        finally:
+                            _discard_uploads(stored)
 
-                threading.Thread(target=ingest_in_background, daemon=True).start()
+                background_jobs.submit(ingest_in_background)
 
     return jsonify({
         "brain": {
@@ -345,7 +375,10 @@ def ingest():
     if not user:
         return jsonify({"error": "user not found"}), 404
 
-    brain_id = request.form.get("brain_id")
+    if request.is_json:
+        brain_id = (request.get_json(silent=True) or {}).get("brain_id")
+    else:
+        brain_id = request.form.get("brain_id")
     if not brain_id:
         return jsonify({"error": "brain_id required"}), 400
 
@@ -353,13 +386,21 @@ def ingest():
     if not brain:
         return jsonify({"error": "brain not found"}), 404
 
+    from app.services.upload_sessions import UploadError
+
+    try:
+        stored = _claimed_uploads(user.id)
+    except UploadError as e:
+        return jsonify({"error": str(e)}), e.status
+
     files = request.files.getlist("files[]") or request.files.getlist("files")
-    if not files:
+    if not files and not stored:
         return jsonify({"error": "at least one file required"}), 400
 
-    # Buffer bytes now — Flask won't let us read the stream after the response goes out
+    # Buffer bytes now — Flask won't let us read the stream after the response goes out.
+    # Resumable uploads are read from disk by the pipeline instead.
     import io
-    file_payloads = []
+    file_payloads = list(stored)
     for f in files:
         if not f or not getattr(f, "filename", None):
             continue
@@ -389,6 +430,8 @@ def ingest():
             db.session.rollback()
             current_app.logger.exception("ingest_documents failed (sqlite)")
             return jsonify({"error": str(e), "processing": False}), 500
+        finally:
+            _discard_uploads(stored)
 
         return jsonify(
             {
@@ -397,6 +440,7 @@ def ingest():
                 "nodes_created": result.get("nodes_created", 0),
                 "links_created": result.get("links_created", 0),
                 "errors": result.get("errors", []),
+                "timings": result.get("timings"),
             }
         ), 200
 
@@ -411,8 +455,10 @@ def ingest():
             except Exception:
                 db.session.rollback()
                 current_app.logger.exception("ingest_documents failed (background)")
+            finally:
+                _discard_uploads(stored)
 
-    threading.Thread(target=ingest_in_background, daemon=True).start()
+    background_jobs.submit(ingest_in_background)
 
     return jsonify({
         "message": "Processing started. Your document will appear in Sources when ready (may take a few minutes for large PDFs).",
@@ -421,6 +467,88 @@ def ingest():
     }), 200
 
 
+def _job_to_json(j: IngestionJob):
+    return {
+        "id": j.id,
+        "filename": j.filename,
+        "source_file_id": j.source_file_id,
+        "status": j.status,
+        "total_chunks": j.total_chunks or 0,
+        "done_chunks": j.done_chunks or 0,
+        "nodes_created": j.nodes_created or 0,
+        "error": j.error,
+        "timings": j.timings,
+        "created_at": j.created_at.isoformat() if j.created_at else None,
+        "updated_at": j.updated_at.isoformat() if j.updated_at else None,
+    }
+
+
+# progress of big uploads (done_chunks / total_chunks) + which ones crashed
+@bp.route("/brain/<brain_id>/ingest-jobs", methods=["GET"])
+@jwt_required()
+def list_ingest_jobs(brain_id):
+    user = _get_user_or_404()
+    if not user:
+        return jsonify({"error": "user not found"}), 404
+    brain = _brain_for_user(brain_id, user.id)
+    if not brain:
+        return jsonify({"error": "brain not found"}), 404
+    from app.services.ingestion_pipeline import resumable_jobs
+
+    jobs = (
+        IngestionJob.query.filter_by(brain_id=brain_id)
+        .order_by(IngestionJob.created_at.desc())
+        .limit(50)
+        .all()
+    )
+    resumable = {j.id for j in resumable_jobs(brain_id)}
+    return jsonify({"jobs": [{**_job_to_json(j), "resumable": j.id in resumable} for j in jobs]}), 200
+
+
+# pick up crashed / failed uploads from their last checkpoint
+@bp.route("/brain/<brain_id>/ingest-jobs/resume", methods=["POST"])
+@jwt_required()
+def resume_ingest_jobs(brain_id):
+    user = _get_user_or_404()
+    if not user:
+        return jsonify({"error": "user not found"}), 404
+    brain = _brain_for_user(brain_id, user.id)
+    if not brain:
+        return jsonify({"error": "brain not found"}), 404
+    from app.services.ingestion_pipeline import resumable_jobs, resume_brain_ingestion
+
+    pending = resumable_jobs(brain_id)
+    if not pending:
+        return jsonify({"processing": False, "jobs_count": 0, "nodes_created": 0, "errors": []}), 200
+
+    uri = (current_app.config.get("SQLALCHEMY_DATABASE_URI") or "").lower()
+    if "sqlite" in uri:
+        try:
+            result = resume_brain_ingestion(brain_id)
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"error": str(e), "processing": False}), 500
+        return jsonify({
+            "processing": False,
+            "jobs_count": len(pending),
+            "nodes_created": result.get("nodes_created", 0),
+            "errors": result.get("errors", []),
+        }), 200
+
+    app = current_app._get_current_object()
+
+    def resume_in_background():
+        with app.app_context():
+            try:
+                resume_brain_ingestion(brain_id)
+            except Exception:
+                db.session.rollback()
+                current_app.logger.exception("resume_brain_ingestion failed (background)")
+
+    background_jobs.submit(resume_in_background)
+    return jsonify({"processing": True, "jobs_count": len(pending)}), 200
+
+
 # scan/pic -> markdown for split view, maybe saves source row too
 @bp.route("/brain/ocr", methods=["POST"])
 @jwt_required()
@@ -437,9 +565,18 @@ def ocr():
     if not brain:
         return jsonify({"error": "brain not found"}), 404
 
+    from app.services.upload_sessions import UploadError
+
     file = request.files.get("file")
+    stored = []
     if not file or not file.filename:
-        return jsonify({"error": "file required"}), 400
+        try:
+            stored = _claimed_uploads(user.id)[:1]
+        except UploadError as e:
+            return jsonify({"error": str(e)}), e.status
+        if not stored:
+            return jsonify({"error": "file required"}), 400
+        file = FileStorage(stream=open(stored[0].path, "rb"), filename=stored[0].filename)
 
     try:
         data = file.read()
@@ -488,9 +625,22 @@ def ocr():
         return jsonify(result), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+    finally:
+        if stored:
+            file.close()
+            _discard_uploads(stored)
+
+
+def _private_cache(resp, max_age: int):
+    # send_file marks anything with a max_age public - these sit behind a JWT, so browser cache only
+    if max_age > 0:
+        resp.cache_control.public = False
+        resp.cache_control.private = True
+    return resp
 
 
 # send back the raw uploaded file if ur allowed to see that class
+# ?variant=thumb|preview (&page=N for pdfs) -> small cached webp instead of the whole upload
 @bp.route("/brain/<brain_id>/sources/<int:source_id>/file", methods=["GET"])
 @jwt_required()
 def serve_source_file(brain_id, source_id):
@@ -506,6 +656,34 @@ def serve_source_file(brain_id, source_id):
     path = _upload_root() / src.storage_path
     if not path.is_file():
         return jsonify({"error": "file missing on disk"}), 404
+    max_age = int(current_app.config.get("PREVIEW_MAX_AGE") or 0)
+
+    variant = (request.args.get("variant") or "").strip().lower()
+    if variant:
+        from app.services import previews
+
+        if variant not in previews.VARIANTS:
+            return jsonify({"error": f"variant must be one of {', '.join(previews.VARIANTS)}"}), 400
+        try:
+            page = int(request.args.get("page") or 1)
+        except ValueError:
+            return jsonify({"error": "page must be a number"}), 400
+        try:
+            out = previews.get(path, src.file_type, variant, page)
+            pages = previews.page_count(path) if src.file_type == "pdf" else 1
+        except previews.PreviewUnavailable as e:
+            return jsonify({"error": str(e)}), 404
+        stem = Path(src.filename or "scan").stem
+        resp = send_file(
+            out,
+            mimetype="image/webp",
+            etag=previews.etag_for(path, variant, page),
+            max_age=max_age,
+            download_name=f"{stem}-{variant}-p{page}.webp",
+        )
+        resp.headers["X-Page-Count"] = str(pages)
+        return _private_cache(resp, max_age)
+
     guessed, _ = mimetypes.guess_type(str(path))
     if src.file_type == "pdf":
         mime = guessed or "application/pdf"
@@ -513,7 +691,9 @@ def serve_source_file(brain_id, source_id):
         mime = guessed or "image/jpeg"
     else:
         mime = guessed or "application/octet-stream"
-    return send_file(path, mimetype=mime, as_attachment=False, download_name=src.filename or "scan.png")
+    # werkzeug handles ETag / If-None-Match and Range requests (PDF viewers fetch pages by range)
+    resp = send_file(path, mimetype=mime, as_attachment=False, download_name=src.filename or "scan.png", max_age=max_age)
+    return _private_cache(resp, max_age)
 
 
 # chunk/pdf text -> vector + db nodes
@@ -563,6 +743,11 @@ def list_brains():
     user = _get_user_or_404()
     if not user:
         return jsonify({"error": "user not found"}), 404
+    from app.services import change_versions
+
+    etag, unchanged = change_versions.check(change_versions.user_scopes(user.id))
+    if unchanged:
+        return unchanged
 
     owned = Brain.query.filter_by(user_id=user.id).order_by(Brain.created_at.desc()).all()
     collab_ids = [
@@ -589,7 +774,7 @@ def list_brains():
             seen.add(b.id)
             merged.append(b)
 
-    return jsonify({
+    return change_versions.tagged(jsonify({
         "brains": [
             {
                 "id": b.id,
@@ -600,7 +785,7 @@ def list_brains():
             }
             for b in merged
         ]
-    }), 200
+    }), etag), 200
 
 
 # bail out of a shared class (owner has to delete not leave)
@@ -637,6 +822,7 @@ def delete_brain(brain_id):
         return jsonify({"error": "only the brain owner can delete it"}), 403
 
     Node.query.filter_by(brain_id=brain_id).delete(synchronize_session=False)
+    IngestionJob.query.filter_by(brain_id=brain_id).delete(synchronize_session=False)
 
     upload_root = _upload_root()
     for sf in SourceFile.query.filter_by(brain_id=brain_id).all():
@@ -776,6 +962,22 @@ def delete_brain_source(brain_id, source_id):
         CalendarEvent.brain_id == brain_id,
         CalendarEvent.source_file_id == source_id,
     ).update({CalendarEvent.source_file_id: None}, synchronize_session=False)
+    from app.services import change_versions
+
+    change_versions.bump(change_versions.calendar_scope(brain_id))  # query update - no flush saw it
+    # unfinished ingests for this file go too - nothing left to resume into
+    upload_root = _upload_root()
+    for job in IngestionJob.query.filter_by(brain_id=brain_id, source_file_id=source_id).all():
+        if job.text_path:
+            try:
+                (upload_root / job.text_path).unlink()
+            except OSError:
+                pass
+        db.session.delete(job)
+    if src.storage_path:
+        from app.services.previews import discard
+
+        discard(upload_root / src.storage_path)
     db.session.delete(src)
     db.session.commit()
     return jsonify({"ok": True}), 200
@@ -798,7 +1000,8 @@ def upload_syllabus():
     if not file or not file.filename:
         return jsonify({"error": "file required"}), 400
     try:
-        from app.services.syllabus_calendar import syllabus_text_from_file, extract_calendar_events
+        from app.services import syllabus_pipeline
+        from app.services.syllabus_calendar import syllabus_text_from_file
 
         data = file.read()
         if not data:
@@ -806,7 +1009,9 @@ def upload_syllabus():
         text = syllabus_text_from_file(file.filename, data)
         if not text.strip():
             return jsonify({"error": "unable to extract text from syllabus"}), 400
-        formatted_markdown = _syllabus_node_markdown(text)
+        # markdown + deadlines in parallel
+        parsed = syllabus_pipeline.process(text, want_profile=False)
+        formatted_markdown = parsed.markdown
 
         source_file = SourceFile(
             brain_id=brain_id,
@@ -831,21 +1036,7 @@ def upload_syllabus():
             )
         )
 
-        extracted = extract_calendar_events(text)
-        saved = []
-        for item in extracted:
-            ev = CalendarEvent(
-                brain_id=brain_id,
-                source_file_id=source_file.id,
-                title=item.get("title") or "Untitled event",
-                event_type=(item.get("event_type") or "other").lower(),
-                due_at=item.get("due_at"),
-                course_label=item.get("course_label"),
-                confidence=item.get("confidence"),
-                notes=item.get("notes"),
-            )
-            db.session.add(ev)
-            saved.append(ev)
+        saved = _bulk_save_calendar_events(brain_id, source_file.id, parsed.events)
         db.session.commit()
         return jsonify(
             {
@@ -866,6 +1057,11 @@ def list_classes():
     user = _get_user_or_404()
     if not user:
         return jsonify({"error": "user not found"}), 404
+    from app.services import change_versions
+
+    etag, unchanged = change_versions.check(change_versions.user_scopes(user.id))
+    if unchanged:
+        return unchanged
 
     brains = Brain.query.filter_by(user_id=user.id).order_by(Brain.created_at.desc()).all()
     brain_ids = [b.id for b in brains]
@@ -884,7 +1080,7 @@ def list_classes():
         count_map = {brain_id: count for brain_id, count in rows}
 
     classes = [_class_to_json(b, profile_map.get(b.id), count_map.get(b.id, 0)) for b in brains]
-    return jsonify({"classes": classes}), 200
+    return change_versions.tagged(jsonify({"classes": classes}), etag), 200
 
 
 # type in class info yourself
@@ -945,8 +1141,8 @@ def create_class_from_syllabus():
         return jsonify({"error": "file required"}), 400
 
     try:
-        from app.services.syllabus_calendar import syllabus_text_from_file, extract_calendar_events
-        from app.services.syllabus_profile import extract_syllabus_profile
+        from app.services import syllabus_pipeline
+        from app.services.syllabus_calendar import syllabus_text_from_file
 
         data = file.read()
         if not data:
@@ -954,9 +1150,11 @@ def create_class_from_syllabus():
         text = syllabus_text_from_file(file.filename, data)
         if not text.strip():
             return jsonify({"error": "unable to extract text from syllabus"}), 400
-        formatted_markdown = _syllabus_node_markdown(text)
+        # markdown, class profile and deadlines all at once
+        parsed = syllabus_pipeline.process(text)
+        formatted_markdown = parsed.markdown
 
-        profile_data = extract_syllabus_profile(text)
+        profile_data = parsed.profile
         title = (
             profile_data.get("class_title")
             or profile_data.get("class_number")
@@ -991,22 +1189,8 @@ def create_class_from_syllabus():
             )
         )
 
-        extracted = extract_calendar_events(text)
-        saved = []
         fallback_course = profile.class_number or brain.name
-        for item in extracted:
-            ev = CalendarEvent(
-                brain_id=brain.id,
-                source_file_id=source_file.id,
-                title=item.get("title") or "Untitled event",
-                event_type=(item.get("event_type") or "other").lower(),
-                due_at=item.get("due_at"),
-                course_label=item.get("course_label") or fallback_course,
-                confidence=item.get("confidence"),
-                notes=item.get("notes"),
-            )
-            db.session.add(ev)
-            saved.append(ev)
+        saved = _bulk_save_calendar_events(brain.id, source_file.id, parsed.events, fallback_course)
 
         db.session.commit()
         return jsonify(
@@ -1078,23 +1262,17 @@ def classes_assistant():
 
     now_utc = datetime.now(timezone.utc)
     window_end = now_utc + timedelta(days=14)
-    events = (
-        CalendarEvent.query.filter(CalendarEvent.brain_id.in_(brain_ids))
-        .filter(CalendarEvent.due_at >= now_utc - timedelta(days=7))
-        .filter(CalendarEvent.due_at <= window_end)
-        .order_by(CalendarEvent.due_at.asc())
-        .all()
-    )
+    from app.services import calendar_events
+
+    events = calendar_events.upcoming(brain_ids, now_utc - timedelta(days=7), window_end)
     profiles = CourseProfile.query.filter(CourseProfile.brain_id.in_(brain_ids)).all()
     profile_map = {p.brain_id: p for p in profiles}
     brain_map = {b.id: b for b in brains}
 
     event_lines = []
     for e in events:
-        b = brain_map.get(e.brain_id)
-        p = profile_map.get(e.brain_id)
-        course = (p.class_number if p else None) or (b.name if b else e.course_label) or "Unknown class"
-        event_lines.append(f"- {course}: [{e.event_type}] {e.title} on {e.due_at.isoformat()}")
+        course = e.class_number or e.brain_name or e.data["course_label"] or "Unknown class"
+        event_lines.append(f"- {course}: [{e.data['event_type']}] {e.data['title']} on {e.data['due_at']}")
     profile_lines = []
     for b in brains:
         p = profile_map.get(b.id)
@@ -1152,17 +1330,15 @@ def classes_assistant():
     except Exception:
         low = prompt.lower()
         if "quiz" in low or "test" in low or "exam" in low:
-            filtered = [e for e in events if e.event_type in {"quiz", "test", "midterm", "final"}]
+            filtered = [e for e in events if e.data["event_type"] in {"quiz", "test", "midterm", "final"}]
         else:
             filtered = events
         if not filtered:
             return jsonify({"response": "I could not find matching upcoming events in your class calendars."}), 200
         lines = []
         for e in filtered[:20]:
-            b = brain_map.get(e.brain_id)
-            p = profile_map.get(e.brain_id)
-            course = (p.class_number if p else None) or (b.name if b else e.course_label) or "Unknown class"
-            lines.append(f"- {course}: [{e.event_type}] {e.title} on {e.due_at.strftime('%a %b %d, %Y %I:%M %p')}")
+            course = e.class_number or e.brain_name or e.data["course_label"] or "Unknown class"
+            lines.append(f"- {course}: [{e.data['event_type']}] {e.data['title']} on {e.due_at.strftime('%a %b %d, %Y %I:%M %p')}")
         return jsonify({"response": "Here are your upcoming items:\n" + "\n".join(lines)}), 200
 
 
@@ -1176,6 +1352,11 @@ def get_brain_calendar_events(brain_id):
     brain = _brain_for_user(brain_id, user.id)
     if not brain:
         return jsonify({"error": "brain not found"}), 404
+    from app.services import change_versions
+
+    etag, unchanged = change_versions.check(change_versions.brain_scope(brain_id))
+    if unchanged:
+        return unchanged
 
     start = _parse_datetime_value(request.args.get("start"))
     end = _parse_datetime_value(request.args.get("end"))
@@ -1189,7 +1370,7 @@ def get_brain_calendar_events(brain_id):
     if event_type:
         q = q.filter(CalendarEvent.event_type == event_type)
     events = q.order_by(CalendarEvent.due_at.asc()).all()
-    return jsonify({"events": [_event_to_json(e) for e in events]}), 200
+    return change_versions.tagged(jsonify({"events": [_event_to_json(e) for e in events]}), etag), 200
 
 
 # user typed a due date row
@@ -1304,22 +1485,20 @@ def get_global_calendar_events():
     start = _parse_datetime_value(request.args.get("start"))
     end = _parse_datetime_value(request.args.get("end"))
     event_type = (request.args.get("type") or "").strip().lower()
-    brain_name_map = {b.id: b.name for b in Brain.query.filter(Brain.id.in_(brain_ids)).all()}
 
-    q = CalendarEvent.query.filter(CalendarEvent.brain_id.in_(brain_ids))
-    if start:
-        q = q.filter(CalendarEvent.due_at >= start)
-    if end:
-        q = q.filter(CalendarEvent.due_at <= end)
-    if event_type:
-        q = q.filter(CalendarEvent.event_type == event_type)
-    rows = q.order_by(CalendarEvent.due_at.asc()).all()
+    # month view hits the cached window around today; "everything" is one joined query
+    from app.services import calendar_events
+
+    if start and end:
+        rows = calendar_events.upcoming(brain_ids, start, end, event_type)
+    else:
+        rows = calendar_events.query(brain_ids, start, end, event_type)
     return jsonify(
         {
             "events": [
                 {
-                    **_event_to_json(e),
-                    "brain_name": brain_name_map.get(e.brain_id, ""),
+                    **e.data,
+                    "brain_name": e.brain_name,
                 }
                 for e in rows
             ]
@@ -1430,18 +1609,26 @@ def search():
         return jsonify({"results": []}), 200
 
     from sqlalchemy import or_
-    nodes = (
-        Node.query.filter(Node.brain_id.in_(brain_ids))
-        .filter(
-            or_(
-                Node.title.ilike(search_term),
-                Node.summary.ilike(search_term),
-                Node.raw_content.ilike(search_term),
+    from app.services import note_search
+
+    # full-text index first (word prefixes, ranked); substring scan if there's none or it found nothing
+    ids = note_search.search(brain_ids, q, limit=50)
+    if ids:
+        by_id = {n.id: n for n in Node.query.filter(Node.id.in_(ids)).all()}
+        nodes = [by_id[i] for i in ids if i in by_id]
+    else:
+        nodes = (
+            Node.query.filter(Node.brain_id.in_(brain_ids))
+            .filter(
+                or_(
+                    Node.title.ilike(search_term),
+                    Node.summary.ilike(search_term),
+                    Node.raw_content.ilike(search_term),
+                )
             )
+            .limit(50)
+            .all()
         )
-        .limit(50)
-        .all()
-    )
     brain_map = {b.id: b.name for b in brains}
     return jsonify({
         "results": [
@@ -1468,6 +1655,11 @@ def get_brain_nodes(brain_id):
     brain = _brain_for_user(brain_id, user.id)
     if not brain:
         return jsonify({"error": "brain not found"}), 404
+    from app.services import change_versions
+
+    etag, unchanged = change_versions.check(change_versions.brain_scope(brain_id))
+    if unchanged:
+        return unchanged
 
     from sqlalchemy import or_
     page = max(1, int(request.args.get("page", 1)))
@@ -1495,7 +1687,13 @@ def get_brain_nodes(brain_id):
 
     pagination = query.paginate(page=page, per_page=per_page)
     nodes = pagination.items
-    return jsonify({
+    # uploads still generating - nodes above are whatever batches have committed so far
+    active_jobs = (
+        IngestionJob.query.filter_by(brain_id=brain_id)
+        .filter(IngestionJob.status.in_(("pending", "running")))
+        .all()
+    )
+    return change_versions.tagged(jsonify({
         "nodes": [
             _node_to_json(n)
             for n in nodes
@@ -1503,7 +1701,8 @@ def get_brain_nodes(brain_id):
         "total": pagination.total,
         "page": page,
         "per_page": per_page,
-    }), 200
+        "ingesting": [_job_to_json(j) for j in active_jobs],
+    }), etag), 200
 
 
 # blank note POST
@@ -1572,10 +1771,19 @@ def get_node(node_id):
     user = _get_user_or_404()
     if not user:
         return jsonify({"error": "user not found"}), 404
-    node = _node_for_user(node_id, user.id)
+    # brain id + access first - the 304 path never loads the markdown
+    brain_id = db.session.query(Node.brain_id).filter(Node.id == node_id).scalar()
+    if not brain_id or not _brain_for_user(brain_id, user.id):
+        return jsonify({"error": "node not found"}), 404
+    from app.services import change_versions
+
+    etag, unchanged = change_versions.check(change_versions.brain_scope(brain_id))
+    if unchanged:
+        return unchanged
+    node = Node.query.get(node_id)
     if not node:
         return jsonify({"error": "node not found"}), 404
-    return jsonify(_node_to_json(node)), 200
+    return change_versions.tagged(jsonify(_node_to_json(node)), etag), 200
 
 
 # autosave / save markdown
@@ -1,8 +1,5 @@
 from flask import Blueprint, request, jsonify
 
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
-
 from flask_jwt_extended import create_access_token, create_refresh_token
 
 from app.config import Config
@@ -24,6 +21,10 @@ def google():
     if not client_id:
         return jsonify({"error": "Google auth not configured"}), 500
 
+    # google-auth + requests cost ~50 ms at import; only this route uses them
+    from google.oauth2 import id_token
+    from google.auth.transport import requests as google_requests
+
     try:
         idinfo = id_token.verify_oauth2_token(
             credential,
@@ -1,19 +1,19 @@
+import heapq
+import itertools
 import re
 from typing import Optional
 
-from flask import Blueprint, Response, jsonify, request
+from flask import Blueprint, Response, current_app, jsonify, request, send_file, stream_with_context, url_for
 from flask_jwt_extended import get_jwt_identity, jwt_required
 
 from app.models.user import User
 from sqlalchemy import or_
 
 from app.models.brain import Brain, BrainCollaborator, Node
+from app.services.note_stats import NOTE_TYPES
 
 bp = Blueprint("home", __name__)
 
-# Don't count onboarding / system nodes toward “how many notes”
-NOTE_TYPES = ("note", "handwritten", "textbook_section")
-
 
 def _display_name_from_email(email: Optional[str]) -> str:
     if not email or "@" not in email:
@@ -55,73 +55,136 @@ def me_summary():
     user = User.query.get(user_id)
     if not user:
         return jsonify({"error": "user not found"}), 404
+    from app.services import change_versions
+
+    etag, unchanged = change_versions.check(change_versions.user_scopes(user.id))
+    if unchanged:
+        return unchanged
     owned = Brain.query.filter_by(user_id=user.id).all()
     collab_ids = [r.brain_id for r in BrainCollaborator.query.filter_by(user_id=user.id).all()]
     brain_ids = list({*(b.id for b in owned), *collab_ids})
     brains_count = len(brain_ids)
-    if brain_ids:
-        total_notes = Node.query.filter(
-            Node.brain_id.in_(brain_ids),
-            or_(Node.node_type.in_(NOTE_TYPES), Node.node_type.is_(None)),
-        ).count()
-    else:
-        total_notes = 0
-    return jsonify({
+    # per-brain counters kept by note_stats - no COUNT over every textbook chunk
+    from app.services import note_stats
+
+    total_notes = sum(count for count, _ in note_stats.for_brains(brain_ids).values())
+    return change_versions.tagged(jsonify({
         "email": user.email,
         "display_name": _display_name_from_email(user.email),
         "total_notes": total_notes,
         "brains_count": brains_count,
-    }), 200
+    }), etag), 200
 
 
 @bp.route("/audio/tts", methods=["POST"])
 @jwt_required()
 def audio_tts():
-    """Text-to-speech via OpenAI Audio API (same OPENAI_API_KEY as chat). Returns audio/mpeg."""
+    """Text-to-speech via OpenAI Audio API (same OPENAI_API_KEY as chat). Streams audio/mpeg.
+
+    Long text is read in sentence-sized segments synthesized in parallel; audio starts as soon as
+    the first segment is ready and the rest follows in order on the same response. Segments heard
+    before come from the on-disk cache. X-TTS-Clip-Url is a signed, expiring URL for replaying the finished clip.
+    """
+    from app.services import tts, tts_cache
+
     data = request.get_json() or {}
     text = (data.get("text") or "").strip()
     voice = (data.get("voice") or "alloy").strip()
     if not text:
         return jsonify({"error": "text required"}), 400
+    if len(text) > tts.max_chars():
+        return jsonify({"error": f"text too long (max {tts.max_chars()} characters)"}), 400
+    headers = {"Cache-Control": "no-store", "X-Accel-Buffering": "no"}
     try:
-        from app.services.openai_service import synthesize_speech_mp3
-
-        mp3 = synthesize_speech_mp3(text, voice=voice)
+        plan = tts.plan(text, voice=voice)
+        if plan.clip_id:
+            user_id = get_jwt_identity()
+            headers["X-TTS-Clip-Url"] = url_for(
+                "home.audio_tts_clip", clip_id=plan.clip_id, **tts_cache.clip_query(plan.clip_id, user_id)
+            )
+            cached = tts_cache.clip_segments(plan.clip_id)
+            if cached is not None:
+                # every segment heard before: one body with a length, no API call
+                return Response(b"".join(cached), mimetype="audio/mpeg", headers=headers)
+        chunks = tts.stream(plan)
+        # first segment inside the request so setup errors still get a JSON status
+        first = next(chunks)
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except RuntimeError as e:
         return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": f"TTS failed: {e!s}"}), 500
-    return Response(mp3, mimetype="audio/mpeg", headers={"Cache-Control": "no-store"})
+
+    def body():
+        try:
+            yield from itertools.chain([first], chunks)
+        except Exception:
+            # headers are gone already; end the clip where it got to
+            current_app.logger.exception("TTS stream stopped early")
+
+    return Response(stream_with_context(body()), mimetype="audio/mpeg", headers=headers)
+
+
+# replay / scrub a clip /audio/tts already produced. no JWT: <audio src> can't send one, so the URL
+# carries an HMAC bound to the user and an expiry (the id alone is guessable from the text). never synthesizes.
+@bp.route("/audio/tts/clips/<clip_id>.mp3", methods=["GET"])
+def audio_tts_clip(clip_id):
+    from app.services import tts_cache
+
+    left = tts_cache.clip_seconds_left(clip_id, request.args.get("u"), request.args.get("exp"), request.args.get("sig"))
+    path = tts_cache.clip_file(clip_id) if left is not None else None
+    if path is None:
+        return jsonify({"error": "clip not found"}), 404
+    resp = send_file(path, mimetype="audio/mpeg", conditional=True, etag=clip_id, max_age=left)
+    resp.cache_control.private = True
+    resp.cache_control.public = False
+    return resp
 
 
 @bp.route("/audio/transcribe", methods=["POST"])
 @jwt_required()
 def audio_transcribe():
-    """Speech-to-text via OpenAI Whisper (multipart file field `file`)."""
+    """Speech-to-text via OpenAI Whisper (multipart file field `file`, or `upload_id` of a finalized resumable upload).
+
+    Dictation-sized clips are one call; lecture recordings are cut at pauses and transcribed in
+    parallel (services/transcription.py). `segments` has the timestamped lines.
+    """
+    from app.services import transcription, upload_sessions
+
     f = request.files.get("file")
-    if not f or not f.filename:
-        return jsonify({"error": "file required"}), 400
-    raw = f.read()
-    if len(raw) > 15 * 1024 * 1024:
-        return jsonify({"error": "file too large (max 15 MB)"}), 400
-    name = (f.filename or "recording.webm").lower()
-    if not any(name.endswith(ext) for ext in (".webm", ".wav", ".mp3", ".mp4", ".mpeg", ".mpga", ".m4a", ".ogg", ".oga", ".flac")):
-        # Whisper accepts many types; allow unknown extension if non-empty body
-        if not raw:
+    stored = None
+    if f and f.filename:
+        filename = f.filename
+        audio = f.read()
+        if len(audio) > transcription.max_bytes():
+            return jsonify({"error": f"file too large (max {transcription.max_bytes() // (1024 * 1024)} MB)"}), 400
+        if not audio:
             return jsonify({"error": "empty file"}), 400
+    else:
+        upload_id = request.form.get("upload_id") or (request.get_json(silent=True) or {}).get("upload_id")
+        if not upload_id:
+            return jsonify({"error": "file required"}), 400
+        try:
+            stored = upload_sessions.claim(upload_id, int(get_jwt_identity()))
+        except upload_sessions.UploadError as e:
+            return jsonify({"error": str(e)}), e.status
+        filename, audio = stored.filename, stored.path  # read from disk, not buffered here
     try:
-        from app.services.openai_service import transcribe_audio_bytes
-
-        text = transcribe_audio_bytes(raw, filename=f.filename or "recording.webm")
+        result = transcription.transcribe(audio, filename=filename or "recording.webm")
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except RuntimeError as e:
         return jsonify({"error": str(e)}), 503
     except Exception as e:
         return jsonify({"error": f"Transcription failed: {e!s}"}), 500
-    return jsonify({"text": text}), 200
+    if stored is not None:
+        upload_sessions.discard(stored.upload_id)  # kept on failure so the client can retry without re-uploading
+    return jsonify({
+        "text": result.text,
+        "duration": round(result.duration, 1),
+        "segments": [{"start": l.start, "end": l.end, "text": l.text} for l in result.lines],
+    }), 200
 
 
 @bp.route("/me/activity", methods=["GET"])
@@ -147,25 +210,24 @@ def me_activity():
     if not brain_map:
         return jsonify({"items": []}), 200
 
-    accessible_ids = list(brain_map.keys())
-    q = (
-        Node.query.filter(Node.brain_id.in_(accessible_ids))
-        .filter(or_(Node.node_type.in_(NOTE_TYPES), Node.node_type.is_(None)))
-    )
-    rows = (
-        q.order_by(Node.updated_at.desc().nullslast(), Node.created_at.desc())
-        .limit(limit)
-        .all()
-    )
+    # each brain keeps its newest notes in note_stats - merge those instead of sorting every node
+    from app.services import note_stats
+
+    recent = [
+        (brain_id, item)
+        for brain_id, (_, items) in note_stats.for_brains(brain_map.keys()).items()
+        for item in items
+    ]
+    recent = heapq.nlargest(limit, recent, key=lambda pair: note_stats.sort_key(pair[1]))
     items = []
-    for n in rows:
+    for brain_id, n in recent:
         items.append({
-            "id": n.id,
-            "title": n.title or "Untitled",
-            "brain_id": n.brain_id,
-            "brain_name": brain_map.get(n.brain_id, ""),
-            "updated_at": n.updated_at.isoformat() if n.updated_at else None,
-            "created_at": n.created_at.isoformat() if n.created_at else None,
+            "id": n["id"],
+            "title": n.get("title") or "Untitled",
+            "brain_id": brain_id,
+            "brain_name": brain_map.get(brain_id, ""),
+            "updated_at": n.get("updated_at"),
+            "created_at": n.get("created_at"),
             "kind": "note",
         })
     return jsonify({"items": items}), 200
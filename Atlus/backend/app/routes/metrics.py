@@ -0,0 +1,49 @@
+import hmac
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from flask_jwt_extended import jwt_required
+
+from app.services import metrics, sampling_profiler
+from app.utils.decorators import admin_required
+
+bp = Blueprint("metrics", __name__)
+
+_LOOPBACK = {"127.0.0.1", "::1"}
+
+
+def _scrape_allowed() -> bool:
+    # prometheus can't do our JWT login: a shared bearer token. Without one, only the debug dev
+    # server answers, and only to localhost: behind a reverse proxy every request is from 127.0.0.1
+    token = (current_app.config.get("METRICS_TOKEN") or "").strip()
+    if not token:
+        return current_app.debug and request.remote_addr in _LOOPBACK
+    header = request.headers.get("Authorization") or ""
+    return header.startswith("Bearer ") and hmac.compare_digest(header[7:].strip(), token)
+
+
+# prometheus text format: pipeline stage timings (and whatever else registers in services.metrics)
+@bp.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    if not _scrape_allowed():
+        return jsonify({"error": "forbidden"}), 403
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+# dev: sample every thread for ?seconds=N, folded stacks back (paste into speedscope.app)
+@bp.route("/api/debug/profile", methods=["GET"])
+@jwt_required()
+@admin_required
+def sampling_profile():
+    if not current_app.config.get("PROFILER_ENABLED"):
+        return jsonify({"error": "profiler disabled (set ATLUS_PROFILER_ENABLED=1)"}), 404
+    try:
+        seconds = min(max(float(request.args.get("seconds", 5)), 0.1), 60.0)
+        interval = min(max(float(request.args.get("interval_ms", 5)), 1.0), 100.0) / 1000
+    except ValueError:
+        return jsonify({"error": "seconds and interval_ms must be numbers"}), 400
+    include_idle = request.args.get("idle") in ("1", "true")
+    try:
+        counts = sampling_profiler.sample(seconds, interval, include_idle=include_idle)
+    except sampling_profiler.ProfilerBusy as e:
+        return jsonify({"error": str(e)}), 409
+    return Response(sampling_profiler.folded(counts), mimetype="text/plain; charset=utf-8")
@@ -0,0 +1,84 @@
+# resumable uploads for big textbooks / lecture recordings - see services/upload_sessions.py
+# POST /uploads -> PUT /uploads/<id> (Content-Range) as many times as it takes -> POST /uploads/<id>/finalize
+# then hand upload_ids to /brain/ingest, /brain/create, /brain/ocr or /audio/transcribe
+
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+from app.services import upload_sessions
+from app.services.upload_sessions import UploadError
+
+bp = Blueprint("uploads", __name__)
+
+
+def _user_id():
+    try:
+        return int(get_jwt_identity())
+    except (TypeError, ValueError):
+        return None
+
+
+def _error(e: UploadError):
+    return jsonify({"error": str(e)}), e.status
+
+
+# open a session: {filename, size, sha256?} -> upload_id + chunk_size
+@bp.route("/uploads", methods=["POST"])
+@jwt_required()
+def create_upload():
+    user_id = _user_id()
+    if user_id is None:
+        return jsonify({"error": "user not found"}), 404
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(upload_sessions.create(user_id, data.get("filename"), data.get("size"), data.get("sha256"))), 201
+    except UploadError as e:
+        return _error(e)
+
+
+# what arrived so far - clients resume from here after a dropped connection
+@bp.route("/uploads/<upload_id>", methods=["GET"])
+@jwt_required()
+def upload_status(upload_id):
+    try:
+        return jsonify(upload_sessions.status(upload_id, _user_id())), 200
+    except UploadError as e:
+        return _error(e)
+
+
+# one byte range, raw body; X-Chunk-SHA256 (hex) is checked before the range counts
+@bp.route("/uploads/<upload_id>", methods=["PUT"])
+@jwt_required()
+def upload_range(upload_id):
+    try:
+        out = upload_sessions.write_range(
+            upload_id,
+            _user_id(),
+            request.headers.get("Content-Range"),
+            request.stream,
+            request.headers.get("X-Chunk-SHA256"),
+        )
+    except UploadError as e:
+        return _error(e)
+    return jsonify(out), 200
+
+
+@bp.route("/uploads/<upload_id>/finalize", methods=["POST"])
+@jwt_required()
+def finalize_upload(upload_id):
+    data = request.get_json(silent=True) or {}
+    try:
+        return jsonify(upload_sessions.finalize(upload_id, _user_id(), data.get("sha256"))), 200
+    except UploadError as e:
+        return _error(e)
+
+
+@bp.route("/uploads/<upload_id>", methods=["DELETE"])
+@jwt_required()
+def abort_upload(upload_id):
+    try:
+        upload_sessions.status(upload_id, _user_id())
+    except UploadError as e:
+        return _error(e)
+    upload_sessions.discard(upload_id)
+    return jsonify({"ok": True}), 200
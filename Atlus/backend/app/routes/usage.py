@@ -0,0 +1,70 @@
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import get_jwt_identity, jwt_required
+
+from app.routes.brain import _brain_for_user
+from app.services import usage_ledger
+from app.utils.decorators import admin_required
+
+bp = Blueprint("usage", __name__)
+
+
+def _user_id():
+    try:
+        return int(get_jwt_identity())
+    except (TypeError, ValueError):
+        return None
+
+
+def _rollup_args():
+    """(group_by, days) from the query string, or raise ValueError with something to show."""
+    group_by = (request.args.get("group_by") or "feature").strip().lower()
+    if group_by not in usage_ledger.GROUPS:
+        raise ValueError(f"group_by must be one of {', '.join(usage_ledger.GROUPS)}")
+    try:
+        days = int(request.args.get("days") or 30)
+    except ValueError:
+        raise ValueError("days must be a whole number")
+    return group_by, min(max(days, 1), 366)
+
+
+# my own token / $ spend, ?group_by=feature|operation|model|brain|day&days=30
+@bp.route("/usage/me", methods=["GET"])
+@jwt_required()
+def my_usage():
+    user_id = _user_id()
+    if user_id is None:
+        return jsonify({"error": "user not found"}), 404
+    try:
+        group_by, days = _rollup_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(usage_ledger.rollup(group_by, user_id=user_id, days=days)), 200
+
+
+# spend on one brain (owner + collaborators can look)
+@bp.route("/brain/<brain_id>/usage", methods=["GET"])
+@jwt_required()
+def brain_usage(brain_id):
+    # same owner / collaborator rule as every other /brain/<id> route
+    if not _brain_for_user(brain_id, _user_id()):
+        return jsonify({"error": "brain not found"}), 404
+    try:
+        group_by, days = _rollup_args()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(usage_ledger.rollup(group_by, brain_id=brain_id, days=days)), 200
+
+
+# admin: everyone, ?group_by=user to find who is burning budget (optional ?user_id= / ?brain_id=)
+@bp.route("/usage", methods=["GET"])
+@jwt_required()
+@admin_required
+def all_usage():
+    try:
+        group_by, days = _rollup_args()
+        user_id = request.args.get("user_id")
+        user_id = int(user_id) if user_id else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    brain_id = request.args.get("brain_id") or None
+    return jsonify(usage_ledger.rollup(group_by, user_id=user_id, brain_id=brain_id, days=days)), 200
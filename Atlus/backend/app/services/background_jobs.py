@@ -0,0 +1,102 @@
+"""Work that outlives its request (uploads and job resumes on Postgres): a bounded pool per process, drained at shutdown.
+
+The upload routes used to start one bare daemon thread per upload. Nothing capped them, and on
+a restart they died mid-chunk; the job only showed as resumable INGEST_STALE_SECONDS later.
+submit() queues the same work for INGEST_BACKGROUND_THREADS threads instead and counts it until
+it finishes.
+
+Shutdown (gunicorn.conf.py wires this to SIGTERM and worker exit):
+
+    begin_drain(seconds)   running jobs get `seconds` to finish; after that stopping() is True
+    drain(timeout)         wait until everything submitted has finished
+
+node_generation checks stopping() before each commit batch of a checkpointed job and raises
+Interrupted. The job then ends on its last checkpoint, marked failed with "interrupted by server
+shutdown". The next worker (or the new deploy) can resume it right away instead of waiting out
+the stale timeout. The threads are daemons, so a plain `python run.py` still exits at once: its
+jobs are left as a crash leaves them.
+"""
+import logging
+import queue
+import threading
+from typing import Callable, List
+
+from flask import current_app
+
+log = logging.getLogger(__name__)
+
+DEFAULT_THREADS = 4
+
+
+class Interrupted(Exception):
+    """Raised inside a checkpointed job once the server is shutting down."""
+
+
+_queue: "queue.Queue[Callable[[], None]]" = queue.Queue()
+_threads: List[threading.Thread] = []
+_cond = threading.Condition()
+_inflight = 0  # queued + running
+_stop = threading.Event()
+
+
+def _threads_wanted() -> int:
+    try:
+        return max(1, int(current_app.config.get("INGEST_BACKGROUND_THREADS") or DEFAULT_THREADS))
+    except (RuntimeError, TypeError, ValueError):
+        return DEFAULT_THREADS
+
+
+def _worker() -> None:
+    global _inflight
+    while True:
+        fn = _queue.get()
+        try:
+            fn()
+        except Exception:
+            log.exception("background job %s failed", getattr(fn, "__name__", fn))
+        finally:
+            with _cond:
+                _inflight -= 1
+                _cond.notify_all()
+
+
+def submit(fn: Callable[[], None]) -> None:
+    """Run fn() on the background pool. fn sets up its own app context, like a thread target."""
+    global _inflight
+    wanted = _threads_wanted()
+    with _cond:
+        _inflight += 1
+        _threads[:] = [t for t in _threads if t.is_alive()]  # a forked worker starts with none
+        while len(_threads) < wanted:
+            t = threading.Thread(target=_worker, name=f"ingest-bg-{len(_threads)}", daemon=True)
+            t.start()
+            _threads.append(t)
+    _queue.put(fn)
+
+
+def inflight() -> int:
+    with _cond:
+        return _inflight
+
+
+def stopping() -> bool:
+    return _stop.is_set()
+
+
+def begin_drain(seconds: float) -> None:
+    """Shutdown started: after `seconds`, checkpointed jobs stop at their next batch."""
+    if seconds <= 0:
+        _stop.set()
+        return
+    timer = threading.Timer(seconds, _stop.set)
+    timer.daemon = True
+    timer.start()
+
+
+def drain(timeout: float) -> bool:
+    """Wait up to `timeout` seconds for submitted work to finish; True if it all did."""
+    with _cond:
+        done = _cond.wait_for(lambda: _inflight == 0, timeout=timeout)
+    if not done:
+        log.warning("%d background job(s) still running at shutdown", inflight())
+    return done
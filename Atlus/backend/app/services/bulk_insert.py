@@ -0,0 +1,45 @@
+"""Batched Core INSERTs for the hot write paths (ingested chunks, syllabus deadlines)."""
+from typing import Any, Dict, List
+
+from flask import current_app
+
+from app.extensions import db
+
+DEFAULT_BATCH_SIZE = 500
+
+
+def _batch_size(batch_size: int | None) -> int:
+    if batch_size is None:
+        try:
+            batch_size = int(current_app.config.get("BULK_INSERT_BATCH_SIZE") or DEFAULT_BATCH_SIZE)
+        except (RuntimeError, TypeError, ValueError):
+            batch_size = DEFAULT_BATCH_SIZE
+    return max(1, int(batch_size))
+
+
+def bulk_insert_rows(model, rows: List[Dict[str, Any]], batch_size: int | None = None) -> int:
+    """executemany one slice at a time — skips the ORM unit of work. Caller owns the commit.
+
+    Every dict must carry the same keys (executemany binds one parameter set per statement);
+    columns left out get their Core / server defaults just like a normal INSERT. No flush happens
+    here, so the touched brains' change versions (and note counts) are bumped by hand.
+    """
+    if not rows:
+        return 0
+    size = _batch_size(batch_size)
+    stmt = model.__table__.insert()
+    for start in range(0, len(rows), size):
+        db.session.execute(stmt, rows[start : start + size])
+    if "brain_id" in model.__table__.c:
+        from app.services import change_versions
+
+        brain_ids = {r["brain_id"] for r in rows if r.get("brain_id")}
+        scope_fns = [change_versions.brain_scope]
+        if model.__tablename__ == "calendar_events":
+            scope_fns.append(change_versions.calendar_scope)
+        change_versions.bump(*(fn(b) for b in brain_ids for fn in scope_fns))
+    if model.__tablename__ == "nodes":
+        from app.services import note_stats
+
+        note_stats.record_bulk(rows)
+    return len(rows)
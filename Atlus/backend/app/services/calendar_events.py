@@ -0,0 +1,121 @@
+"""Multi-brain calendar reads: one joined query, plus a small in-process cache of the upcoming window.
+
+The merged calendar and the planner bot both want "every event in these brains between A and B,
+with the class label". That used to be an IN query, a second query for brain names and a third for
+course profiles. Now it is one query that walks ix_calendar_events_brain_due (brain_id, due_at).
+
+upcoming() also keeps the result for a wide window around today (WINDOW_BEFORE .. WINDOW_AFTER)
+per set of brains. Any request that fits inside that window is filtered in memory. Entries are
+checked against the brains' "calendar:<id>" change versions on every hit, so a write from any worker
+process invalidates them. Requests with no date range, or one outside the window, go to the database.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.extensions import db
+from app.models.brain import Brain, CalendarEvent, CourseProfile
+from app.services import change_versions
+
+WINDOW_BEFORE = timedelta(days=45)  # last month's grid on the calendar page
+WINDOW_AFTER = timedelta(days=120)  # rest of the term
+MAX_AGE_S = 15 * 60  # re-centre the window on "now" at least this often
+MAX_ENTRIES = 256
+
+# data is event_to_json(e); due_at is tz-aware UTC for in-memory range checks
+EventRow = namedtuple("EventRow", "data due_at brain_name class_number")
+
+_cache: "OrderedDict[tuple, tuple]" = OrderedDict()  # brain ids -> (versions, lo, hi, loaded_at, rows)
+_lock = threading.Lock()
+
+
+def event_to_json(e: CalendarEvent):
+    return {
+        "id": e.id,
+        "brain_id": e.brain_id,
+        "source_file_id": e.source_file_id,
+        "title": e.title,
+        "event_type": e.event_type,
+        "due_at": e.due_at.isoformat() if e.due_at else None,
+        "course_label": e.course_label,
+        "confidence": e.confidence,
+        "notes": e.notes,
+        "created_at": e.created_at.isoformat() if e.created_at else None,
+        "updated_at": e.updated_at.isoformat() if e.updated_at else None,
+    }
+
+
+def _utc(dt):
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        return dt.replace(tzinfo=timezone.utc)  # sqlite hands back naive UTC
+    return dt.astimezone(timezone.utc)
+
+
+def query(brain_ids, start=None, end=None, event_type=None):
+    """Events in these brains (optionally within [start, end] / of one type), oldest first, labelled."""
+    brain_ids = list(brain_ids)
+    if not brain_ids:
+        return []
+    stmt = (
+        select(CalendarEvent, Brain.name, CourseProfile.class_number)
+        .join(Brain, Brain.id == CalendarEvent.brain_id)
+        .outerjoin(CourseProfile, CourseProfile.brain_id == CalendarEvent.brain_id)
+        .where(CalendarEvent.brain_id.in_(brain_ids))
+    )
+    if start:
+        stmt = stmt.where(CalendarEvent.due_at >= start)
+    if end:
+        stmt = stmt.where(CalendarEvent.due_at <= end)
+    if event_type:
+        stmt = stmt.where(CalendarEvent.event_type == event_type)
+    stmt = stmt.order_by(CalendarEvent.due_at.asc(), CalendarEvent.id.asc())
+    return [
+        EventRow(event_to_json(e), _utc(e.due_at), name or "", class_number)
+        for e, name, class_number in db.session.execute(stmt).all()
+    ]
+
+
+def upcoming(brain_ids, start, end, event_type=None):
+    """query() for a bounded range, answered from the cached window around today when it fits."""
+    key = tuple(sorted(set(brain_ids)))
+    if not key:
+        return []
+    start, end = _utc(start), _utc(end)
+    now = datetime.now(timezone.utc)
+    if start is None or end is None or start < now - WINDOW_BEFORE or end > now + WINDOW_AFTER:
+        return query(key, start, end, event_type)
+
+    versions = change_versions.versions(change_versions.calendar_scope(b) for b in key)
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None:
+            _cache.move_to_end(key)
+    if (
+        entry is None
+        or entry[0] != versions
+        or time.monotonic() - entry[3] > MAX_AGE_S
+        or start < entry[1]
+        or end > entry[2]
+    ):
+        lo, hi = now - WINDOW_BEFORE - timedelta(days=1), now + WINDOW_AFTER + timedelta(days=1)
+        entry = (versions, lo, hi, time.monotonic(), query(key, lo, hi))
+        with _lock:
+            _cache[key] = entry
+            _cache.move_to_end(key)
+            while len(_cache) > MAX_ENTRIES:
+                _cache.popitem(last=False)
+    return [
+        r
+        for r in entry[4]
+        if start <= r.due_at <= end and (not event_type or r.data["event_type"] == event_type)
+    ]
+
+
+def clear() -> None:
+    with _lock:
+        _cache.clear()
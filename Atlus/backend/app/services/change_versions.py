@@ -0,0 +1,167 @@
+"""Per-brain / per-user write counters and the ETags built from them.
+
+Every ORM flush that touches a brain's rows bumps "brain:<id>" in data_versions (same transaction,
+so a reader never sees new rows with an old version); account-level rows bump "user:<id>", and
+calendar events / course profiles / brain names also bump "calendar:<id>". Bulk Core writes that
+skip the unit of work call bump() themselves (bulk_insert_rows does).
+
+A polled GET hashes the versions of the scopes it reads into a weak ETag, so answering
+If-None-Match costs one small IN query instead of the listing + serialization:
+
+    etag, unchanged = change_versions.check(change_versions.brain_scope(brain_id))
+    if unchanged:
+        return unchanged
+    ...
+    return change_versions.tagged(jsonify(payload), etag), 200
+"""
+import hashlib
+import logging
+
+from flask import current_app, make_response, request
+from sqlalchemy import event, select, union
+from sqlalchemy.orm import Session
+
+from app.extensions import db
+from app.models.brain import Brain, BrainCollaborator, CalendarEvent, CourseProfile, IngestionJob, Node, SourceFile
+from app.models.user import User
+from app.models.version import DataVersion
+
+log = logging.getLogger(__name__)
+
+# rows that hang off a brain: any write moves the brain's version
+_BRAIN_CHILDREN = (Node, SourceFile, CalendarEvent, CourseProfile, IngestionJob)
+
+_installed = False
+
+
+def brain_scope(brain_id) -> str:
+    return f"brain:{brain_id}"
+
+
+def user_scope(user_id) -> str:
+    return f"user:{user_id}"
+
+
+def calendar_scope(brain_id) -> str:
+    """Narrower than brain_scope: only what the calendar shows (events + the brain / profile labels)."""
+    return f"calendar:{brain_id}"
+
+
+def _scopes_for(obj) -> set:
+    if isinstance(obj, (CalendarEvent, CourseProfile)):
+        return {brain_scope(obj.brain_id), calendar_scope(obj.brain_id)} if obj.brain_id else set()
+    if isinstance(obj, _BRAIN_CHILDREN):
+        return {brain_scope(obj.brain_id)} if obj.brain_id else set()
+    if isinstance(obj, Brain):
+        return {brain_scope(obj.id), calendar_scope(obj.id), user_scope(obj.user_id)}
+    if isinstance(obj, BrainCollaborator):
+        return {brain_scope(obj.brain_id), user_scope(obj.user_id)}
+    if isinstance(obj, User):
+        return {user_scope(obj.id)}
+    return set()
+
+
+def _bump_on(conn, scopes) -> None:
+    scopes = sorted(s for s in scopes if s)
+    if not scopes:
+        return
+    table = DataVersion.__table__
+    dialect = conn.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.scope], set_={"version": table.c.version + 1}
+        )
+        conn.execute(stmt, [{"scope": s, "version": 1} for s in scopes])
+        return
+    for s in scopes:
+        res = conn.execute(
+            table.update().where(table.c.scope == s).values(version=table.c.version + 1)
+        )
+        if not res.rowcount:
+            conn.execute(table.insert().values(scope=s, version=1))
+
+
+def _after_flush(session, flush_context):
+    scopes = set()
+    for obj in session.new:
+        scopes |= _scopes_for(obj)
+    for obj in session.deleted:
+        scopes |= _scopes_for(obj)
+    for obj in session.dirty:
+        if session.is_modified(obj, include_collections=False):
+            scopes |= _scopes_for(obj)
+    if scopes:
+        _bump_on(session.connection(), scopes)
+
+
+def bump(*scopes) -> None:
+    """Move these scopes' versions inside the current db.session transaction (caller commits)."""
+    _bump_on(db.session.connection(), scopes)
+
+
+def versions(scopes) -> dict:
+    """{scope: version} for the given scopes (0 for never written)."""
+    scopes = sorted(set(scopes))
+    if not scopes:
+        return {}
+    rows = dict(
+        db.session.execute(
+            select(DataVersion.scope, DataVersion.version).where(DataVersion.scope.in_(scopes))
+        ).all()
+    )
+    return {s: rows.get(s, 0) for s in scopes}
+
+
+def user_scopes(user_id) -> list:
+    """The account scope plus every brain the user owns or collaborates on."""
+    owned = select(Brain.id).where(Brain.user_id == user_id)
+    shared = select(BrainCollaborator.brain_id).where(BrainCollaborator.user_id == user_id)
+    ids = db.session.execute(union(owned, shared)).scalars().all()
+    return [user_scope(user_id)] + sorted(brain_scope(i) for i in ids)
+
+
+def etag_for(scopes) -> str:
+    """Hash of what this URL returns for this caller: path + query + identity + scope versions."""
+    from flask_jwt_extended import get_jwt_identity
+
+    parts = [
+        request.endpoint or "",
+        request.full_path,
+        str(get_jwt_identity()),
+        *(f"{s}={v}" for s, v in versions(scopes).items()),
+    ]
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()[:32]
+
+
+def check(*scopes):
+    """(etag, 304 response or None). etag is None when ETags are switched off."""
+    if not current_app.config.get("HTTP_ETAGS", True):
+        return None, None
+    flat = []
+    for s in scopes:
+        flat.extend([s] if isinstance(s, str) else s)
+    etag = etag_for(flat)
+    if request.if_none_match.contains_weak(etag):
+        return etag, tagged(make_response("", 304), etag)
+    return etag, None
+
+
+def tagged(resp, etag):
+    """Attach the validator; browsers keep the body but ask again every time (no-cache)."""
+    if etag:
+        resp.set_etag(etag, weak=True)
+        resp.cache_control.private = True
+        resp.cache_control.no_cache = True
+    return resp
+
+
+def init_app(app) -> None:
+    global _installed
+    if not _installed:
+        event.listen(Session, "after_flush", _after_flush)
+        _installed = True
@@ -3,6 +3,8 @@ import re
 from dataclasses import dataclass
 from typing import List
 
+from app.services.stage_timing import span
+
 
 @dataclass
 class Chunk:
@@ -32,6 +34,7 @@ def _is_likely_header(line: str) -> bool:
     return False
 
 
+@span("chunk")
 def chunk_by_sections(text: str, max_chunk_chars: int = 2000, overlap: int = 100) -> List[Chunk]:
     """Prefer breaks at headers; fall back to fixed-size slices with trailing overlap for context."""
     if not text or not text.strip():
@@ -1,15 +1,12 @@
 """Word docs → plain text."""
 import io
 
-try:
-    from docx import Document
-except ImportError:
-    Document = None
-
 
 def extract_text_from_docx(file_stream) -> str:
     """Paragraphs + table cells, joined."""
-    if Document is None:
+    try:
+        from docx import Document  # lxml-heavy: load on the first .docx, not at app start
+    except ImportError:
         raise RuntimeError("python-docx required for DOCX extraction. pip install python-docx")
 
     doc = Document(file_stream)
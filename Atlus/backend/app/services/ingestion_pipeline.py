@@ -1,19 +1,30 @@
-"""Wire up PDF/text uploads: extract, chunk, then node generation + vectors + DB."""
+"""Wire up PDF/text/audio uploads: extract (or transcribe), chunk, then node generation + vectors + DB."""
+import contextvars
 import io
+import logging
+import multiprocessing
+import threading
 import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import List
+from typing import List, Union
 
 from flask import current_app
+from sqlalchemy import and_, or_
 from werkzeug.datastructures import FileStorage
 
 from app.extensions import db
-from app.models.brain import SourceFile
+from app.models.brain import IngestionJob, SourceFile
 from app.services.pdf_extractor import extract_text_from_pdf, extract_text_from_pdf_fitz
 from app.services.docx_extractor import extract_text_from_docx
 from app.services.pptx_extractor import extract_text_from_pptx
 from app.services.chunker import chunk_by_sections
 from app.services.node_generation import generate_and_store_nodes
+from app.services.llm_governor import BACKGROUND, llm_lane
+from app.services.stage_timing import StageTimings, collect, merge_summaries, replay, span
+from app.services.usage_ledger import attribute
 
 
 ALLOWED_EXTENSIONS = {
@@ -31,12 +42,31 @@ ALLOWED_EXTENSIONS = {
     "bmp",
     "tif",
     "tiff",
+    "mp3",
+    "m4a",
+    "wav",
+    "webm",
+    "ogg",
+    "oga",
+    "flac",
+    "mp4",
+    "mpeg",
+    "mpga",
 }
 PDF_EXT = {"pdf"}
 TEXT_EXT = {"txt", "md", "markdown"}
 DOCX_EXT = {"docx"}
 PPTX_EXT = {"pptx"}
 IMAGE_EXT = {"jpg", "jpeg", "png", "webp", "gif", "bmp", "tif", "tiff"}
+# a request body buffered in memory, or a finalized resumable upload read where it sits (upload_sessions)
+FileData = Union[bytes, Path]
+
+AUDIO_EXT = {"mp3", "m4a", "wav", "webm", "ogg", "oga", "flac", "mp4", "mpeg", "mpga"}
+
+log = logging.getLogger(__name__)
+
+_extract_pool = None
+_extract_pool_lock = threading.Lock()
 
 
 def _file_type(extension: str) -> str:
@@ -48,6 +78,8 @@ def _file_type(extension: str) -> str:
         return "pptx"
     if extension in IMAGE_EXT:
         return "image"
+    if extension in AUDIO_EXT:
+        return "audio"
     if extension in TEXT_EXT:
         return "text" if extension == "txt" else "markdown"
     return "text"
@@ -87,133 +119,418 @@ def _ensure_source_file(brain_id: str, filename: str, file_type: str) -> SourceF
         storage_path=None,
     )
     db.session.add(sf)
-    db.session.flush()  # need source_files.id for nodes
+    db.session.commit()  # need source_files.id for nodes; dont hold the write lock through extraction
     return sf
 
 
+def _chunk_dicts(text: str, source_file_id: int | None) -> List[dict]:
+    return [
+        {
+            "text": c.text,
+            "section_title": c.section_title,
+            "source_file_id": source_file_id,
+        }
+        for c in chunk_by_sections(text)
+    ]
+
+
+@span("job_checkpoint")
+def _start_job(brain_id: str, user_id: int, source_file: SourceFile, filename: str, text: str, total: int) -> IngestionJob:
+    """Checkpoint row + extracted text on disk, so a crash mid-LLM can pick up where it stopped."""
+    job_id = str(uuid.uuid4())
+    jobs_dir = _upload_root() / brain_id / "jobs"
+    jobs_dir.mkdir(parents=True, exist_ok=True)
+    (jobs_dir / f"{job_id}.txt").write_text(text, encoding="utf-8")
+    job = IngestionJob(
+        id=job_id,
+        brain_id=brain_id,
+        user_id=user_id,
+        source_file_id=source_file.id,
+        filename=filename[:512],
+        status="pending",
+        total_chunks=total,
+        done_chunks=0,
+        nodes_created=0,
+        text_path=f"{brain_id}/jobs/{job_id}.txt",
+    )
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def _node_type(file_type: str | None) -> str | None:
+    return "lecture" if file_type == "audio" else None
+
+
+def _run_job(job: IngestionJob, chunk_dicts: List[dict], timings: StageTimings, node_type: str | None = None) -> dict:
+    """Chunks → nodes for one job; the stage timings collected so far are saved on the row."""
+    prior_timings = job.timings
+    job.status = "running"
+    job.error = None
+    db.session.commit()
+    try:
+        result = generate_and_store_nodes(
+            brain_id=job.brain_id,
+            user_id=job.user_id,
+            chunks=chunk_dicts,
+            source_file_id=job.source_file_id,
+            node_type=node_type,
+            job=job,
+        )
+    except Exception as e:
+        db.session.rollback()
+        job = IngestionJob.query.get(job.id)
+        if job is not None:
+            job.status = "failed"
+            job.error = str(e)[:2000]
+            job.timings = merge_summaries(prior_timings, timings.summary())
+            db.session.commit()
+        raise
+    job.status = "done"
+    job.timings = merge_summaries(prior_timings, timings.summary())
+    if job.text_path:
+        try:
+            (_upload_root() / job.text_path).unlink()
+        except OSError:
+            pass
+        job.text_path = None
+    db.session.commit()
+    return result
+
+
+def _stale_seconds() -> int:
+    return int(current_app.config.get("INGEST_STALE_SECONDS") or 600)
+
+
+def _is_resumable(job: IngestionJob) -> bool:
+    if job.status == "failed":
+        return bool(job.text_path)
+    if job.status in ("pending", "running"):
+        # no heartbeat for a while means the worker that owned it died
+        stale = _stale_seconds()
+        ts = job.updated_at or job.created_at
+        if ts is None:
+            return True
+        if ts.tzinfo is None:
+            ts = ts.replace(tzinfo=timezone.utc)
+        return (datetime.now(timezone.utc) - ts).total_seconds() > stale
+    return False
+
+
+def resumable_jobs(brain_id: str) -> List[IngestionJob]:
+    jobs = (
+        IngestionJob.query.filter_by(brain_id=brain_id)
+        .filter(IngestionJob.status.in_(("pending", "running", "failed")))
+        .order_by(IngestionJob.created_at.asc())
+        .all()
+    )
+    return [j for j in jobs if _is_resumable(j)]
+
+
+def _claim(job: IngestionJob) -> bool:
+    """Mark the job running if it's still resumable; False when another resume got there first.
+
+    One conditional UPDATE, so of two concurrent resumes (two tabs, two workers) exactly one
+    continues the job; the other would write the same chunks again as duplicate nodes.
+    """
+    t = IngestionJob.__table__
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=_stale_seconds())
+    claimed = db.session.execute(
+        t.update()
+        .where(
+            t.c.id == job.id,
+            or_(
+                t.c.status == "failed",
+                and_(t.c.status.in_(("pending", "running")), or_(t.c.updated_at.is_(None), t.c.updated_at < cutoff)),
+            ),
+        )
+        .values(status="running", error=None, updated_at=datetime.now(timezone.utc))
+    ).rowcount
+    db.session.commit()
+    return claimed == 1
+
+
+def resume_ingestion_job(job_id: str) -> dict:
+    """Re-chunk the saved text (chunking is deterministic) and continue after job.done_chunks."""
+    job = IngestionJob.query.get(job_id)
+    if job is None:
+        raise ValueError("ingestion job not found")
+    if job.status == "done":
+        return {"nodes_created": 0, "links_created": 0, "errors": []}
+    if not _is_resumable(job) or not _claim(job):
+        # still running, or another resume claimed it between resumable_jobs() and here
+        log.info("ingestion job %s is running elsewhere; skipping", job_id)
+        return {"nodes_created": 0, "links_created": 0, "errors": []}
+    path = _upload_root() / job.text_path if job.text_path else None
+    if path is None or not path.is_file():
+        job.status = "failed"
+        job.error = "extracted text is gone; re-upload the file"
+        db.session.commit()
+        raise ValueError(job.error)
+    text = path.read_text(encoding="utf-8")
+    source_file = SourceFile.query.get(job.source_file_id) if job.source_file_id else None
+    node_type = _node_type(source_file.file_type if source_file else None)
+    try:
+        with collect() as timings, attribute(user_id=job.user_id, brain_id=job.brain_id, feature="ingest_resume"):
+            result = _run_job(job, _chunk_dicts(text, job.source_file_id), timings, node_type)
+    except Exception as e:
+        return {"nodes_created": 0, "links_created": 0, "errors": [f"{job.filename}: {e}"]}
+    return {
+        "nodes_created": result.get("nodes_created", 0),
+        "links_created": result.get("links_created", 0),
+        "errors": [],
+    }
+
+
+def resume_brain_ingestion(brain_id: str) -> dict:
+    """Resume every crashed / failed job for a brain, oldest first."""
+    total_nodes = 0
+    errors = []
+    with llm_lane(BACKGROUND):
+        for job in resumable_jobs(brain_id):
+            out = resume_ingestion_job(job.id)
+            total_nodes += out.get("nodes_created", 0)
+            errors.extend(out.get("errors", []))
+    return {"nodes_created": total_nodes, "links_created": 0, "errors": errors}
+
+
 def process_creation_files(brain_id: str, user_id: int, files: List) -> dict:
     """Same as ingest_documents — used from the “create brain + files” path."""
     return ingest_documents(brain_id, user_id, files)
 
 
+def _read_upload(file) -> FileData:
+    if isinstance(getattr(file, "path", None), Path):
+        return file.path
+    if hasattr(file, "stream") and file.stream is not None:
+        try:
+            file.stream.seek(0)
+        except (OSError, ValueError, AttributeError):
+            pass
+        return file.stream.read()
+    return file.read()
+
+
+def _as_bytes(data: FileData) -> bytes:
+    return data.read_bytes() if isinstance(data, Path) else data
+
+
+def extract_document_text(ft: str, data: FileData) -> str:
+    """Text layer only (PyPDF2 → PyMuPDF, docx, pptx, utf-8). CPU-bound and picklable, so it can run in the process pool.
+
+    A Path is opened by the extractors themselves, so only its name crosses to the worker process.
+    """
+    src = str(data) if isinstance(data, Path) else io.BytesIO(data)
+    if ft == "pdf":
+        text = extract_text_from_pdf(src)
+        if not text.strip():
+            text = extract_text_from_pdf_fitz(data)
+        return text
+    if ft == "docx":
+        with span("docx_text"):
+            return extract_text_from_docx(src)
+    if ft == "pptx":
+        with span("pptx_text"):
+            return extract_text_from_pptx(src)
+    return _as_bytes(data).decode("utf-8", errors="replace")
+
+
+def _extract_with_timings(ft: str, data: FileData):
+    """extract_document_text in a worker process; its spans ride back with the text."""
+    with collect() as timings:
+        text = extract_document_text(ft, data)
+    return text, timings.events()
+
+
+def _get_extract_pool():
+    global _extract_pool
+    try:
+        workers = int(current_app.config.get("INGEST_EXTRACT_PROCESSES") or 0)
+    except (TypeError, ValueError):
+        workers = 0
+    if workers <= 0:
+        return None
+    with _extract_pool_lock:
+        if _extract_pool is None:
+            # spawn, not fork: we fork from a threaded web process
+            _extract_pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return _extract_pool
+
+
+@span("extract")
+def _extract_text(ft: str, data: FileData) -> str:
+    global _extract_pool
+    pool = _get_extract_pool() if ft in ("pdf", "docx", "pptx") else None
+    if pool is None:
+        return extract_document_text(ft, data)
+    try:
+        text, events = pool.submit(_extract_with_timings, ft, data).result()
+        replay(events)
+        return text
+    except BrokenProcessPool:
+        log.warning("extraction process pool died; extracting in-process")
+        with _extract_pool_lock:
+            _extract_pool = None
+        return extract_document_text(ft, data)
+
+
+def _ingest_image(brain_id: str, user_id: int, filename: str, ext: str, data: FileData) -> dict:
+    data = _as_bytes(data)
+    with span("save_image"):
+        sf = _persist_image_on_disk(brain_id, filename or "scan.png", ext, data)
+    bio = io.BytesIO(data)
+    bio.seek(0)
+    fs = FileStorage(stream=bio, filename=filename or "upload.png")
+    from app.services.ocr_service import run_ocr_to_markdown
+
+    with span("ocr_image"):
+        ocr_out = run_ocr_to_markdown(fs)
+    md = (ocr_out.get("markdown") or "").strip()
+    if not md:
+        return {"nodes_created": 0, "links_created": 0, "errors": [f"No text extracted from image: {filename}"]}
+    result = generate_and_store_nodes(
+        brain_id=brain_id,
+        user_id=user_id,
+        markdown=md,
+        source_file_id=sf.id,
+        node_type="handwritten",
+    )
+    return {**result, "errors": []}
+
+
+def _ingest_one_file(brain_id: str, user_id: int, filename: str, data: FileData) -> dict:
+    """One upload start to finish; any failure lands in this file's errors, never a sibling's."""
+    with collect() as timings:
+        out = _ingest_one_file_timed(brain_id, user_id, filename, data, timings)
+    return {**out, "filename": filename, "timings": timings.summary()}
+
+
+def _ingest_one_file_timed(brain_id: str, user_id: int, filename: str, data: FileData, timings: StageTimings) -> dict:
+    ext = (filename.split(".")[-1] or "").lower()
+    ft = _file_type(ext)
+    if not (data.stat().st_size if isinstance(data, Path) else data):
+        return {"nodes_created": 0, "links_created": 0, "errors": [f"Empty file: {filename}"]}
+    try:
+        if ft == "image":
+            return _ingest_image(brain_id, user_id, filename, ext, data)
+
+        source_file = _ensure_source_file(brain_id, filename, ft)
+        if ft == "audio":
+            from app.services.transcription import transcribe
+
+            # transcript sections ("## Lecture 0:05:00 - 0:10:00") become the chunk titles
+            with span("transcribe"):
+                text = transcribe(data, filename).markdown()
+        else:
+            text = _extract_text(ft, data)
+        if ft == "pdf" and not text.strip():
+            from app.services.ocr_service import ocr_scanned_pdf_to_plain_text
+
+            with span("ocr_pdf"):
+                text = ocr_scanned_pdf_to_plain_text(_as_bytes(data))
+        if not text.strip():
+            if ft == "audio":
+                msg = f"No speech found in recording: {filename}"
+            elif ft == "pdf":
+                msg = (
+                    f"No extractable text in PDF (often a scan): {filename}. "
+                    "Install pymupdf (`pip install pymupdf`), set OPENAI_API_KEY for vision OCR, "
+                    "or rely on EasyOCR for local page OCR."
+                )
+            else:
+                msg = f"Empty or unreadable: {filename}"
+            return {"nodes_created": 0, "links_created": 0, "errors": [msg]}
+
+        chunk_dicts = _chunk_dicts(text, source_file.id)
+        job = _start_job(brain_id, user_id, source_file, filename, text, len(chunk_dicts))
+        result = _run_job(job, chunk_dicts, timings, _node_type(ft))
+        return {**result, "errors": []}
+    except Exception as e:
+        try:
+            db.session.rollback()
+        except Exception:
+            pass
+        return {"nodes_created": 0, "links_created": 0, "errors": [f"{filename}: {e}"]}
+
+
+def _ingest_one_file_in_app(app, brain_id: str, user_id: int, filename: str, data: FileData) -> dict:
+    # each worker thread gets its own app context -> its own scoped db session
+    with app.app_context():
+        return _ingest_one_file(brain_id, user_id, filename, data)
+
+
 def ingest_documents(brain_id: str, user_id: int, files: List) -> dict:
-    """PDFs/docs → chunks; photos (jpg/png/…) → OCR + one handwritten node with the file saved."""
+    """PDFs/docs → chunks; photos (jpg/png/…) → OCR + one handwritten node with the file saved;
+    recordings (mp3/m4a/wav/…) → transcription.transcribe → lecture nodes, one or more per ~5 minutes.
+
+    Files run side by side (INGEST_FILE_WORKERS threads): text-layer extraction goes to a shared
+    process pool and chunk → LLM calls share node_generation's pool, so one slow scanned PDF
+    no longer holds up the rest of the upload.
+
+    "timings" has the per-stage breakdown for the whole upload and for each file (stage totals
+    add up across files running in parallel, so compare them with wall_ms, not with each other).
+    """
     try:
         db.session.rollback()
     except Exception:
         pass
-    total_nodes = 0
-    total_links = 0
-    errors = []
-
-    for file in files:
-        if not file or not file.filename:
-            continue
-        ext = (file.filename.split(".")[-1] or "").lower()
-        if ext not in ALLOWED_EXTENSIONS:
-            errors.append(f"Unsupported format: {file.filename}")
-            continue
 
-        ft = _file_type(ext)
-        if ft == "image":
+    with collect() as timings, attribute(user_id=user_id, brain_id=brain_id, feature="ingest"):
+        # slot per file so errors come back in upload order no matter which file finishes first
+        slots = []
+        for file in files:
+            if not file or not file.filename:
+                continue
+            ext = (file.filename.split(".")[-1] or "").lower()
+            if ext not in ALLOWED_EXTENSIONS:
+                slots.append({"nodes_created": 0, "links_created": 0, "errors": [f"Unsupported format: {file.filename}"]})
+                continue
             try:
-                data = file.read()
-                if not data:
-                    errors.append(f"Empty file: {file.filename}")
-                    continue
-                sf = _persist_image_on_disk(brain_id, file.filename or "scan.png", ext, data)
-                bio = io.BytesIO(data)
-                bio.seek(0)
-                fs = FileStorage(stream=bio, filename=file.filename or "upload.png")
-                from app.services.ocr_service import run_ocr_to_markdown
-
-                ocr_out = run_ocr_to_markdown(fs)
-                md = (ocr_out.get("markdown") or "").strip()
-                if not md:
-                    errors.append(f"No text extracted from image: {file.filename}")
-                    continue
-                result = generate_and_store_nodes(
-                    brain_id=brain_id,
-                    user_id=user_id,
-                    markdown=md,
-                    source_file_id=sf.id,
-                    node_type="handwritten",
-                )
-                total_nodes += result.get("nodes_created", 0)
-                total_links += result.get("links_created", 0)
+                with span("read_upload"):
+                    slots.append((file.filename, _read_upload(file)))
             except Exception as e:
-                errors.append(f"{file.filename}: {e}")
-            continue
+                slots.append({"nodes_created": 0, "links_created": 0, "errors": [f"{file.filename}: {e}"]})
 
+        work = [i for i, s in enumerate(slots) if isinstance(s, tuple)]
         try:
-            if ft == "pdf":
-                if hasattr(file, "stream") and file.stream is not None:
-                    try:
-                        file.stream.seek(0)
-                    except (OSError, ValueError, AttributeError):
-                        pass
-                    pdf_bytes = file.stream.read()
-                else:
-                    pdf_bytes = file.read()
-                if not pdf_bytes:
-                    errors.append(f"Empty file: {file.filename}")
-                    continue
-                source_file = _ensure_source_file(brain_id, file.filename, ft)
-                text = extract_text_from_pdf(io.BytesIO(pdf_bytes))
-                if not text.strip():
-                    text = extract_text_from_pdf_fitz(pdf_bytes)
-                if not text.strip():
-                    from app.services.ocr_service import ocr_scanned_pdf_to_plain_text
-
-                    text = ocr_scanned_pdf_to_plain_text(pdf_bytes)
-                if not text.strip():
-                    errors.append(
-                        f"No extractable text in PDF (often a scan): {file.filename}. "
-                        "Install pymupdf (`pip install pymupdf`), set OPENAI_API_KEY for vision OCR, "
-                        "or rely on EasyOCR for local page OCR."
-                    )
-                    continue
-            else:
-                if hasattr(file, "stream") and file.stream is not None:
-                    try:
-                        file.stream.seek(0)
-                    except (OSError, ValueError, AttributeError):
-                        pass
-                source_file = _ensure_source_file(brain_id, file.filename, ft)
-                if ft == "docx":
-                    text = extract_text_from_docx(file.stream)
-                elif ft == "pptx":
-                    text = extract_text_from_pptx(file.stream)
-                else:
-                    text = file.read().decode("utf-8", errors="replace")
-
-                if not text.strip():
-                    errors.append(f"Empty or unreadable: {file.filename}")
-                    continue
-
-            chunks = chunk_by_sections(text)
-            chunk_dicts = [
-                {
-                    "text": c.text,
-                    "section_title": c.section_title,
-                    "source_file_id": source_file.id,
-                }
-                for c in chunks
-            ]
-            result = generate_and_store_nodes(
-                brain_id=brain_id,
-                user_id=user_id,
-                chunks=chunk_dicts,
-                source_file_id=source_file.id,
-            )
-            total_nodes += result.get("nodes_created", 0)
-            total_links += result.get("links_created", 0)
-        except Exception as e:
-            errors.append(f"{file.filename}: {e}")
+            workers = int(current_app.config.get("INGEST_FILE_WORKERS") or 1)
+        except (TypeError, ValueError):
+            workers = 1
+        with llm_lane(BACKGROUND):
+            _run_file_slots(slots, work, workers, brain_id, user_id)
 
-    db.session.commit()
+        with span("db_commit"):
+            db.session.commit()
     return {
-        "nodes_created": total_nodes,
-        "links_created": total_links,
-        "errors": errors,
+        "nodes_created": sum(s.get("nodes_created", 0) for s in slots),
+        "links_created": sum(s.get("links_created", 0) for s in slots),
+        "errors": [err for s in slots for err in s.get("errors", [])],
+        "timings": {
+            "upload": timings.summary(),
+            "files": [{"filename": s["filename"], **s["timings"]} for s in slots if "timings" in s],
+        },
     }
+
+
+def _run_file_slots(slots: list, work: List[int], workers: int, brain_id: str, user_id: int) -> None:
+    if len(work) <= 1 or workers <= 1:
+        for i in work:
+            filename, data = slots[i]
+            slots[i] = _ingest_one_file(brain_id, user_id, filename, data)
+    else:
+        app = current_app._get_current_object()
+        with ThreadPoolExecutor(max_workers=min(workers, len(work)), thread_name_prefix="ingest-file") as pool:
+            futures = {
+                i: pool.submit(
+                    contextvars.copy_context().run,
+                    _ingest_one_file_in_app, app, brain_id, user_id, *slots[i],
+                )
+                for i in work
+            }
+            for i, fut in futures.items():
+                try:
+                    slots[i] = fut.result()
+                except Exception as e:
+                    slots[i] = {"nodes_created": 0, "links_created": 0, "errors": [f"{slots[i][0]}: {e}"]}
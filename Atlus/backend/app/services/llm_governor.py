@@ -0,0 +1,380 @@
+"""Token-bucket governor for OpenAI calls: requests/min + tokens/min per model, with priority lanes.
+
+Interactive work (/ask, the class assistant, OCR, audio) runs in the default "interactive" lane.
+Ingestion marks itself "background": it waits while any interactive caller is queued for the same
+model and never drains a bucket below ATLUS_OPENAI_INTERACTIVE_RESERVE, so a 500-chunk textbook
+can't starve a student's question into a 429.
+
+Set ATLUS_OPENAI_GOVERNOR_DB to a file path to share bucket levels between worker processes
+(SQLite, BEGIN IMMEDIATE per take). Queued-interactive preemption stays per-process there; the
+reserve rule still holds across processes.
+"""
+import asyncio
+import contextlib
+import contextvars
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Tuple
+
+INTERACTIVE = "interactive"
+BACKGROUND = "background"
+
+# OpenAI tier-1-ish defaults; override per deployment.
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200000
+
+_lane: contextvars.ContextVar[str] = contextvars.ContextVar("llm_lane", default=INTERACTIVE)
+
+
+@contextlib.contextmanager
+def llm_lane(name: str):
+    """Run the block (and anything submitted with a copied context) in the given lane."""
+    token = _lane.set(BACKGROUND if name == BACKGROUND else INTERACTIVE)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def current_lane() -> str:
+    return _lane.get()
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float((os.environ.get(name) or "").strip() or default)
+    except ValueError:
+        return default
+
+
+def _model_limits(model: str) -> Tuple[float, float]:
+    """(rpm, tpm) — ATLUS_OPENAI_MODEL_LIMITS="gpt-4o=500/30000,tts-1=50/0" overrides the defaults."""
+    rpm = _env_float("ATLUS_OPENAI_RPM", DEFAULT_RPM)
+    tpm = _env_float("ATLUS_OPENAI_TPM", DEFAULT_TPM)
+    for item in (os.environ.get("ATLUS_OPENAI_MODEL_LIMITS") or "").split(","):
+        name, _, spec = item.strip().partition("=")
+        if name.strip() != model or not spec:
+            continue
+        r, _, t = spec.partition("/")
+        try:
+            rpm = float(r)
+            if t:
+                tpm = float(t)
+        except ValueError:
+            pass
+    return rpm, tpm
+
+
+def estimate_tokens(messages: Iterable[dict] | None = None, max_tokens: int | None = None, text: str = "") -> int:
+    """~4 chars per token for prompt text, 1k per image (85 at detail=low), plus the completion budget."""
+    chars = len(text or "")
+    image_tokens = 0
+    for m in messages or []:
+        content = m.get("content")
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get("type") == "text":
+                    chars += len(part.get("text") or "")
+                elif part.get("type") == "image_url":
+                    detail = (part.get("image_url") or {}).get("detail")
+                    image_tokens += 85 if detail == "low" else 1000
+    return chars // 4 + image_tokens + int(max_tokens or 512)
+
+
+class TokenBucket:
+    """Continuous refill; capacity is one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.stamp = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def wait_for(self, amount: float, floor: float) -> float:
+        """Seconds until `amount` can be taken leaving at least `floor`; 0 if it fits now."""
+        if self.capacity <= 0:
+            return 0.0
+        need = min(amount, self.capacity - floor) + floor - self.level
+        return 0.0 if need <= 0 else need / self.rate
+
+
+class _Buckets:
+    def __init__(self, rpm: float, tpm: float):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.interactive_waiting = 0
+
+
+class LocalGovernor:
+    """In-process buckets guarded by one condition variable."""
+
+    def __init__(self, reserve: float):
+        self.reserve = reserve
+        self._cond = threading.Condition()
+        self._models: Dict[str, _Buckets] = {}
+
+    def _buckets(self, model: str) -> _Buckets:
+        b = self._models.get(model)
+        if b is None:
+            b = self._models[model] = _Buckets(*_model_limits(model))
+        return b
+
+    def _enter(self, model: str, background: bool) -> _Buckets:
+        with self._cond:
+            b = self._buckets(model)
+            if not background:
+                b.interactive_waiting += 1
+            return b
+
+    def _leave(self, b: _Buckets, background: bool) -> None:
+        if not background:
+            with self._cond:
+                b.interactive_waiting -= 1
+                self._cond.notify_all()
+
+    def _token_charge(self, b: _Buckets, tokens: int, background: bool) -> float:
+        """Tokens one call takes from the bucket: background never takes the interactive reserve."""
+        capacity = b.tokens.capacity
+        if capacity <= 0:
+            return 0.0
+        return min(tokens, capacity - (capacity * self.reserve if background else 0.0))
+
+    def _try_take(self, b: _Buckets, tokens: int, background: bool) -> float:
+        """One look at the buckets (caller holds _cond): 0 = taken, else seconds until it might fit."""
+        now = time.monotonic()
+        b.requests.refill(now)
+        b.tokens.refill(now)
+        if background and b.interactive_waiting:
+            return 0.25
+        req_floor = b.requests.capacity * self.reserve if background else 0.0
+        tok_floor = b.tokens.capacity * self.reserve if background else 0.0
+        wait = max(
+            b.requests.wait_for(1, req_floor),
+            b.tokens.wait_for(tokens, tok_floor),
+        )
+        if wait <= 0:
+            b.requests.level -= 1
+            b.tokens.level -= self._token_charge(b, tokens, background)
+        return wait
+
+    async def _atake(self, model: str, b: _Buckets, tokens: int, background: bool) -> float:
+        with self._cond:
+            return self._try_take(b, tokens, background)
+
+    def acquire(self, model: str, tokens: int, lane: str) -> float:
+        background = lane == BACKGROUND
+        b = self._enter(model, background)
+        try:
+            with self._cond:
+                while True:
+                    wait = self._try_take(b, tokens, background)
+                    if wait <= 0:
+                        return self._token_charge(b, tokens, background)
+                    self._cond.wait(min(wait, 0.25))
+        finally:
+            self._leave(b, background)
+
+    async def aacquire(self, model: str, tokens: int, lane: str) -> float:
+        """acquire() for the event loop: waits with asyncio.sleep, so it never holds an executor thread."""
+        background = lane == BACKGROUND
+        b = self._enter(model, background)
+        try:
+            while True:
+                wait = await self._atake(model, b, tokens, background)
+                if wait <= 0:
+                    return self._token_charge(b, tokens, background)
+                await asyncio.sleep(min(wait, 0.25))
+        finally:
+            self._leave(b, background)
+
+    def settle(self, model: str, taken: float, actual: int) -> None:
+        """Refund (or charge) the gap between what acquire() took and what the API billed."""
+        with self._cond:
+            b = self._buckets(model)
+            if b.tokens.capacity > 0:
+                b.tokens.level = min(b.tokens.capacity, b.tokens.level + (taken - actual))
+            self._cond.notify_all()
+
+    def penalize(self, model: str) -> None:
+        """Server said 429 — empty the buckets so everyone backs off for a moment."""
+        with self._cond:
+            b = self._buckets(model)
+            b.requests.level = min(b.requests.level, 0.0)
+            b.tokens.level = min(b.tokens.level, 0.0)
+
+
+class SqliteGovernor(LocalGovernor):
+    """Same rules, bucket levels in a shared SQLite file so gunicorn workers see one budget."""
+
+    def __init__(self, reserve: float, path: str):
+        super().__init__(reserve)
+        self.path = path
+        conn = self._connect()
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets ("
+                "model TEXT NOT NULL, kind TEXT NOT NULL, level REAL NOT NULL, stamp REAL NOT NULL, "
+                "PRIMARY KEY (model, kind))"
+            )
+        finally:
+            conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _take(self, conn, model: str, kind: str, per_minute: float, amount: float, floor: float) -> float:
+        if per_minute <= 0:
+            return 0.0
+        rate = per_minute / 60.0
+        now = time.time()
+        row = conn.execute("SELECT level, stamp FROM buckets WHERE model=? AND kind=?", (model, kind)).fetchone()
+        level = per_minute if row is None else min(per_minute, row[0] + (now - row[1]) * rate)
+        amount = min(amount, per_minute - floor)
+        if level - amount < floor:
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (model, kind, level, stamp) VALUES (?, ?, ?, ?)",
+                (model, kind, level, now),
+            )
+            return (floor + amount - level) / rate
+        conn.execute(
+            "INSERT OR REPLACE INTO buckets (model, kind, level, stamp) VALUES (?, ?, ?, ?)",
+            (model, kind, level - amount, now),
+        )
+        return 0.0
+
+    def _take_both(self, model: str, b: _Buckets, tokens: int, background: bool) -> float:
+        with self._cond:
+            if background and b.interactive_waiting:
+                return 0.25
+        rpm, tpm = _model_limits(model)
+        frac = self.reserve if background else 0.0
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            wait = self._take(conn, model, "requests", rpm, 1, rpm * frac)
+            if wait <= 0:
+                wait = self._take(conn, model, "tokens", tpm, tokens, tpm * frac)
+                if wait > 0:
+                    conn.execute("ROLLBACK")  # give the request slot back
+                    return wait
+            conn.execute("COMMIT")
+            return wait
+        finally:
+            conn.close()
+
+    async def _atake(self, model: str, b: _Buckets, tokens: int, background: bool) -> float:
+        # a short write transaction, but sqlite may sit in busy_timeout, so not on the loop itself
+        return await asyncio.to_thread(self._take_both, model, b, tokens, background)
+
+    def acquire(self, model: str, tokens: int, lane: str) -> float:
+        background = lane == BACKGROUND
+        b = self._enter(model, background)
+        try:
+            while True:
+                wait = self._take_both(model, b, tokens, background)
+                if wait <= 0:
+                    return self._token_charge(b, tokens, background)
+                time.sleep(min(wait, 0.25))
+        finally:
+            self._leave(b, background)
+
+    def settle(self, model: str, taken: float, actual: int) -> None:
+        _, tpm = _model_limits(model)
+        if tpm <= 0:
+            return
+        now = time.time()
+        conn = self._connect()
+        try:
+            # refill to now and move the stamp in the same write, or the next _take credits that time twice
+            conn.execute(
+                "UPDATE buckets SET level = MIN(:cap, MIN(:cap, level + (:now - stamp) * :rate) + :delta), stamp = :now"
+                " WHERE model = :model AND kind = 'tokens'",
+                {"cap": tpm, "now": now, "rate": tpm / 60.0, "delta": taken - actual, "model": model},
+            )
+        finally:
+            conn.close()
+
+    def penalize(self, model: str) -> None:
+        now = time.time()
+        conn = self._connect()
+        try:
+            for kind, per_minute in zip(("requests", "tokens"), _model_limits(model)):
+                conn.execute(
+                    "UPDATE buckets SET level = MIN(0, level + (:now - stamp) * :rate), stamp = :now"
+                    " WHERE model = :model AND kind = :kind",
+                    {"now": now, "rate": max(per_minute, 0) / 60.0, "model": model, "kind": kind},
+                )
+        finally:
+            conn.close()
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor():
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            reserve = max(0.0, min(_env_float("ATLUS_OPENAI_INTERACTIVE_RESERVE", 0.2), 0.9))
+            path = (os.environ.get("ATLUS_OPENAI_GOVERNOR_DB") or "").strip()
+            _governor = SqliteGovernor(reserve, path) if path else LocalGovernor(reserve)
+        return _governor
+
+
+class _Slot:
+    def __init__(self, governor, model: str, taken: float):
+        self.governor = governor
+        self.model = model
+        self.taken = taken  # what acquire() actually deducted, so settle() refunds no more than that
+        self.settled = False
+
+    def settle(self, actual_tokens: int | None) -> None:
+        if self.governor is None or self.settled or actual_tokens is None:
+            return
+        self.settled = True
+        self.governor.settle(self.model, self.taken, int(actual_tokens))
+
+
+def enabled() -> bool:
+    return (os.environ.get("ATLUS_OPENAI_GOVERNOR") or "1").strip().lower() not in ("0", "false", "off")
+
+
+def acquire(model: str, estimated_tokens: int = 0, lane: str | None = None) -> _Slot:
+    """Block until the model's buckets allow one call of ~estimated_tokens; settle() the slot afterwards."""
+    if not enabled():
+        return _Slot(None, model, 0)
+    governor = get_governor()
+    taken = governor.acquire(model, estimated_tokens, lane or current_lane())
+    return _Slot(governor, model, taken)
+
+
+async def aacquire(model: str, estimated_tokens: int = 0, lane: str | None = None) -> _Slot:
+    """acquire() for coroutines on the OpenAI loop."""
+    if not enabled():
+        return _Slot(None, model, 0)
+    governor = get_governor()
+    taken = await governor.aacquire(model, estimated_tokens, lane or current_lane())
+    return _Slot(governor, model, taken)
+
+
+@contextlib.contextmanager
+def reserve(model: str, estimated_tokens: int = 0):
+    """acquire() as a context manager, in the current lane."""
+    yield acquire(model, estimated_tokens)
+
+
+def penalize(model: str) -> None:
+    if not enabled():
+        return
+    get_governor().penalize(model)
@@ -0,0 +1,304 @@
+"""Retries, deadlines, hedged duplicates and a per-model circuit breaker for OpenAI calls.
+
+openai_service wraps every API call in call_with_retries():
+- transient failures (429, 5xx, timeouts, dropped connections) back off with full jitter,
+  honouring Retry-After, until the per-call deadline runs out;
+- interactive calls may hedge: if the first attempt hasn't answered after
+  ATLUS_OPENAI_HEDGE_AFTER seconds a duplicate goes out and whichever lands first wins;
+- a model that keeps failing trips its breaker, and callers get CircuitOpenError immediately
+  (node metadata then drops to _local_node_from_chunk, OCR to EasyOCR) until a trial call succeeds.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Awaitable, Callable, Dict, TypeVar
+
+log = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(RuntimeError):
+    """The model has failed too often recently; don't bother calling it."""
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float((os.environ.get(name) or "").strip() or default)
+    except ValueError:
+        return default
+
+
+class CircuitBreaker:
+    """closed → open after `threshold` straight failed calls → half-open (one trial) after `cooldown`."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            if time.monotonic() - self.opened_at >= self.cooldown:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown or self.trial_in_flight:
+                return False
+            self.trial_in_flight = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def release(self) -> None:
+        """The call ended without an answer either way (cancelled, shutting down): free the trial slot."""
+        with self._lock:
+            self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.threshold:
+                if self.opened_at is None or self.trial_in_flight:
+                    log.warning("OpenAI circuit opened after %s failures", self.failures)
+                self.opened_at = time.monotonic()
+            self.trial_in_flight = False
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(model: str) -> CircuitBreaker:
+    with _breakers_lock:
+        b = _breakers.get(model)
+        if b is None:
+            b = _breakers[model] = CircuitBreaker(
+                int(_env_float("ATLUS_OPENAI_BREAKER_THRESHOLD", 5)),
+                _env_float("ATLUS_OPENAI_BREAKER_COOLDOWN", 30),
+            )
+        return b
+
+
+def is_degraded(model: str) -> bool:
+    return breaker_for(model).state == "open"
+
+
+def is_retryable(exc: BaseException) -> bool:
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return True
+    # openai.APIConnectionError / APITimeoutError carry no status code
+    return type(exc).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def _retry_after(exc: BaseException) -> float | None:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 0.5, cap: float = 8.0) -> float:
+    """Full jitter: uniform(0, min(cap, base * 2^attempt))."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+_hedge_pool = None
+_hedge_pool_lock = threading.Lock()
+
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+        return _hedge_pool
+
+
+def _hedged(fn: Callable[[float], T], timeout: float, hedge_after: float) -> T:
+    """Start fn; if it's still running after hedge_after, race a duplicate. Loser's result is dropped."""
+    pool = _get_hedge_pool()
+    futures = [pool.submit(contextvars.copy_context().run, fn, timeout)]
+    done, _ = wait(futures, timeout=hedge_after)
+    if not done:
+        log.info("hedging slow OpenAI call after %.1fs", hedge_after)
+        futures.append(pool.submit(contextvars.copy_context().run, fn, max(1.0, timeout - hedge_after)))
+    pending = set(futures)
+    last_exc: BaseException | None = None
+    end = time.monotonic() + timeout
+    while pending:
+        done, pending = wait(pending, timeout=max(0.0, end - time.monotonic()), return_when=FIRST_COMPLETED)
+        if not done:
+            break
+        for f in done:
+            exc = f.exception()
+            if exc is None:
+                return f.result()
+            last_exc = exc
+    if last_exc is not None:
+        raise last_exc
+    raise TimeoutError(f"OpenAI call did not finish within {timeout:.0f}s")
+
+
+def _retry_delay(e: Exception, model: str, attempt: int, max_attempts: int, end: float):
+    """Seconds to sleep before the next attempt, or None to re-raise."""
+    if not is_retryable(e):
+        return None
+    delay = _retry_after(e)
+    if delay is None:
+        delay = backoff_delay(attempt)
+    if attempt >= max_attempts or time.monotonic() + delay >= end:
+        return None
+    log.warning("OpenAI %s attempt %s failed (%s); retrying in %.2fs", model, attempt, e, delay)
+    return delay
+
+
+def _open_call(breaker: CircuitBreaker, model: str, deadline: float) -> float:
+    """Ask the breaker once per call (not per attempt); returns the call's end time."""
+    if not breaker.allow():
+        raise CircuitOpenError(f"OpenAI {model} is temporarily unavailable (circuit open)")
+    return time.monotonic() + deadline
+
+
+def _remaining(model: str, deadline: float, end: float) -> float:
+    remaining = end - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError(f"OpenAI {model} call exceeded its {deadline:.0f}s deadline")
+    return remaining
+
+
+def _finish(breaker: CircuitBreaker, result: T) -> T:
+    breaker.record_success()
+    return result
+
+
+def _close_call(breaker: CircuitBreaker, e: BaseException) -> None:
+    """One breaker entry for a call that gave up, however many attempts it took."""
+    if not isinstance(e, Exception):
+        # CancelledError, SystemExit, KeyboardInterrupt say nothing about the API, but a half-open
+        # trial left marked in flight would keep the circuit shut until the process restarts
+        breaker.release()
+    elif is_retryable(e):
+        breaker.record_failure()
+    else:
+        # a 400 / bad key isn't the API being down — release a half-open trial as healthy
+        breaker.record_success()
+
+
+def call_with_retries(
+    fn: Callable[[float], T],
+    *,
+    model: str,
+    deadline: float,
+    max_attempts: int | None = None,
+    hedge_after: float | None = None,
+) -> T:
+    """fn(timeout_seconds) is one attempt. Retries transient errors until the deadline."""
+    if max_attempts is None:
+        max_attempts = int(_env_float("ATLUS_OPENAI_MAX_ATTEMPTS", 4))
+    breaker = breaker_for(model)
+    end = _open_call(breaker, model, deadline)
+    attempt = 0
+    try:
+        while True:
+            remaining = _remaining(model, deadline, end)
+            try:
+                if hedge_after and hedge_after < remaining:
+                    return _finish(breaker, _hedged(fn, remaining, hedge_after))
+                return _finish(breaker, fn(remaining))
+            except Exception as e:
+                attempt += 1
+                delay = _retry_delay(e, model, attempt, max_attempts, end)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+    except BaseException as e:
+        _close_call(breaker, e)
+        raise
+
+
+async def _ahedged(fn: Callable[[float], Awaitable[T]], timeout: float, hedge_after: float) -> T:
+    """_hedged on the event loop — and the slower attempt is actually cancelled, freeing its connection."""
+    tasks = {asyncio.ensure_future(fn(timeout))}
+    done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+    if not done:
+        log.info("hedging slow OpenAI call after %.1fs", hedge_after)
+        tasks.add(asyncio.ensure_future(fn(max(1.0, timeout - hedge_after))))
+    last_exc: BaseException | None = None
+    end = time.monotonic() + timeout
+    try:
+        while tasks:
+            done, tasks = await asyncio.wait(
+                tasks, timeout=max(0.0, end - time.monotonic()), return_when=asyncio.FIRST_COMPLETED
+            )
+            if not done:
+                break
+            for t in done:
+                exc = t.exception()
+                if exc is None:
+                    return t.result()
+                last_exc = exc
+    finally:
+        for t in tasks:
+            t.cancel()
+    if last_exc is not None:
+        raise last_exc
+    raise TimeoutError(f"OpenAI call did not finish within {timeout:.0f}s")
+
+
+async def acall_with_retries(
+    fn: Callable[[float], Awaitable[T]],
+    *,
+    model: str,
+    deadline: float,
+    max_attempts: int | None = None,
+    hedge_after: float | None = None,
+) -> T:
+    """call_with_retries for coroutines: same breakers, backoff and deadline rules."""
+    if max_attempts is None:
+        max_attempts = int(_env_float("ATLUS_OPENAI_MAX_ATTEMPTS", 4))
+    breaker = breaker_for(model)
+    end = _open_call(breaker, model, deadline)
+    attempt = 0
+    try:
+        while True:
+            remaining = _remaining(model, deadline, end)
+            try:
+                if hedge_after and hedge_after < remaining:
+                    return _finish(breaker, await _ahedged(fn, remaining, hedge_after))
+                return _finish(breaker, await fn(remaining))
+            except Exception as e:
+                attempt += 1
+                delay = _retry_delay(e, model, attempt, max_attempts, end)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+    except BaseException as e:
+        _close_call(breaker, e)
+        raise
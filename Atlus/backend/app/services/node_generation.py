@@ -1,16 +1,76 @@
 """Turn textbook chunks or OCR markdown into note rows in the database."""
+import asyncio
+import contextvars
+import threading
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
 
+from flask import current_app
+
 from app.extensions import db
-from app.models.brain import Node
-from app.services.openai_service import generate_node_from_chunk
+from app.models.brain import IngestionJob, Node
+from app.services.bulk_insert import bulk_insert_rows
+from app.services.stage_timing import span
+from app.services import background_jobs, openai_async
+from app.services.openai_service import agenerate_node_from_chunk, generate_node_from_chunk
 from app.services.chunker import Chunk
 
+DEFAULT_COMMIT_BATCH = 16
+DEFAULT_LLM_CONCURRENCY = 4
+
+# One pool for every upload in this process: files ingest side by side but share the LLM budget.
+_llm_pool = None
+_llm_pool_lock = threading.Lock()
+
+
+def _llm_concurrency() -> int:
+    try:
+        return max(1, int(current_app.config.get("LLM_CONCURRENCY") or DEFAULT_LLM_CONCURRENCY))
+    except (RuntimeError, TypeError, ValueError):
+        return DEFAULT_LLM_CONCURRENCY
+
+
+def _get_llm_pool() -> ThreadPoolExecutor:
+    global _llm_pool
+    with _llm_pool_lock:
+        if _llm_pool is None:
+            _llm_pool = ThreadPoolExecutor(max_workers=_llm_concurrency(), thread_name_prefix="llm")
+        return _llm_pool
+
 
 def _chunk_to_node_payload(chunk: Chunk) -> Dict[str, Any]:
     """LLM pass to title/summarize/tag one chunk."""
-    out = generate_node_from_chunk(chunk.text, chunk.section_title)
+    with span("llm_chunk"):
+        out = generate_node_from_chunk(chunk.text, chunk.section_title)
+    return _payload_from_llm(chunk, out)
+
+
+async def _achunk_payloads(chunks: List[Chunk], limit: int) -> List[Dict[str, Any]]:
+    """The whole batch as tasks on the OpenAI loop; the semaphore is shared by every upload."""
+    sem = openai_async.llm_semaphore(limit)
+
+    async def one(chunk: Chunk) -> Dict[str, Any]:
+        async with sem:
+            with span("llm_chunk"):
+                out = await agenerate_node_from_chunk(chunk.text, chunk.section_title)
+        return _payload_from_llm(chunk, out)
+
+    return list(await asyncio.gather(*(one(c) for c in chunks)))
+
+
+@span("llm_batch")
+def _chunk_payloads(chunks: List[Chunk]) -> List[Dict[str, Any]]:
+    if openai_async.enabled():
+        return openai_async.run(_achunk_payloads(chunks, _llm_concurrency()))
+    # shared pool caps in-flight calls across all uploads; copied context keeps the caller's
+    # llm lane (ingestion = background) inside the worker threads
+    pool = _get_llm_pool()
+    futures = [pool.submit(contextvars.copy_context().run, _chunk_to_node_payload, c) for c in chunks]
+    return [f.result() for f in futures]
+
+
+def _payload_from_llm(chunk: Chunk, out: Dict[str, Any]) -> Dict[str, Any]:
     return {
         "title": out.get("title") or chunk.section_title or "Untitled",
         "summary": out.get("summary") or "",
@@ -22,7 +82,8 @@ def _chunk_to_node_payload(chunk: Chunk) -> Dict[str, Any]:
 
 def _markdown_to_single_node(markdown: str, source_file_id: int | None) -> Dict[str, Any]:
     """OCR-style blob: one note, same LLM metadata pass (trimmed for token budget)."""
-    out = generate_node_from_chunk(markdown[:6000])
+    with span("llm_chunk"):
+        out = generate_node_from_chunk(markdown[:6000])
     return {
         "title": out.get("title") or "Handwritten note",
         "summary": out.get("summary") or "",
@@ -33,6 +94,45 @@ def _markdown_to_single_node(markdown: str, source_file_id: int | None) -> Dict[
     }
 
 
+def _node_row(brain_id: str, node_id: str, p: Dict[str, Any]) -> Dict[str, Any]:
+    """Column dict for one payload — same fields the old per-object Node(...) set."""
+    raw = p.get("raw_content") or ""
+    return {
+        "id": node_id,
+        "brain_id": brain_id,
+        "source_file_id": p.get("source_file_id"),
+        "title": p["title"][:512],
+        "summary": p.get("summary"),
+        "raw_content": raw,
+        "markdown_content": raw if raw else None,
+        "concepts": p.get("concepts"),
+        "section_title": (p.get("section_title") or "")[:512] or None,
+        "tags": p.get("concepts"),
+        "node_type": p.get("node_type") or "note",
+        "embedding_id": None,
+        "metadata_json": {
+            "source_reference": str(p.get("source_file_id") or ""),
+            "tags": p.get("concepts"),
+        },
+        "related_node_ids": None,
+    }
+
+
+def _commit_batch_size() -> int:
+    try:
+        return max(1, int(current_app.config.get("INGEST_COMMIT_BATCH") or DEFAULT_COMMIT_BATCH))
+    except (RuntimeError, TypeError, ValueError):
+        return DEFAULT_COMMIT_BATCH
+
+
+@span("db_insert")
+def _store_payloads(brain_id: str, payloads: List[Dict[str, Any]]) -> List[str]:
+    node_ids = [str(uuid.uuid4()) for _ in payloads]
+    rows = [_node_row(brain_id, node_ids[i], p) for i, p in enumerate(payloads)]
+    bulk_insert_rows(Node, rows)
+    return node_ids
+
+
 def generate_and_store_nodes(
     brain_id: str,
     user_id: int,
@@ -40,51 +140,48 @@ def generate_and_store_nodes(
     markdown: str | None = None,
     source_file_id: int | None = None,
     node_type: str | None = None,
+    job: IngestionJob | None = None,
 ) -> dict:
-    """Either many chunks from a textbook upload, or one markdown string from OCR."""
-    if chunks:
-        payloads = []
-        for c in chunks:
-            chunk_obj = Chunk(
-                text=c.get("text") or "",
-                section_title=c.get("section_title"),
-            )
-            payload = _chunk_to_node_payload(chunk_obj)
-            payload["source_file_id"] = c.get("source_file_id") or source_file_id
-            payloads.append(payload)
-    elif markdown:
+    """Either many chunks from a textbook upload, or one markdown string from OCR.
+
+    Chunks are committed every INGEST_COMMIT_BATCH so the sidebar fills in while the LLM is
+    still working and no write transaction stays open across API calls. With a job, chunks
+    before job.done_chunks are skipped (resume) and the checkpoint advances with each batch.
+    """
+    if markdown and not chunks:
         pl = _markdown_to_single_node(markdown, source_file_id)
         if node_type:
             pl["node_type"] = node_type
-        payloads = [pl]
-    else:
+        node_ids = _store_payloads(brain_id, [pl])
+        with span("db_commit"):
+            db.session.commit()
+        return {"nodes_created": len(node_ids), "node_ids": node_ids, "links_created": 0}
+    if not chunks:
         return {"nodes_created": 0, "node_ids": [], "links_created": 0}
 
-    node_ids = [str(uuid.uuid4()) for _ in payloads]
-
-    for i, p in enumerate(payloads):
-        raw = payloads[i].get("raw_content") or ""
-        node = Node(
-            id=node_ids[i],
-            brain_id=brain_id,
-            source_file_id=p.get("source_file_id"),
-            title=payloads[i]["title"][:512],
-            summary=payloads[i].get("summary"),
-            raw_content=raw,
-            markdown_content=raw if raw else None,
-            concepts=payloads[i].get("concepts"),
-            section_title=(payloads[i].get("section_title") or "")[:512] or None,
-            tags=payloads[i].get("concepts"),
-            node_type=p.get("node_type") or "note",
-            embedding_id=None,
-            metadata_json={
-                "source_reference": str(p.get("source_file_id") or ""),
-                "tags": payloads[i].get("concepts"),
-            },
-            related_node_ids=None,
-        )
-        db.session.add(node)
-    db.session.commit()
+    start = job.done_chunks if job is not None else 0
+    batch_size = _commit_batch_size()
+    node_ids: List[str] = []
+    for batch_start in range(start, len(chunks), batch_size):
+        if job is not None and background_jobs.stopping():
+            # server going down: end on this checkpoint so the job can be resumed right away
+            raise background_jobs.Interrupted("interrupted by server shutdown; resume to continue")
+        batch = chunks[batch_start : batch_start + batch_size]
+        chunk_objs = [
+            Chunk(text=c.get("text") or "", section_title=c.get("section_title"))
+            for c in batch
+        ]
+        payloads = _chunk_payloads(chunk_objs)
+        for c, payload in zip(batch, payloads):
+            payload["source_file_id"] = c.get("source_file_id") or source_file_id
+            if node_type:
+                payload["node_type"] = node_type
+        node_ids.extend(_store_payloads(brain_id, payloads))
+        if job is not None:
+            job.done_chunks = batch_start + len(payloads)
+            job.nodes_created = (job.nodes_created or 0) + len(payloads)
+        with span("db_commit"):
+            db.session.commit()
 
     return {
         "nodes_created": len(node_ids),
@@ -0,0 +1,60 @@
+"""Ctrl+K note search over the full-text index built by schema migration 3 (app/migrations.py).
+
+SQLite: nodes_fts (FTS5 over title / summary / markdown_content), ranked by bm25. Postgres: the GIN
+index on migrations.PG_NOTE_TSVECTOR, ranked by ts_rank. Each query word is a prefix match
+("photo synth" finds "photosynthesis notes"), and all of them must match.
+
+search() returns None when the database has no such index, and the route keeps its ILIKE scan for
+that case. It also falls back when the index finds nothing, since ILIKE matches inside words too.
+"""
+import re
+from typing import List, Optional
+
+from sqlalchemy import bindparam, text
+
+from app.extensions import db
+from app.migrations import PG_NOTE_TSVECTOR
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_available = {}  # engine url -> bool, checked once per process
+
+
+def _has_index(conn) -> bool:
+    key = str(conn.engine.url)
+    if key not in _available:
+        if conn.dialect.name == "sqlite":
+            sql = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'nodes_fts'"
+        elif conn.dialect.name == "postgresql":
+            sql = "SELECT 1 FROM pg_indexes WHERE indexname = 'ix_nodes_fts'"
+        else:
+            _available[key] = False
+            return False
+        _available[key] = conn.execute(text(sql)).first() is not None
+    return _available[key]
+
+
+def search(brain_ids: List[str], q: str, limit: int = 50) -> Optional[List[str]]:
+    """Node ids in these brains matching every word of q, best first; None without an index."""
+    words = _WORD_RE.findall(q or "")[:16]
+    if not brain_ids or not words:
+        return None
+    conn = db.session.connection()
+    if not _has_index(conn):
+        return None
+    if conn.dialect.name == "sqlite":
+        stmt = text(
+            "SELECT n.id FROM nodes_fts JOIN nodes n ON n.rowid = nodes_fts.rowid"
+            " WHERE nodes_fts MATCH :q AND n.brain_id IN :brain_ids"
+            " ORDER BY bm25(nodes_fts) LIMIT :limit"
+        )
+        q_expr = " ".join(f'"{w}"*' for w in words)
+    else:
+        stmt = text(
+            f"SELECT id FROM nodes WHERE {PG_NOTE_TSVECTOR} @@ to_tsquery('simple', :q)"
+            " AND brain_id IN :brain_ids"
+            f" ORDER BY ts_rank({PG_NOTE_TSVECTOR}, to_tsquery('simple', :q)) DESC LIMIT :limit"
+        )
+        q_expr = " & ".join(f"{w}:*" for w in words)
+    stmt = stmt.bindparams(bindparam("brain_ids", expanding=True))
+    rows = conn.execute(stmt, {"q": q_expr, "brain_ids": list(brain_ids), "limit": limit}).fetchall()
+    return [r[0] for r in rows]
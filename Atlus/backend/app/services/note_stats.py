@@ -0,0 +1,233 @@
+"""Materialized home-screen numbers: note count + newest-notes list per brain (brain_note_stats).
+
+/me/summary and /me/activity used to count / sort every node in every brain a user can see — with
+a couple of textbooks that's thousands of rows per home page load. Instead each node write adjusts
+its brain's row in the same transaction (after_flush for ORM writes, record_bulk() for Core bulk
+inserts), and the home endpoints read one small row per brain.
+
+A brain without a row (older databases, or one that fell out of sync) is rebuilt from the nodes
+table the first time anyone reads or writes it.
+"""
+import logging
+from datetime import datetime, timezone
+
+from sqlalchemy import event, func, inspect, or_, select
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import DetachedInstanceError
+
+from app.extensions import db
+from app.models.brain import Brain, Node
+from app.models.stats import BrainNoteStats
+
+log = logging.getLogger(__name__)
+
+# Don't count onboarding / system nodes toward “how many notes”
+NOTE_TYPES = ("note", "handwritten", "textbook_section", "lecture")
+RECENT_KEEP = 20  # /me/activity never asks for more
+
+_installed = False
+
+
+def is_note(node_type) -> bool:
+    return node_type is None or node_type in NOTE_TYPES
+
+
+def _iso(dt):
+    if dt is None:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)  # sqlite hands back naive UTC
+    return dt.astimezone(timezone.utc).isoformat()
+
+
+def _item(node_id, title, updated_at, created_at) -> dict:
+    return {"id": node_id, "title": title, "updated_at": _iso(updated_at), "created_at": _iso(created_at)}
+
+
+def sort_key(item):
+    return item.get("updated_at") or item.get("created_at") or ""
+
+
+def _rebuild(conn, brain_id):
+    nodes = Node.__table__
+    is_note_col = or_(nodes.c.node_type.in_(NOTE_TYPES), nodes.c.node_type.is_(None))
+    count = conn.execute(
+        select(func.count()).select_from(nodes).where(nodes.c.brain_id == brain_id, is_note_col)
+    ).scalar() or 0
+    rows = conn.execute(
+        select(nodes.c.id, nodes.c.title, nodes.c.updated_at, nodes.c.created_at)
+        .where(nodes.c.brain_id == brain_id, is_note_col)
+        .order_by(nodes.c.updated_at.desc().nullslast(), nodes.c.created_at.desc())
+        .limit(RECENT_KEEP)
+    ).all()
+    return count, [_item(*r) for r in rows]
+
+
+def _insert(conn, brain_id, count, recent, overwrite):
+    """Create the row; if someone beat us to it, overwrite it (writers) or leave theirs (readers)."""
+    table = BrainNoteStats.__table__
+    values = {"brain_id": brain_id, "note_count": count, "recent": recent}
+    dialect = conn.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(**values)
+        if overwrite:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.brain_id], set_={"note_count": count, "recent": recent}
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[table.c.brain_id])
+        conn.execute(stmt)
+        return
+    exists = conn.execute(select(table.c.brain_id).where(table.c.brain_id == brain_id)).first()
+    if exists is None:
+        conn.execute(table.insert().values(**values))
+    elif overwrite:
+        conn.execute(table.update().where(table.c.brain_id == brain_id).values(note_count=count, recent=recent))
+
+
+def _apply(conn, brain_id, delta=0, upserts=None, removed=(), rebuild=False):
+    """Fold one flush's changes into a brain's row. The flush is already visible on conn."""
+    table = BrainNoteStats.__table__
+    row = conn.execute(
+        select(table.c.note_count, table.c.recent).where(table.c.brain_id == brain_id).with_for_update()
+    ).first()
+    if row is None or rebuild:
+        _insert(conn, brain_id, *_rebuild(conn, brain_id), overwrite=True)
+        return
+    upserts = upserts or {}
+    gone = set(removed) | set(upserts)
+    recent = [i for i in (row.recent or []) if i.get("id") not in gone] + list(upserts.values())
+    recent.sort(key=sort_key, reverse=True)
+    count = max(0, row.note_count + delta)
+    if len(recent) < min(count, RECENT_KEEP):
+        # deleted one of the newest - refill from the table instead of guessing what's next
+        count, recent = _rebuild(conn, brain_id)
+    conn.execute(
+        table.update()
+        .where(table.c.brain_id == brain_id)
+        .values(note_count=count, recent=recent[:RECENT_KEEP])
+    )
+
+
+def _loaded(obj, name, deleted=False):
+    """Attribute value without tripping a refresh on a row this flush just deleted."""
+    state = inspect(obj)
+    if name in state.dict:
+        return state.dict[name]
+    if deleted:
+        return None
+    try:
+        return getattr(obj, name)
+    except DetachedInstanceError:
+        return None
+
+
+def _after_flush(session, flush_context):
+    changes = {}  # brain_id -> {"delta", "upserts", "removed", "rebuild"}
+    dropped = set()
+    now = datetime.now(timezone.utc)
+
+    def for_brain(brain_id):
+        return changes.setdefault(brain_id, {"delta": 0, "upserts": {}, "removed": set(), "rebuild": False})
+
+    for obj in session.new:
+        if isinstance(obj, Node) and obj.brain_id and is_note(obj.node_type):
+            c = for_brain(obj.brain_id)
+            c["delta"] += 1
+            c["upserts"][obj.id] = _item(obj.id, obj.title, now, now)
+    for obj in session.deleted:
+        if isinstance(obj, Brain):
+            dropped.add(obj.id)
+        elif isinstance(obj, Node):
+            brain_id = _loaded(obj, "brain_id", deleted=True)
+            if not brain_id:
+                continue
+            c = for_brain(brain_id)
+            state = inspect(obj)
+            if "node_type" not in state.dict:
+                c["rebuild"] = True  # don't know if it counted
+            elif is_note(state.dict["node_type"]):
+                c["delta"] -= 1
+                c["removed"].add(obj.id)
+    for obj in session.dirty:
+        if not isinstance(obj, Node) or not session.is_modified(obj, include_collections=False):
+            continue
+        brain_id = _loaded(obj, "brain_id")
+        if not brain_id:
+            continue
+        c = for_brain(brain_id)
+        hist = inspect(obj).attrs.node_type.history
+        was = is_note(hist.deleted[0]) if hist.deleted else is_note(obj.node_type)
+        now_note = is_note(obj.node_type)
+        c["delta"] += int(now_note) - int(was)
+        if now_note:
+            c["upserts"][obj.id] = _item(obj.id, _loaded(obj, "title"), now, _loaded(obj, "created_at"))
+        else:
+            c["removed"].add(obj.id)
+
+    if not changes and not dropped:
+        return
+    conn = session.connection()
+    for brain_id, c in changes.items():
+        if brain_id not in dropped:
+            _apply(conn, brain_id, c["delta"], c["upserts"], c["removed"], c["rebuild"])
+    if dropped:
+        table = BrainNoteStats.__table__
+        conn.execute(table.delete().where(table.c.brain_id.in_(dropped)))
+
+
+def record_bulk(rows) -> None:
+    """Account for Node rows written with a Core executemany (no flush, so no after_flush)."""
+    now = datetime.now(timezone.utc)
+    changes = {}
+    for r in rows:
+        if r.get("brain_id") and is_note(r.get("node_type", "note")):
+            c = changes.setdefault(r["brain_id"], {"delta": 0, "upserts": {}})
+            c["delta"] += 1
+            c["upserts"][r["id"]] = _item(r["id"], r.get("title"), now, now)
+    if not changes:
+        return
+    conn = db.session.connection()
+    for brain_id, c in changes.items():
+        # bulk batches are textbook-sized: only the newest RECENT_KEEP can make the list
+        newest = dict(list(c["upserts"].items())[-RECENT_KEEP:])
+        _apply(conn, brain_id, c["delta"], newest)
+
+
+def rebuild_brains(conn, brain_ids) -> None:
+    """Recount these brains' rows from the nodes table (migrations, after NOTE_TYPES changes)."""
+    for brain_id in brain_ids:
+        _insert(conn, brain_id, *_rebuild(conn, brain_id), overwrite=True)
+
+
+def for_brains(brain_ids) -> dict:
+    """{brain_id: (note_count, recent)} — missing rows are rebuilt (and saved) on the way."""
+    brain_ids = list(brain_ids)
+    if not brain_ids:
+        return {}
+    table = BrainNoteStats.__table__
+    out = {
+        r.brain_id: (r.note_count, r.recent or [])
+        for r in db.session.execute(
+            select(table.c.brain_id, table.c.note_count, table.c.recent).where(table.c.brain_id.in_(brain_ids))
+        )
+    }
+    missing = [b for b in brain_ids if b not in out]
+    if missing:
+        # own short transaction so a GET never has to commit the request session
+        with db.engine.begin() as conn:
+            for brain_id in missing:
+                out[brain_id] = _rebuild(conn, brain_id)
+                _insert(conn, brain_id, *out[brain_id], overwrite=False)
+    return out
+
+
+def init_app(app) -> None:
+    global _installed
+    if not _installed:
+        event.listen(Session, "after_flush", _after_flush)
+        _installed = True
@@ -1,33 +1,43 @@
 """Handwriting → markdown: try vision first, fall back to EasyOCR + a cheap structuring pass."""
+import importlib.util
 import io
 import logging
 from typing import List
 
-try:
-    import easyocr
-except ImportError:
-    easyocr = None
-
 from app.services.openai_service import (
     _has_openai,
     generate_markdown_structure,
     handwriting_image_to_markdown,
 )
+from app.services.stage_timing import span
 
 log = logging.getLogger(__name__)
 
 _reader = None
+_easyocr_installed = None
+
+
+def _has_easyocr() -> bool:
+    """easyocr is importable (checked without importing it)."""
+    global _easyocr_installed
+    if _easyocr_installed is None:
+        _easyocr_installed = importlib.util.find_spec("easyocr") is not None
+    return _easyocr_installed
 
 
 def _get_reader(lang: List[str] = None):
     global _reader
     if _reader is None:
-        if easyocr is None:
+        # imported here: easyocr pulls in torch (seconds), and most scans never fall back to it
+        try:
+            import easyocr
+        except ImportError:
             raise RuntimeError("easyocr required for OCR fallback: pip install easyocr")
         _reader = easyocr.Reader(lang or ["en"], gpu=False)
     return _reader
 
 
+@span("easyocr")
 def _image_to_text_easyocr(image_bytes: bytes) -> str:
     """EasyOCR path — plain text, no LLM."""
     reader = _get_reader()
@@ -45,6 +55,7 @@ def _image_to_text_easyocr(image_bytes: bytes) -> str:
     return "\n".join(lines)
 
 
+@span("rasterize")
 def _pdf_pages_to_images(
     pdf_bytes: bytes, max_pages: int = 30, dpi: int = 150
 ) -> List[bytes]:
@@ -85,11 +96,12 @@ def ocr_scanned_pdf_to_plain_text(pdf_bytes: bytes, max_pages: int = 25) -> str:
         chunk = ""
         if _has_openai():
             try:
-                md, _ = handwriting_image_to_markdown(png, f"page{i + 1}.png")
+                with span("vision_ocr"):
+                    md, _ = handwriting_image_to_markdown(png, f"page{i + 1}.png")
                 chunk = (md or "").strip()
             except Exception as e:
                 log.warning("Vision OCR failed on PDF page %s: %s", i + 1, e)
-        if not chunk and easyocr is not None:
+        if not chunk and _has_easyocr():
             try:
                 chunk = _image_to_text_easyocr(png).strip()
             except Exception as e:
@@ -103,7 +115,8 @@ def _image_ocr_markdown(image_bytes: bytes, filename: str) -> dict:
     """Try vision first, then EasyOCR + markdown cleanup — same payload shape as the public entrypoint."""
     if _has_openai():
         try:
-            markdown, raw_preview = handwriting_image_to_markdown(image_bytes, filename)
+            with span("vision_ocr"):
+                markdown, raw_preview = handwriting_image_to_markdown(image_bytes, filename)
             if markdown.strip():
                 return {
                     "markdown": markdown,
@@ -114,7 +127,7 @@ def _image_ocr_markdown(image_bytes: bytes, filename: str) -> dict:
         except Exception as e:
             log.warning("Vision handwriting OCR failed, falling back to EasyOCR: %s", e)
 
-    if easyocr is None:
+    if not _has_easyocr():
         return {
             "markdown": "*OCR unavailable.* Add `OPENAI_API_KEY` for vision handwriting OCR, or install `easyocr` for a local fallback.",
             "raw_text": "",
@@ -126,7 +139,8 @@ def _image_ocr_markdown(image_bytes: bytes, filename: str) -> dict:
     if not raw_text.strip():
         return {"markdown": "", "raw_text": "", "preview_url": None, "ocr_engine": "easyocr"}
 
-    markdown = generate_markdown_structure(raw_text)
+    with span("ocr_markdown"):
+        markdown = generate_markdown_structure(raw_text)
     return {
         "markdown": markdown,
         "raw_text": raw_text[:5000],
@@ -164,9 +178,10 @@ def run_ocr_to_markdown(file) -> dict:
             if not raw_text.strip():
                 return {"markdown": "", "raw_text": "", "preview_url": None}
 
-            markdown = (
-                generate_markdown_structure(raw_text) if _has_openai() else raw_text.strip()
-            )
+            with span("ocr_markdown"):
+                markdown = (
+                    generate_markdown_structure(raw_text) if _has_openai() else raw_text.strip()
+                )
             return {
                 "markdown": markdown,
                 "raw_text": raw_text[:5000],
@@ -0,0 +1,168 @@
+"""AsyncOpenAI on one background event loop, behind an explicitly sized HTTP connection pool.
+
+Flask views and ingestion threads stay synchronous and hand coroutines to run(). Every in-flight
+call shares a bounded keep-alive pool (ATLUS_OPENAI_POOL_SIZE sockets, idle ones kept for
+ATLUS_OPENAI_KEEPALIVE seconds), so a burst of /ask requests or a 500-chunk ingest is a set of
+tasks on one loop instead of a thread and a fresh TLS handshake per call.
+Set ATLUS_OPENAI_ASYNC=0 to go back to the plain sync client.
+
+The openai SDK (and httpx under it) takes ~0.5 s to import, so it is loaded by sdk() on the first
+call or by the warm-up thread (services/warmup.py), not when this module is imported.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import importlib.util
+import itertools
+import os
+import threading
+from types import SimpleNamespace
+from typing import Awaitable, TypeVar
+
+T = TypeVar("T")
+
+DEFAULT_POOL_SIZE = 32
+DEFAULT_KEEPALIVE = 30.0
+# httpcore scans every pooled connection on each request, so one 256-socket pool costs O(n^2)
+# on a busy loop; big pools are split into clients of at most this many and used round-robin
+SHARD_CONNECTIONS = 32
+
+_sdk = None
+_installed = None
+_loop: asyncio.AbstractEventLoop | None = None
+_clients: list = []
+_next_client = itertools.count()
+_lock = threading.Lock()
+
+
+def installed() -> bool:
+    """openai is importable (checked without importing it)."""
+    global _installed
+    if _installed is None:
+        _installed = importlib.util.find_spec("openai") is not None
+    return _installed
+
+
+def sdk():
+    """httpx + the openai client classes, imported on first use; None when openai isn't installed."""
+    global _sdk
+    if _sdk is None:
+        try:
+            import httpx
+            from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+        except ImportError:
+            _sdk = False
+        else:
+            _sdk = SimpleNamespace(
+                httpx=httpx,
+                OpenAI=OpenAI,
+                AsyncOpenAI=AsyncOpenAI,
+                DefaultHttpxClient=DefaultHttpxClient,
+                DefaultAsyncHttpxClient=DefaultAsyncHttpxClient,
+            )
+    return _sdk or None
+
+
+def enabled() -> bool:
+    flag = (os.environ.get("ATLUS_OPENAI_ASYNC") or "1").strip().lower()
+    return flag not in ("0", "false", "off") and installed()
+
+
+def _pool_size() -> int:
+    try:
+        return max(1, int((os.environ.get("ATLUS_OPENAI_POOL_SIZE") or "").strip() or DEFAULT_POOL_SIZE))
+    except ValueError:
+        return DEFAULT_POOL_SIZE
+
+
+def pool_limits(size: int | None = None):
+    """httpx.Limits for `size` connections (default ATLUS_OPENAI_POOL_SIZE), or None without httpx."""
+    lib = sdk()
+    if lib is None:
+        return None
+    try:
+        keepalive = float((os.environ.get("ATLUS_OPENAI_KEEPALIVE") or "").strip() or DEFAULT_KEEPALIVE)
+    except ValueError:
+        keepalive = DEFAULT_KEEPALIVE
+    size = max(1, size or _pool_size())
+    return lib.httpx.Limits(max_connections=size, max_keepalive_connections=size, keepalive_expiry=keepalive)
+
+
+def sync_http_client():
+    """Same pool sizing for the sync OpenAI client (used when the async path is off)."""
+    limits = pool_limits()
+    if limits is None:
+        return None
+    return sdk().DefaultHttpxClient(limits=limits)
+
+
+def _get_loop() -> asyncio.AbstractEventLoop:
+    global _loop
+    with _lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="openai-async", daemon=True).start()
+            _loop = loop
+        return _loop
+
+
+def get_client():
+    """One of the pooled AsyncOpenAI clients; together they hold ATLUS_OPENAI_POOL_SIZE connections."""
+    with _lock:
+        if not _clients:
+            key = (os.environ.get("OPENAI_API_KEY") or "").strip()
+            if not key:
+                raise RuntimeError("OPENAI_API_KEY not set")
+            lib = sdk()
+            if lib is None:
+                raise RuntimeError("openai package required: pip install openai")
+            total = _pool_size()
+            shards = -(-total // SHARD_CONNECTIONS)
+            for i in range(shards):
+                limits = pool_limits(total // shards + (1 if i < total % shards else 0))
+                http_client = lib.DefaultAsyncHttpxClient(limits=limits) if limits is not None else None
+                # retries live in llm_resilience, same as the sync client
+                _clients.append(lib.AsyncOpenAI(api_key=key, max_retries=0, http_client=http_client))
+        return _clients[next(_next_client) % len(_clients)]
+
+
+def run(coro: Awaitable[T], timeout: float | None = None) -> T:
+    """Run coro on the shared loop and block for the result.
+
+    The task runs in a copy of the caller's context, so the llm lane (and anything else kept in
+    contextvars) follows the call onto the loop.
+    """
+    loop = _get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError("openai_async.run() called from the event loop; await the coroutine instead")
+    ctx = contextvars.copy_context()
+    done: concurrent.futures.Future = concurrent.futures.Future()
+
+    def _finish(task: asyncio.Task) -> None:
+        if task.cancelled():
+            done.cancel()
+        elif task.exception() is not None:
+            done.set_exception(task.exception())
+        else:
+            done.set_result(task.result())
+
+    def _start() -> None:
+        loop.create_task(coro, context=ctx).add_done_callback(_finish)
+
+    loop.call_soon_threadsafe(_start)
+    return done.result(timeout)
+
+
+_llm_semaphore: asyncio.Semaphore | None = None
+
+
+def llm_semaphore(limit: int) -> asyncio.Semaphore:
+    """One cap on in-flight LLM calls for every ingest in the process (loop thread only)."""
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(max(1, limit))
+    return _llm_semaphore
@@ -1,22 +1,23 @@
 """LLM helpers for node metadata extraction, OCR cleanup, and chat."""
 import base64
 import io
+import logging
 import os
-import json
 import re
+import time
 from typing import Dict, Any, Tuple
 
-try:
-    from openai import OpenAI
-except ImportError:
-    OpenAI = None
+from app.services import llm_governor, openai_async, structured_output, usage_ledger, vision_preprocess
+from app.services.llm_resilience import acall_with_retries, call_with_retries, is_degraded, is_retryable
+
+log = logging.getLogger(__name__)
 
 _client = None
 
 
 def _has_openai() -> bool:
     key = os.environ.get("OPENAI_API_KEY", "").strip()
-    return bool(key and OpenAI is not None)
+    return bool(key and openai_async.installed())
 
 
 def _get_client():
@@ -25,12 +26,189 @@ def _get_client():
         key = (os.environ.get("OPENAI_API_KEY") or "").strip()
         if not key:
             raise RuntimeError("OPENAI_API_KEY not set")
-        if OpenAI is None:
+        lib = openai_async.sdk()  # first use imports the SDK
+        if lib is None:
             raise RuntimeError("openai package required: pip install openai")
-        _client = OpenAI(api_key=key)
+        # retries live in llm_resilience so they respect deadlines + the governor
+        _client = lib.OpenAI(api_key=key, max_retries=0, http_client=openai_async.sync_http_client())
     return _client
 
 
+def _usage_tokens(response) -> int | None:
+    usage = getattr(response, "usage", None)
+    total = getattr(usage, "total_tokens", None) if usage is not None else None
+    return int(total) if total is not None else None
+
+
+def _deadline() -> float:
+    """Whole-call budget incl. retries: short when a person is waiting, long for ingestion."""
+    if llm_governor.current_lane() == llm_governor.BACKGROUND:
+        name, default = "ATLUS_OPENAI_DEADLINE_BACKGROUND", "180"
+    else:
+        name, default = "ATLUS_OPENAI_DEADLINE_INTERACTIVE", "60"
+    try:
+        return float((os.environ.get(name) or default).strip() or default)
+    except ValueError:
+        return float(default)
+
+
+def _hedge_after(hedge: bool) -> float | None:
+    if not hedge or llm_governor.current_lane() == llm_governor.BACKGROUND:
+        return None
+    try:
+        after = float((os.environ.get("ATLUS_OPENAI_HEDGE_AFTER") or "8").strip() or "8")
+    except ValueError:
+        return None
+    return after if after > 0 else None
+
+
+def _after_queue(model: str, timeout: float, queued: float) -> float:
+    """What's left of the attempt's timeout once the governor let it through."""
+    left = timeout - (time.monotonic() - queued)
+    if left <= 0:
+        raise TimeoutError(f"OpenAI {model} attempt spent its {timeout:.0f}s waiting for the rate governor")
+    return left
+
+
+def _governed_call(model: str, est_tokens: int, fn, timeout: float, op: str, units: dict | None):
+    """One attempt: wait for the governor, then call fn(timeout) and ledger what it cost."""
+    queued = time.monotonic()
+    with llm_governor.reserve(model, est_tokens) as slot:
+        timeout = _after_queue(model, timeout, queued)
+        started = time.perf_counter()
+        try:
+            response = fn(timeout)
+        except Exception as e:
+            if getattr(e, "status_code", None) == 429:
+                llm_governor.penalize(model)
+            raise
+        slot.settle(_usage_tokens(response))
+    usage_ledger.record(model, op, response, latency_s=time.perf_counter() - started, **(units or {}))
+    return response
+
+
+def _call(model: str, est_tokens: int, fn, hedge: bool = False, afn=None, op: str = "chat", units: dict | None = None):
+    """Governed + retried + (optionally) hedged API call; fn(timeout) does the request.
+
+    afn(timeout) is the AsyncOpenAI version of the same request; when given and the async path
+    is on, the call runs on the shared event loop instead of this thread's sync client.
+    op names the call in the usage ledger; units carries what isn't in response.usage
+    (tts_chars, audio_seconds).
+    """
+    if afn is not None and openai_async.enabled():
+        return openai_async.run(_acall(model, est_tokens, afn, hedge=hedge, op=op, units=units))
+    return call_with_retries(
+        lambda timeout: _governed_call(model, est_tokens, fn, timeout, op, units),
+        model=model,
+        deadline=_deadline(),
+        hedge_after=_hedge_after(hedge),
+    )
+
+
+async def _agoverned_call(model: str, est_tokens: int, afn, timeout: float, op: str, units: dict | None):
+    queued = time.monotonic()
+    slot = await llm_governor.aacquire(model, est_tokens)
+    timeout = _after_queue(model, timeout, queued)
+    started = time.perf_counter()
+    try:
+        response = await afn(timeout)
+    except Exception as e:
+        if getattr(e, "status_code", None) == 429:
+            llm_governor.penalize(model)
+        raise
+    slot.settle(_usage_tokens(response))
+    usage_ledger.record(model, op, response, latency_s=time.perf_counter() - started, **(units or {}))
+    return response
+
+
+async def _acall(model: str, est_tokens: int, afn, hedge: bool = False, op: str = "chat", units: dict | None = None):
+    return await acall_with_retries(
+        lambda timeout: _agoverned_call(model, est_tokens, afn, timeout, op, units),
+        model=model,
+        deadline=_deadline(),
+        hedge_after=_hedge_after(hedge),
+    )
+
+
+def _chat(model: str, messages: list, hedge: bool = False, op: str = "chat", **kwargs):
+    """chat.completions.create behind the rate governor and retry layer (lane comes from the caller's context)."""
+    if openai_async.enabled():
+        return openai_async.run(_achat(model, messages, hedge=hedge, op=op, **kwargs))
+    est = llm_governor.estimate_tokens(messages, kwargs.get("max_tokens"))
+    return _call(
+        model,
+        est,
+        lambda timeout: _get_client().chat.completions.create(
+            model=model, messages=messages, timeout=timeout, **kwargs
+        ),
+        hedge=hedge,
+        op=op,
+    )
+
+
+async def _achat(model: str, messages: list, hedge: bool = False, op: str = "chat", **kwargs):
+    est = llm_governor.estimate_tokens(messages, kwargs.get("max_tokens"))
+    return await _acall(
+        model,
+        est,
+        lambda timeout: openai_async.get_client().chat.completions.create(
+            model=model, messages=messages, timeout=timeout, **kwargs
+        ),
+        hedge=hedge,
+        op=op,
+    )
+
+
+# models / deployments that answered 400 to a json_schema response_format; they get json_object
+_schema_unsupported: set = set()
+
+
+def _schema_enabled(model: str) -> bool:
+    flag = (os.environ.get("ATLUS_OPENAI_JSON_SCHEMA") or "1").strip().lower()
+    return flag not in ("0", "false", "no", "off") and model not in _schema_unsupported
+
+
+def _rejects_schema(exc: BaseException) -> bool:
+    return getattr(exc, "status_code", None) == 400 and any(
+        w in str(exc).lower() for w in ("response_format", "json_schema")
+    )
+
+
+def _json_formats(model: str, name: str, schema: dict) -> list:
+    if _schema_enabled(model):
+        return [structured_output.response_format(name, schema), {"type": "json_object"}]
+    return [{"type": "json_object"}]
+
+
+def _chat_json(model: str, messages: list, name: str, schema: dict, op: str, **kwargs) -> structured_output.Parsed:
+    """_chat constrained to a strict JSON schema, read back with structured_output.loads."""
+    formats = _json_formats(model, name, schema)
+    for i, fmt in enumerate(formats):
+        try:
+            response = _chat(model, messages, op=op, response_format=fmt, **kwargs)
+        except Exception as e:
+            if i + 1 < len(formats) and _rejects_schema(e):
+                log.warning("%s rejected json_schema output (%s); using json_object", model, e)
+                _schema_unsupported.add(model)
+                continue
+            raise
+        return structured_output.from_response(response)
+
+
+async def _achat_json(model: str, messages: list, name: str, schema: dict, op: str, **kwargs) -> structured_output.Parsed:
+    formats = _json_formats(model, name, schema)
+    for i, fmt in enumerate(formats):
+        try:
+            response = await _achat(model, messages, op=op, response_format=fmt, **kwargs)
+        except Exception as e:
+            if i + 1 < len(formats) and _rejects_schema(e):
+                log.warning("%s rejected json_schema output (%s); using json_object", model, e)
+                _schema_unsupported.add(model)
+                continue
+            raise
+        return structured_output.from_response(response)
+
+
 NODE_GEN_SYSTEM = """You extract structure from a chunk of textbook or note content. Output a JSON object with:
 - "title": short descriptive title (string)
 - "summary": 2-4 sentence summary (string)
@@ -38,6 +216,12 @@ NODE_GEN_SYSTEM = """You extract structure from a chunk of textbook or note cont
 
 Output only valid JSON, no markdown code fence."""
 
+NODE_SCHEMA = structured_output.obj({
+    "title": {"type": "string"},
+    "summary": {"type": "string"},
+    "concepts": {"type": "array", "items": {"type": "string"}},
+})
+
 
 def _local_node_from_chunk(chunk_text: str, section_title: str | None = None) -> Dict[str, Any]:
     """Offline fallback: first line-ish title + blurb, no LLM."""
@@ -52,53 +236,80 @@ def _local_node_from_chunk(chunk_text: str, section_title: str | None = None) ->
     }
 
 
+def _falls_back(exc: BaseException) -> bool:
+    """Transient API trouble, an open circuit or an unreadable reply: yes. 401 / 403 / 400: no.
+
+    An error the API answered with a status (bad or revoked key, no access to the model, bad
+    request) would hit every chunk the same way, so it fails the job instead of quietly giving a
+    whole textbook first-line titles.
+    """
+    return getattr(exc, "status_code", None) is None or is_retryable(exc)
+
+
 def generate_node_from_chunk(chunk_text: str, section_title: str | None = None) -> Dict[str, Any]:
     """JSON shape for one chunk from the small model, or _local_node_from_chunk if we're offline."""
-    if not _has_openai():
+    if not _has_openai() or is_degraded("gpt-4o-mini"):
+        return _local_node_from_chunk(chunk_text, section_title)
+    try:
+        parsed = _chat_json(
+            "gpt-4o-mini", _node_messages(chunk_text, section_title), "node_metadata", NODE_SCHEMA,
+            op="node_gen", temperature=0.3,
+        )
+        return _node_from_parsed(parsed, chunk_text, section_title)
+    except Exception as e:
+        if not _falls_back(e):
+            raise
+        # one bad chunk (API down, no JSON at all) shouldn't sink the whole file
+        log.warning("node metadata LLM failed, using local fallback: %s", e)
+        return _local_node_from_chunk(chunk_text, section_title)
+
+
+async def agenerate_node_from_chunk(chunk_text: str, section_title: str | None = None) -> Dict[str, Any]:
+    """generate_node_from_chunk for the event loop — ingestion gathers a whole batch of these."""
+    if not _has_openai() or is_degraded("gpt-4o-mini"):
         return _local_node_from_chunk(chunk_text, section_title)
-    client = _get_client()
+    try:
+        parsed = await _achat_json(
+            "gpt-4o-mini", _node_messages(chunk_text, section_title), "node_metadata", NODE_SCHEMA,
+            op="node_gen", temperature=0.3,
+        )
+        return _node_from_parsed(parsed, chunk_text, section_title)
+    except Exception as e:
+        if not _falls_back(e):
+            raise
+        log.warning("node metadata LLM failed, using local fallback: %s", e)
+        return _local_node_from_chunk(chunk_text, section_title)
+
+
+def _node_messages(chunk_text: str, section_title: str | None = None) -> list:
     user_content = chunk_text[:8000]
     if section_title:
         user_content = f"Section: {section_title}\n\n{user_content}"
+    return [
+        {"role": "system", "content": NODE_GEN_SYSTEM},
+        {"role": "user", "content": user_content},
+    ]
+
+
+def _node_from_parsed(parsed: structured_output.Parsed, chunk_text: str, section_title: str | None) -> Dict[str, Any]:
+    """Whatever fields made it back, the local fallback for the rest (a cut-off reply keeps its title)."""
+    data = parsed.dict()
+    if not data:
+        raise ValueError("node metadata reply had no JSON object")
+    if not parsed.complete:
+        log.info("node metadata reply was incomplete; keeping fields %s", sorted(data))
+    local = _local_node_from_chunk(chunk_text, section_title)
+    concepts = data.get("concepts")
+    return {
+        "title": str(data.get("title") or "").strip() or local["title"],
+        "summary": str(data.get("summary") or "").strip() or local["summary"],
+        "concepts": [str(c).strip() for c in concepts if str(c).strip()] if isinstance(concepts, list) else [],
+    }
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": NODE_GEN_SYSTEM},
-            {"role": "user", "content": user_content},
-        ],
-        temperature=0.3,
-    )
-    raw = response.choices[0].message.content.strip()
-    if raw.startswith("```"):
-        raw = raw.split("\n", 1)[-1].rsplit("```", 1)[0].strip()
-    return json.loads(raw)
-
-
-def _prepare_image_bytes_for_vision(image_bytes: bytes) -> Tuple[bytes, str]:
-    """Flatten alpha → RGB, shrink huge scans, JPEG for the vision endpoint."""
-    from PIL import Image
-
-    img = Image.open(io.BytesIO(image_bytes))
-    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
-        background = Image.new("RGB", img.size, (255, 255, 255))
-        rgba = img.convert("RGBA")
-        background.paste(rgba, mask=rgba.split()[3])
-        img = background
-    else:
-        img = img.convert("RGB")
-
-    max_side = int((os.environ.get("OCR_IMAGE_MAX_SIDE") or "3072").strip() or "3072")
-    w, h = img.size
-    if max(w, h) > max_side:
-        scale = max_side / max(w, h)
-        img = img.resize((int(w * scale), int(h * scale)), Image.Resampling.LANCZOS)
 
-    out = io.BytesIO()
-    quality = int((os.environ.get("OCR_JPEG_QUALITY") or "90").strip() or "90")
-    quality = max(60, min(quality, 100))
-    img.save(out, format="JPEG", quality=quality, optimize=True)
-    return out.getvalue(), "image/jpeg"
+def _prepare_image_bytes_for_vision(image_bytes: bytes) -> vision_preprocess.PreparedImage:
+    """Crop / deskew / tile-size the page (see vision_preprocess) and pick the detail level."""
+    return vision_preprocess.prepare(image_bytes)
 
 
 VISION_HANDWRITING_SYSTEM = """You transcribe handwritten notes from images into clean, editable Markdown.
@@ -119,13 +330,12 @@ def handwriting_image_to_markdown(image_bytes: bytes, filename: str = "") -> Tup
     if not _has_openai():
         raise RuntimeError("OPENAI_API_KEY required for vision handwriting OCR")
 
-    jpeg_bytes, mime = _prepare_image_bytes_for_vision(image_bytes)
+    prepared = _prepare_image_bytes_for_vision(image_bytes)
     model = (os.environ.get("OCR_VISION_MODEL") or "gpt-4o").strip() or "gpt-4o"
-    b64 = base64.standard_b64encode(jpeg_bytes).decode("ascii")
-    data_url = f"data:{mime};base64,{b64}"
+    b64 = base64.standard_b64encode(prepared.data).decode("ascii")
+    data_url = f"data:{prepared.mime};base64,{b64}"
 
-    client = _get_client()
-    response = client.chat.completions.create(
+    response = _chat(
         model=model,
         messages=[
             {"role": "system", "content": VISION_HANDWRITING_SYSTEM},
@@ -138,13 +348,14 @@ def handwriting_image_to_markdown(image_bytes: bytes, filename: str = "") -> Tup
                     },
                     {
                         "type": "image_url",
-                        "image_url": {"url": data_url, "detail": "high"},
+                        "image_url": {"url": data_url, "detail": prepared.detail},
                     },
                 ],
             },
         ],
         temperature=0.1,
         max_tokens=8192,
+        op="vision_ocr",
     )
     markdown = (response.choices[0].message.content or "").strip()
     if markdown.startswith("```"):
@@ -163,32 +374,23 @@ def generate_markdown_structure(ocr_text: str) -> str:
     """Pretty-print noisy OCR; passthrough if we can't call the API."""
     if not _has_openai():
         return (ocr_text or "").strip()
-    client = _get_client()
     system = """You are an assistant that turns raw OCR text from handwritten notes into clean, structured Markdown.
 Use: headings (##), bullet points (-), numbered lists, **bold** for terms, and clear paragraph breaks.
 If you see equations, use inline math in $...$ or block $$...$$ where appropriate.
 Output only the Markdown, no explanation."""
-    response = client.chat.completions.create(
+    response = _chat(
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": system},
             {"role": "user", "content": ocr_text[:12000]},
         ],
         temperature=0.2,
+        op="ocr_markdown",
     )
     return response.choices[0].message.content.strip()
 
 
-def format_syllabus_markdown(syllabus_text: str) -> str:
-    """Rewrite extracted syllabus text into organized markdown."""
-    source = (syllabus_text or "").strip()
-    if not source:
-        return ""
-    if not _has_openai():
-        return source
-
-    client = _get_client()
-    system = """You are an assistant that organizes raw syllabus text into clean, structured Markdown.
+SYLLABUS_MARKDOWN_SYSTEM = """You are an assistant that organizes raw syllabus text into clean, structured Markdown.
 Rules:
 - Preserve facts exactly; do not invent or alter details.
 - Use concise headings and sections.
@@ -204,13 +406,24 @@ Rules:
 - Use bullet lists and tables when helpful.
 - If information is missing, omit the section (do not write placeholders).
 - Output ONLY markdown, no explanations or code fences."""
-    response = client.chat.completions.create(
+
+
+def format_syllabus_markdown(syllabus_text: str) -> str:
+    """Rewrite extracted syllabus text into organized markdown."""
+    source = (syllabus_text or "").strip()
+    if not source:
+        return ""
+    if not _has_openai():
+        return source
+
+    response = _chat(
         model="gpt-4o-mini",
         messages=[
-            {"role": "system", "content": system},
+            {"role": "system", "content": SYLLABUS_MARKDOWN_SYSTEM},
             {"role": "user", "content": source[:120000]},
         ],
         temperature=0.1,
+        op="syllabus_markdown",
     )
     out = (response.choices[0].message.content or "").strip()
     if out.startswith("```"):
@@ -244,24 +457,26 @@ def ask_brain(context_text: str, user_prompt: str, mode: str = "custom") -> str:
     # Cap context to avoid token limits (roughly 8k chars for gpt-4o-mini)
     context = (context_text or "").strip()[:24000]
 
-    client = _get_client()
     user_content = f"Notes and documents:\n\n{context}\n\n---\n\nUser request: {user_prompt.strip() or 'Summarize the above.'}"
-    response = client.chat.completions.create(
+    response = _chat(
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": system},
             {"role": "user", "content": user_content},
         ],
         temperature=0.3,
+        hedge=True,
+        op=f"ask:{mode if mode in system_map else 'custom'}",
     )
     return response.choices[0].message.content.strip()
 
 
 TTS_VOICES = frozenset({"alloy", "echo", "fable", "onyx", "nova", "shimmer"})
+TTS_MODEL = "tts-1"
 
 
 def synthesize_speech_mp3(text: str, voice: str = "alloy") -> bytes:
-    """OpenAI Text-to-Speech (audio API) — returns MP3 bytes."""
+    """OpenAI Text-to-Speech (audio API) for up to 4096 chars — returns MP3 bytes. Longer text: tts.stream."""
     if not _has_openai():
         raise RuntimeError("OPENAI_API_KEY not set; text-to-speech is unavailable.")
     voice = (voice or "alloy").lower().strip()
@@ -271,13 +486,26 @@ def synthesize_speech_mp3(text: str, voice: str = "alloy") -> bytes:
     if not text:
         raise ValueError("text is required")
     if len(text) > 4096:
-        text = text[:4096]
-
-    client = _get_client()
-    response = client.audio.speech.create(
-        model="tts-1",
-        voice=voice,
-        input=text,
+        # the API cap; app.services.tts splits longer text into segments
+        raise ValueError("text too long for one speech call (max 4096 characters)")
+
+    response = _call(
+        TTS_MODEL,
+        0,
+        lambda timeout: _get_client().audio.speech.create(
+            model=TTS_MODEL,
+            voice=voice,
+            input=text,
+            timeout=timeout,
+        ),
+        afn=lambda timeout: openai_async.get_client().audio.speech.create(
+            model=TTS_MODEL,
+            voice=voice,
+            input=text,
+            timeout=timeout,
+        ),
+        op="tts",
+        units={"tts_chars": len(text)},
     )
     if hasattr(response, "content") and response.content is not None:
         return bytes(response.content)
@@ -292,22 +520,71 @@ def synthesize_speech_mp3(text: str, voice: str = "alloy") -> bytes:
 
 
 _MAX_WHISPER_BYTES = 15 * 1024 * 1024  # OpenAI allows up to 25MB; keep a sane cap
+WHISPER_API_MAX_BYTES = 25 * 1024 * 1024  # the API's own limit, for segments cut by transcription.py
+_WHISPER_BYTES_PER_SECOND = 4000  # ~32 kbps, what browser webm/opus recordings come out at
 
 
-def transcribe_audio_bytes(data: bytes, filename: str = "recording.webm") -> str:
-    """Speech-to-text via OpenAI Whisper (whisper-1)."""
+def _whisper(data: bytes, filename: str, est_seconds: float, **params):
     if not _has_openai():
         raise RuntimeError("OPENAI_API_KEY not set; speech-to-text is unavailable.")
     if not data or len(data) < 80:
         raise ValueError("Audio clip is too short or empty.")
-    if len(data) > _MAX_WHISPER_BYTES:
-        raise ValueError("Audio file too large (max 15 MB).")
 
-    client = _get_client()
-    bio = io.BytesIO(data)
-    bio.name = filename or "recording.webm"
-    transcript = client.audio.transcriptions.create(
-        model="whisper-1",
-        file=bio,
+    def _transcribe(timeout):
+        bio = io.BytesIO(data)  # fresh stream per attempt
+        bio.name = filename or "recording.webm"
+        return _get_client().audio.transcriptions.create(
+            model="whisper-1",
+            file=bio,
+            timeout=timeout,
+            **params,
+        )
+
+    async def _atranscribe(timeout):
+        bio = io.BytesIO(data)
+        bio.name = filename or "recording.webm"
+        return await openai_async.get_client().audio.transcriptions.create(
+            model="whisper-1",
+            file=bio,
+            timeout=timeout,
+            **params,
+        )
+
+    # whisper bills by the minute; used only when the response has no usage.seconds
+    return _call(
+        "whisper-1", 0, _transcribe, afn=_atranscribe, op="whisper", units={"audio_seconds": round(est_seconds, 1)}
     )
+
+
+def transcribe_audio_bytes(data: bytes, filename: str = "recording.webm") -> str:
+    """Speech-to-text via OpenAI Whisper (whisper-1). Lecture-length audio: transcription.transcribe."""
+    if data and len(data) > _MAX_WHISPER_BYTES:
+        raise ValueError("Audio file too large (max 15 MB).")
+    transcript = _whisper(data, filename, len(data or b"") / _WHISPER_BYTES_PER_SECOND)
     return (getattr(transcript, "text", None) or "").strip()
+
+
+def _field(obj, name):
+    return obj.get(name) if isinstance(obj, dict) else getattr(obj, name, None)
+
+
+def transcribe_audio_timed(data: bytes, filename: str = "recording.webm", seconds: float | None = None) -> Dict[str, Any]:
+    """One Whisper call with timestamps (verbose_json), up to the API's 25 MB.
+
+    Returns {"text", "duration", "segments": [{"start", "end", "text"}]}; times are seconds from the
+    start of this clip. seconds is the clip length when the caller knows it (usage ledger estimate).
+    """
+    if data and len(data) > WHISPER_API_MAX_BYTES:
+        raise ValueError("Audio segment too large for one Whisper call (max 25 MB).")
+    est = seconds if seconds is not None else len(data or b"") / _WHISPER_BYTES_PER_SECOND
+    transcript = _whisper(data, filename, est, response_format="verbose_json")
+    segments = []
+    for seg in _field(transcript, "segments") or []:
+        text = (_field(seg, "text") or "").strip()
+        if text:
+            segments.append({"start": float(_field(seg, "start") or 0), "end": float(_field(seg, "end") or 0), "text": text})
+    return {
+        "text": (_field(transcript, "text") or "").strip(),
+        "duration": float(_field(transcript, "duration") or est),
+        "segments": segments,
+    }
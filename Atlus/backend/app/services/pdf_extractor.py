@@ -1,15 +1,16 @@
 """PDF → plain text via PyPDF2 (good enough for class docs)."""
 import io
+import os
 
-try:
-    from PyPDF2 import PdfReader
-except ImportError:
-    PdfReader = None
+from app.services.stage_timing import span
 
 
+@span("pdf_pypdf2")
 def extract_text_from_pdf(file_stream) -> str:
     """Concatenate all pages from a seekable PDF stream."""
-    if PdfReader is None:
+    try:
+        from PyPDF2 import PdfReader  # loaded on the first PDF, not at app start
+    except ImportError:
         raise RuntimeError("PyPDF2 is required for PDF extraction. pip install PyPDF2")
 
     reader = PdfReader(file_stream)
@@ -25,8 +26,9 @@ def extract_text_from_pdf_bytes(data: bytes) -> str:
     return extract_text_from_pdf(io.BytesIO(data))
 
 
-def extract_text_from_pdf_fitz(data: bytes) -> str:
-    """PyMuPDF text layer — often succeeds when PyPDF2 returns nothing."""
+@span("pdf_fitz")
+def extract_text_from_pdf_fitz(data) -> str:
+    """PyMuPDF text layer — often succeeds when PyPDF2 returns nothing. data: bytes or a path."""
     try:
         import fitz
     except ImportError:
@@ -34,7 +36,7 @@ def extract_text_from_pdf_fitz(data: bytes) -> str:
     if not data:
         return ""
     try:
-        doc = fitz.open(stream=data, filetype="pdf")
+        doc = fitz.open(str(data)) if isinstance(data, (str, os.PathLike)) else fitz.open(stream=data, filetype="pdf")
     except Exception:
         return ""
     try:
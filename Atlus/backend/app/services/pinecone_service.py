@@ -1,11 +1,6 @@
 """Pinecone cleanup only (legacy vectors from older installs). No new vectors are written."""
 import os
 
-try:
-    from pinecone import Pinecone
-except (ImportError, Exception):
-    Pinecone = None
-
 _index_name = None
 _pc = None
 _index_obj = None
@@ -14,9 +9,13 @@ _index_obj = None
 def _index():
     global _pc, _index_name, _index_obj
     key = os.environ.get("PINECONE_API_KEY", "").strip()
-    if not key or Pinecone is None:
+    if not key:
         return None
     if _pc is None:
+        try:
+            from pinecone import Pinecone  # only installs with legacy vectors have a key set
+        except (ImportError, Exception):
+            return None
         _pc = Pinecone(api_key=key)
     if _index_name is None:
         _index_name = os.environ.get("PINECONE_INDEX", "atlus-brain")
@@ -1,15 +1,12 @@
 """PowerPoint → plain text."""
 import io
 
-try:
-    from pptx import Presentation
-except ImportError:
-    Presentation = None
-
 
 def extract_text_from_pptx(file_stream) -> str:
     """Slurp all slide text from a file-like PPTX."""
-    if Presentation is None:
+    try:
+        from pptx import Presentation  # lxml-heavy: load on the first .pptx, not at app start
+    except ImportError:
         raise RuntimeError("python-pptx required for PPTX extraction. pip install python-pptx")
 
     prs = Presentation(file_stream)
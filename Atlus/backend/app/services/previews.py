@@ -0,0 +1,143 @@
+"""Downscaled WebP derivatives of uploaded scans and PDFs, cached on disk next to the upload.
+
+    uploads/<brain>/<stored>.pdf  →  uploads/<brain>/.previews/<stored>.<variant>.p<page>.v<N>.webp
+
+Generated on first request (one generator per derivative at a time) and reused until the original
+changes, so the notes gallery pulls a ~20 KB thumbnail instead of a multi-MB photo / whole PDF.
+Deleting the brain's upload dir drops its previews too; discard() clears one source's.
+"""
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import threading
+from functools import lru_cache
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+log = logging.getLogger(__name__)
+
+# longest side in px
+VARIANTS = {"thumb": 320, "preview": 1280}
+RENDER_VERSION = 1  # bump when rendering changes so cached files + ETags roll over
+WEBP_QUALITY = 80
+CACHE_DIR = ".previews"
+
+_locks: dict = {}
+_locks_guard = threading.Lock()
+
+
+class PreviewUnavailable(Exception):
+    """No derivative for this file (type we can't render, page out of range, missing dependency)."""
+
+
+def _lock_for(key: str) -> threading.Lock:
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            if len(_locks) > 1024:
+                _locks.clear()
+            lock = _locks[key] = threading.Lock()
+        return lock
+
+
+def cache_path(source: Path, variant: str, page: int = 1) -> Path:
+    return source.parent / CACHE_DIR / f"{source.name}.{variant}.p{page}.v{RENDER_VERSION}.webp"
+
+
+def etag_for(source: Path, variant: str, page: int = 1) -> str:
+    """Strong validator: same original bytes + same render settings → byte-identical derivative."""
+    st = source.stat()
+    key = f"{source.name}:{variant}:{page}:{RENDER_VERSION}:{VARIANTS.get(variant)}:{st.st_size}:{st.st_mtime_ns}"
+    return hashlib.sha1(key.encode()).hexdigest()[:32]
+
+
+@lru_cache(maxsize=512)
+def _pdf_page_count(path: str, mtime_ns: int) -> int:
+    try:
+        import fitz
+    except ImportError:
+        raise PreviewUnavailable("pymupdf not installed; PDF previews unavailable (pip install pymupdf)")
+    try:
+        with fitz.open(path) as doc:
+            return len(doc)
+    except Exception as e:
+        raise PreviewUnavailable(f"could not open PDF: {e}")
+
+
+def page_count(source: Path) -> int:
+    return _pdf_page_count(str(source), source.stat().st_mtime_ns)
+
+
+def _render_image(source: Path, side: int) -> Image.Image:
+    try:
+        img = Image.open(source)
+    except Exception as e:
+        raise PreviewUnavailable(f"not an image we can read: {e}")
+    if img.format == "JPEG":
+        img.draft("RGB", (side, side))  # decode at 1/2..1/8 scale straight from the JPEG
+    img = ImageOps.exif_transpose(img)
+    img.thumbnail((side, side), Image.Resampling.LANCZOS)
+    if img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+    return img
+
+
+def _render_pdf_page(source: Path, page: int, side: int) -> Image.Image:
+    if page > page_count(source):
+        raise PreviewUnavailable(f"page {page} out of range")
+    import fitz
+
+    with fitz.open(source) as doc:
+        p = doc.load_page(page - 1)
+        zoom = side / max(p.rect.width, p.rect.height, 1)
+        pix = p.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        return Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+
+
+def get(source: Path, file_type: str, variant: str, page: int = 1) -> Path:
+    """Path of the cached derivative, rendering it first if it's missing or older than the original."""
+    if variant not in VARIANTS:
+        raise PreviewUnavailable(f"unknown variant {variant!r}")
+    if file_type not in ("pdf", "image"):
+        raise PreviewUnavailable("no preview for this file type")
+    if page < 1 or (file_type == "image" and page != 1):
+        raise PreviewUnavailable(f"page {page} out of range")
+    out = cache_path(source, variant, page)
+    src_mtime = source.stat().st_mtime
+    if out.is_file() and out.stat().st_mtime >= src_mtime:
+        return out
+    with _lock_for(str(out)):
+        if out.is_file() and out.stat().st_mtime >= src_mtime:
+            return out  # another request rendered it while we waited
+        side = VARIANTS[variant]
+        img = _render_pdf_page(source, page, side) if file_type == "pdf" else _render_image(source, side)
+        buf = io.BytesIO()
+        img.save(buf, format="WEBP", quality=WEBP_QUALITY, method=4)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=out.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(buf.getvalue())
+            os.replace(tmp, out)  # readers never see a half-written file
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+    return out
+
+
+def discard(source: Path) -> None:
+    """Remove every cached derivative of one upload."""
+    cache = source.parent / CACHE_DIR
+    if not cache.is_dir():
+        return
+    for p in cache.glob(f"{source.name}.*.webp"):
+        try:
+            p.unlink()
+        except OSError:
+            pass
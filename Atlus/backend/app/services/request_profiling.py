@@ -0,0 +1,156 @@
+"""Per-request latency + SQL accounting, and the slow-query log. Hooked up by init_app() in create_app.
+
+Each request gets:
+- atlus_http_request_seconds{method,route,status}, plus query-count / SQL-time histograms per route;
+- a Server-Timing header (db;dur=..;desc="N queries", app;dur=..) visible in browser devtools;
+- a warning log when it is slow, runs a lot of queries, or repeats one statement enough to smell
+  like N+1 (think a per-brain query inside a loop).
+Any statement slower than SLOW_QUERY_MS is logged with its route, request or not (ingest threads too).
+"""
+import logging
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.services import metrics
+
+log = logging.getLogger(__name__)
+
+REQUEST_SECONDS = metrics.histogram(
+    "atlus_http_request_seconds", "Request latency by route template, method and status."
+)
+REQUEST_QUERIES = metrics.histogram(
+    "atlus_http_request_queries",
+    "SQL statements executed per request.",
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+)
+REQUEST_SQL_SECONDS = metrics.histogram(
+    "atlus_http_request_sql_seconds", "Time spent in SQL per request."
+)
+SLOW_QUERIES = metrics.counter("atlus_sql_slow_queries_total", "Statements slower than SLOW_QUERY_MS.")
+
+_listening = False
+_settings = {"slow_query_ms": 200.0}
+
+
+def _route() -> str:
+    rule = getattr(request, "url_rule", None)
+    return rule.rule if rule is not None else "<unmatched>"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("atlus_query_start", []).append(time.perf_counter())
+    if context is not None:
+        context.atlus_timed = True
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("atlus_query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    if context is not None:
+        context.atlus_timed = False
+    in_request = has_request_context()
+    if in_request:
+        g.sql_count = g.get("sql_count", 0) + 1
+        g.sql_seconds = g.get("sql_seconds", 0.0) + elapsed
+        statements = g.get("sql_statements")
+        if statements is None:
+            statements = g.sql_statements = Counter()
+        statements[statement] += 1
+    if elapsed * 1000 >= _settings["slow_query_ms"]:
+        SLOW_QUERIES.inc()
+        log.warning(
+            "slow query %.0f ms%s%s: %s",
+            elapsed * 1000,
+            f" [{request.method} {_route()}]" if in_request else "",
+            " (executemany)" if executemany else "",
+            " ".join(statement.split())[:500],
+        )
+
+
+def _handle_error(exc_context):
+    # a statement that raised gets no after_cursor_execute: drop its start time, or the stack on
+    # this pooled connection grows and later statements pair with the wrong start
+    conn, context = exc_context.connection, exc_context.execution_context
+    if conn is None or not getattr(context, "atlus_timed", False):
+        return
+    context.atlus_timed = False
+    starts = conn.info.get("atlus_query_start")
+    if starts:
+        starts.pop()
+
+
+def _start_request():
+    g.request_started = time.perf_counter()
+
+
+def _finish_request(response):
+    started = g.get("request_started")
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    route = _route()
+    queries = g.get("sql_count", 0)
+    sql_seconds = g.get("sql_seconds", 0.0)
+    REQUEST_SECONDS.observe(elapsed, method=request.method, route=route, status=response.status_code)
+    REQUEST_QUERIES.observe(queries, route=route)
+    REQUEST_SQL_SECONDS.observe(sql_seconds, route=route)
+    response.headers.add(
+        "Server-Timing",
+        f'db;dur={sql_seconds * 1000:.1f};desc="{queries} queries", app;dur={elapsed * 1000:.1f}',
+    )
+
+    cfg = g.get("profiling_cfg") or {}
+    repeated, repeats = None, 0
+    statements = g.get("sql_statements")
+    if statements:
+        repeated, repeats = statements.most_common(1)[0]
+    problems = []
+    if elapsed * 1000 >= cfg.get("slow_request_ms", 1000):
+        problems.append("slow")
+    if queries >= cfg.get("query_warn", 50):
+        problems.append("many queries")
+    if repeats >= cfg.get("repeat_warn", 10):
+        problems.append(f"same statement x{repeats} (N+1?)")
+    if problems:
+        log.warning(
+            "%s %s -> %s in %.0f ms, %s queries / %.0f ms SQL: %s%s",
+            request.method,
+            route,
+            response.status_code,
+            elapsed * 1000,
+            queries,
+            sql_seconds * 1000,
+            ", ".join(problems),
+            f" | top: {' '.join(repeated.split())[:200]}" if repeats > 1 else "",
+        )
+    return response
+
+
+def init_app(app):
+    """Register the request hooks on app and the SQL listeners (once per process, every engine)."""
+    global _listening
+    cfg = {
+        "slow_request_ms": float(app.config.get("SLOW_REQUEST_MS") or 1000),
+        "query_warn": int(app.config.get("REQUEST_QUERY_WARN") or 50),
+        "repeat_warn": int(app.config.get("REQUEST_REPEAT_WARN") or 10),
+    }
+    _settings["slow_query_ms"] = float(app.config.get("SLOW_QUERY_MS") or 200)
+
+    @app.before_request
+    def _profiling_start():
+        g.profiling_cfg = cfg
+        _start_request()
+
+    app.after_request(_finish_request)
+
+    if not _listening:
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+        _listening = True
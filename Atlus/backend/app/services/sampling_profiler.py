@@ -0,0 +1,57 @@
+"""Poor man's sampling profiler: snapshot every thread's Python stack on a timer.
+
+Output is "folded" stacks (frame;frame;frame count), which flamegraph.pl and speedscope read
+directly. Dev only — it's exposed through /api/debug/profile when PROFILER_ENABLED is set.
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# leaf frames in these files are threads parked on a lock / socket / queue, not doing work
+_IDLE_FILES = ("threading.py", "selectors.py", "queue.py", "socketserver.py", "base_events.py", "thread.py")
+
+_busy = threading.Lock()
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample(seconds: float, interval: float = 0.005, include_idle: bool = False) -> Counter:
+    """Sample all other threads for `seconds`; returns Counter of folded stack -> samples."""
+    if not _busy.acquire(blocking=False):
+        raise ProfilerBusy("a profile is already running")
+    try:
+        me = threading.get_ident()
+        names = {}
+        counts: Counter = Counter()
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            for tid, frame in sys._current_frames().items():
+                if tid == me:
+                    continue
+                if not include_idle and os.path.basename(frame.f_code.co_filename) in _IDLE_FILES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if tid not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(tid, f"thread-{tid}"))
+                counts[";".join(reversed(stack))] += 1
+            time.sleep(interval)
+        return counts
+    finally:
+        _busy.release()
+
+
+def folded(counts: Counter) -> str:
+    return "".join(f"{stack} {n}\n" for stack, n in counts.most_common())
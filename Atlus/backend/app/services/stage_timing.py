@@ -0,0 +1,107 @@
+"""Timing spans for the ingestion pipeline stages.
+
+    with span("extract"):
+        ...
+
+Every span lands in the atlus_pipeline_stage_seconds histogram (/metrics). Inside collect() it
+is also added to that collector, and to the collectors above it, which is how one upload (and each
+IngestionJob) gets its own breakdown. The collector lives in a contextvar, so it follows work into
+pool threads submitted with a copied context and onto the OpenAI event loop.
+"""
+import contextlib
+import contextvars
+import threading
+import time
+from typing import Dict, Iterable, List, Tuple
+
+from app.services import metrics
+
+STAGE_SECONDS = metrics.histogram(
+    "atlus_pipeline_stage_seconds", "Wall time of one ingestion pipeline stage call."
+)
+
+_collector: contextvars.ContextVar["StageTimings | None"] = contextvars.ContextVar("stage_timings", default=None)
+
+
+class StageTimings:
+    """Durations per stage, in the order stages were first seen."""
+
+    def __init__(self, parent: "StageTimings | None" = None):
+        self.parent = parent
+        self.started = time.perf_counter()
+        self._stages: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            self._stages.setdefault(stage, []).append(seconds)
+        if self.parent is not None:
+            self.parent.add(stage, seconds)
+
+    def events(self) -> List[Tuple[str, float]]:
+        with self._lock:
+            return [(stage, s) for stage, values in self._stages.items() for s in values]
+
+    def summary(self) -> Dict[str, dict]:
+        """{stage: {count, total_ms, max_ms}} plus wall_ms for the collector's lifetime."""
+        with self._lock:
+            out = {
+                stage: {
+                    "count": len(values),
+                    "total_ms": round(sum(values) * 1000, 1),
+                    "max_ms": round(max(values) * 1000, 1),
+                }
+                for stage, values in self._stages.items()
+            }
+        out["wall_ms"] = round((time.perf_counter() - self.started) * 1000, 1)
+        return out
+
+
+def record(stage: str, seconds: float) -> None:
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    c = _collector.get()
+    if c is not None:
+        c.add(stage, seconds)
+
+
+def replay(events: Iterable[Tuple[str, float]]) -> None:
+    """Record spans measured elsewhere (e.g. in an extraction worker process)."""
+    for stage, seconds in events:
+        record(stage, seconds)
+
+
+@contextlib.contextmanager
+def span(stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
+
+
+@contextlib.contextmanager
+def collect():
+    """New collector for the block, nested under the current one (if any)."""
+    c = StageTimings(parent=_collector.get())
+    token = _collector.set(c)
+    try:
+        yield c
+    finally:
+        _collector.reset(token)
+
+
+def merge_summaries(old: dict | None, new: dict | None) -> dict:
+    """Add two summary() dicts — a resumed job keeps the time its earlier attempts spent."""
+    out = {k: dict(v) if isinstance(v, dict) else v for k, v in (old or {}).items()}
+    for stage, v in (new or {}).items():
+        if not isinstance(v, dict):
+            out[stage] = round((out.get(stage) or 0) + (v or 0), 1)
+            continue
+        prev = out.get(stage)
+        if not isinstance(prev, dict):
+            out[stage] = dict(v)
+            continue
+        prev["count"] = prev.get("count", 0) + v.get("count", 0)
+        prev["total_ms"] = round(prev.get("total_ms", 0) + v.get("total_ms", 0), 1)
+        prev["max_ms"] = max(prev.get("max_ms", 0), v.get("max_ms", 0))
+    return out
@@ -0,0 +1,150 @@
+"""JSON-schema response formats and a forgiving reader for what the model sends back.
+
+Extraction calls (node metadata, syllabus deadlines / profile) ask for
+response_format={"type": "json_schema", "strict": true, ...}, so the API constrains decoding to the
+schema and the reply is valid JSON of the right shape. Replies can still be damaged:
+- the reply hits max_tokens;
+- an OpenAI-compatible server ignores the schema;
+- a model or deployment has no schema support and we fall back to json_object.
+
+loads() gets as much out of those as it can:
+- ``` fences and chatter after the JSON are dropped;
+- raw newlines inside strings and trailing commas are accepted;
+- a truncated reply is cut back to the last complete element and its brackets closed.
+
+Parsed.complete says whether that was needed. Callers keep the complete part, which the
+normalizers already validate item by item, and fill the rest from their local fallbacks. They no
+longer throw the whole reply away, or the whole upload.
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+_FENCE_RE = re.compile(r"^\s*```[a-zA-Z]*\s*\n?|\n?```\s*$")
+_CLOSERS = {"{": "}", "[": "]"}
+_MAX_SALVAGE_TRIES = 40
+
+
+@dataclass
+class Parsed:
+    value: Any  # None when nothing usable came back
+    complete: bool  # parsed as sent (modulo fences / trailing text), nothing dropped
+
+    def dict(self) -> Dict[str, Any]:
+        return self.value if isinstance(self.value, dict) else {}
+
+
+def response_format(name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": schema}}
+
+
+def obj(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Strict-mode object: every property required, nothing extra (use nullable() for optional values)."""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def nullable(type_: str) -> Dict[str, Any]:
+    return {"type": [type_, "null"]}
+
+
+def _strip(raw: str) -> str:
+    text = (raw or "").strip()
+    if text.startswith("```"):
+        text = _FENCE_RE.sub("", text).strip()
+    return text
+
+
+def _repair(text: str):
+    """One pass over a JSON-ish prefix.
+
+    Returns (repaired chars, cut points). A cut point (n, open brackets) marks a place where
+    repaired[:n] plus the closing brackets is a complete document.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    cuts: List[tuple] = []
+    in_str = esc = False
+    for ch in text:
+        if in_str:
+            out.append(ch)
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch in "{[":
+            stack.append(ch)
+            out.append(ch)
+            cuts.append((len(out), tuple(stack)))
+            continue
+        elif ch in "}]":
+            while out and out[-1] in " \t\r\n":
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()  # trailing comma
+            if not stack or _CLOSERS[stack[-1]] != ch:
+                break  # mismatched - keep what we had
+            stack.pop()
+            out.append(ch)
+            if not stack:
+                return out, [(len(out), ())]
+            cuts.append((len(out), tuple(stack)))
+            continue
+        elif ch == "," and stack:
+            cuts.append((len(out), tuple(stack)))
+        out.append(ch)
+    if not in_str:
+        cuts.append((len(out), tuple(stack)))
+    return out, cuts
+
+
+def _salvage(text: str) -> Parsed:
+    out, cuts = _repair(text)
+    prefix = "".join(out)
+    for n, stack in reversed(cuts[-_MAX_SALVAGE_TRIES:]):
+        candidate = prefix[:n].rstrip().rstrip(",") + "".join(_CLOSERS[c] for c in reversed(stack))
+        try:
+            # no brackets left open at the cut: only commas / control characters were fixed
+            return Parsed(json.loads(candidate, strict=False), not stack and n == len(prefix))
+        except ValueError:
+            continue
+    return Parsed(None, False)
+
+
+def loads(raw: str | None) -> Parsed:
+    """Best-effort JSON from a model reply."""
+    text = _strip(raw or "")
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        return Parsed(None, False)
+    start = min(starts)
+    try:
+        value, _ = json.JSONDecoder(strict=False).raw_decode(text, start)
+        return Parsed(value, True)
+    except ValueError:
+        pass
+    return _salvage(text[start:])
+
+
+def from_response(response) -> Parsed:
+    """loads() on a chat completion; a refusal or empty reply is Parsed(None), a cut-off one incomplete."""
+    choice = response.choices[0]
+    message = choice.message
+    if getattr(message, "refusal", None) or not message.content:
+        return Parsed(None, False)
+    parsed = loads(message.content)
+    if getattr(choice, "finish_reason", None) == "length":
+        parsed.complete = False
+    return parsed
@@ -1,15 +1,17 @@
 """Pull deadlines out of syllabus text (LLM + sanity checks)."""
 from __future__ import annotations
 
-import json
-import re
+import logging
 from datetime import datetime, timezone
 from typing import Any, Dict, List
 
+from app.services import structured_output
 from app.services.docx_extractor import extract_text_from_docx_bytes
 from app.services.pdf_extractor import extract_text_from_pdf_bytes
 from app.services.pptx_extractor import extract_text_from_pptx_bytes
-from app.services.openai_service import _has_openai, _get_client
+from app.services.openai_service import _chat_json, _has_openai
+
+log = logging.getLogger(__name__)
 
 ALLOWED_EVENT_TYPES = {"quiz", "midterm", "test", "project", "assignment", "final", "other"}
 
@@ -37,6 +39,20 @@ Rules:
 - No markdown code fences.
 """
 
+EVENTS_SCHEMA = structured_output.obj({
+    "events": {
+        "type": "array",
+        "items": structured_output.obj({
+            "title": {"type": "string"},
+            "event_type": {"type": "string", "enum": sorted(ALLOWED_EVENT_TYPES)},
+            "due_at": {"type": "string"},
+            "course_label": structured_output.nullable("string"),
+            "confidence": {"type": "number"},
+            "notes": structured_output.nullable("string"),
+        }),
+    },
+})
+
 
 def syllabus_text_from_file(filename: str, file_bytes: bytes) -> str:
     ext = (filename.rsplit(".", 1)[-1] if "." in filename else "").lower()
@@ -99,35 +115,9 @@ def _normalize_event(item: Dict[str, Any]) -> Dict[str, Any] | None:
 
 
 def _fallback_parse(text: str) -> List[Dict[str, Any]]:
-    results: List[Dict[str, Any]] = []
-    lines = [ln.strip() for ln in (text or "").splitlines() if ln.strip()]
-    date_re = re.compile(r"(\d{1,2}/\d{1,2}/\d{2,4}|\d{4}-\d{2}-\d{2})")
-    for ln in lines[:500]:
-        low = ln.lower()
-        kind = None
-        for label in ("midterm", "quiz", "test", "project", "assignment", "final"):
-            if label in low:
-                kind = label
-                break
-        if not kind:
-            continue
-        m = date_re.search(ln)
-        if not m:
-            continue
-        due_at = _parse_due_at(m.group(1))
-        if not due_at:
-            continue
-        results.append(
-            {
-                "title": ln[:512],
-                "event_type": kind if kind in ALLOWED_EVENT_TYPES else "other",
-                "due_at": due_at,
-                "course_label": None,
-                "confidence": 0.45,
-                "notes": "Extracted with fallback parser",
-            }
-        )
-    return results
+    from app.services.syllabus_rules import parse
+
+    return parse(text).events
 
 
 def extract_calendar_events(text: str) -> List[Dict[str, Any]]:
@@ -136,20 +126,36 @@ def extract_calendar_events(text: str) -> List[Dict[str, Any]]:
         return []
     if not _has_openai():
         return _fallback_parse(text)
-    client = _get_client()
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0.1,
-        messages=[
+    parsed = _chat_json(
+        "gpt-4o-mini",
+        [
             {"role": "system", "content": EVENT_EXTRACTION_SYSTEM},
             {"role": "user", "content": text[:45000]},
         ],
+        "calendar_events",
+        EVENTS_SCHEMA,
+        op="syllabus_calendar",
+        temperature=0.1,
     )
-    raw = (response.choices[0].message.content or "").strip()
-    if raw.startswith("```"):
-        raw = raw.split("\n", 1)[-1].rsplit("```", 1)[0].strip()
-    payload = json.loads(raw)
-    items = payload.get("events") if isinstance(payload, dict) else []
+    payload = parsed.value
+    events = normalize_events(payload.get("events") if isinstance(payload, dict) else payload)
+    if not parsed.complete:
+        events = salvage_events(events, text)
+    return events
+
+
+def salvage_events(events: List[Dict[str, Any]], text: str) -> List[Dict[str, Any]]:
+    """A cut-off / unreadable reply: keep the events that came through, add rule-parser ones it lacks."""
+    from app.services.syllabus_rules import parse
+
+    have = {(e["event_type"], e["due_at"].date()) for e in events}
+    extra = [e for e in parse(text).events if (e["event_type"], e["due_at"].date()) not in have]
+    log.warning("calendar reply was incomplete: kept %d events, added %d from rules", len(events), len(extra))
+    return sorted(events + extra, key=lambda e: e["due_at"])
+
+
+def normalize_events(items: Any) -> List[Dict[str, Any]]:
+    """Model output list -> clean event dicts; anything without a title or a usable date is dropped."""
     out: List[Dict[str, Any]] = []
     if isinstance(items, list):
         for item in items:
@@ -0,0 +1,204 @@
+"""Everything a syllabus upload needs from the model: tidy markdown, class profile, calendar events.
+
+The three passes each read the same text and don't depend on each other, so they run side by side
+and the upload waits about as long as the slowest one instead of the sum of all three.
+
+With SYLLABUS_COMBINED_CALL on (ATLUS_SYLLABUS_COMBINED=1), a syllabus short enough for one prompt
+gets a single JSON call that returns all three. That means one request and the prompt is paid once,
+but the output is bigger and the markdown has to come back as a JSON string. If that call fails or
+comes back unusable, the parallel passes run as usual.
+
+Before any of that, syllabus_rules reads the text. When its deadlines and/or profile score at least
+SYLLABUS_RULES_CONFIDENCE (ATLUS_SYLLABUS_RULES_CONFIDENCE, default 0.75), that pass is answered
+from the rules and its model call is skipped. A tidy, dated syllabus then costs only the markdown
+call. Without an OpenAI key the rule results are used as they are.
+"""
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+from flask import current_app
+
+from app.services import structured_output, syllabus_rules, usage_ledger
+from app.services.openai_service import SYLLABUS_MARKDOWN_SYSTEM, _chat_json, _has_openai, format_syllabus_markdown
+from app.services.stage_timing import span
+from app.services.syllabus_calendar import (
+    EVENT_EXTRACTION_SYSTEM,
+    EVENTS_SCHEMA,
+    extract_calendar_events,
+    normalize_events,
+    salvage_events,
+)
+from app.services.syllabus_profile import PROFILE_SCHEMA, PROFILE_SYSTEM, extract_syllabus_profile, normalize_profile
+
+log = logging.getLogger(__name__)
+
+COMBINED_MAX_CHARS = 45000  # same cut the profile / calendar prompts use; longer docs fan out
+
+COMBINED_SYSTEM = f"""You process one course syllabus and return a single JSON object with three keys:
+{{"markdown": "...", "profile": {{...}}, "events": [...]}}
+
+"markdown" follows these instructions:
+{SYLLABUS_MARKDOWN_SYSTEM}
+
+"profile" follows these instructions (the object itself, not wrapped):
+{PROFILE_SYSTEM}
+
+"events" is the list described here (the list itself, not wrapped in another object):
+{EVENT_EXTRACTION_SYSTEM}
+
+Return the JSON object only.
+"""
+
+# markdown first: if the reply is cut off, it's the events list that's short, and that part can be
+# topped up from the rule parser
+COMBINED_SCHEMA = structured_output.obj({
+    "markdown": {"type": "string"},
+    "profile": PROFILE_SCHEMA,
+    "events": EVENTS_SCHEMA["properties"]["events"],
+})
+
+# upload requests are few and each needs ≤3 slots; the governor still paces the actual calls
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=6, thread_name_prefix="syllabus")
+        return _pool
+
+
+@dataclass
+class SyllabusResult:
+    markdown: str
+    profile: Dict[str, Any] | None = None  # None when the caller didn't ask for it
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    mode: str = "parallel"  # parallel | combined | rules (no extraction call) | local
+
+
+def _combined_enabled() -> bool:
+    try:
+        return bool(current_app.config.get("SYLLABUS_COMBINED_CALL"))
+    except RuntimeError:
+        return False
+
+
+def _rules_threshold() -> float:
+    try:
+        return float(current_app.config.get("SYLLABUS_RULES_CONFIDENCE", 0.75))
+    except RuntimeError:
+        return 0.75
+
+
+def _markdown_pass(text: str) -> str:
+    # prettify is optional - the raw text is a fine note body if the call fails
+    with span("syllabus_markdown"):
+        try:
+            return (format_syllabus_markdown(text) or "").strip() or text
+        except Exception:
+            log.warning("syllabus markdown pass failed; keeping extracted text", exc_info=True)
+            return text
+
+
+def _profile_pass(text: str) -> Dict[str, Any]:
+    with span("syllabus_profile"):
+        return extract_syllabus_profile(text)
+
+
+def _events_pass(text: str) -> List[Dict[str, Any]]:
+    with span("syllabus_calendar"):
+        return extract_calendar_events(text)
+
+
+def _combined(text: str, want_profile: bool) -> SyllabusResult | None:
+    try:
+        with span("syllabus_combined"):
+            parsed = _chat_json(
+                "gpt-4o-mini",
+                [
+                    {"role": "system", "content": COMBINED_SYSTEM},
+                    {"role": "user", "content": text},
+                ],
+                "syllabus_combined",
+                COMBINED_SCHEMA,
+                op="syllabus_combined",
+                temperature=0.1,
+            )
+    except Exception:
+        log.warning("combined syllabus call failed; falling back to parallel passes", exc_info=True)
+        return None
+    payload = parsed.dict()
+    if not isinstance(payload.get("events"), list):
+        return None  # cut off before the events started: markdown / profile may be partial too
+    events = normalize_events(payload["events"])
+    if not parsed.complete:
+        events = salvage_events(events, text)
+    profile = payload.get("profile")
+    return SyllabusResult(
+        markdown=str(payload.get("markdown") or "").strip() or text,
+        profile=normalize_profile(profile if isinstance(profile, dict) else {}) if want_profile else None,
+        events=events,
+        mode="combined",
+    )
+
+
+def process(text: str, want_profile: bool = True) -> SyllabusResult:
+    """Markdown + events (+ profile) for one syllabus. Profile / calendar errors propagate like before."""
+    text = (text or "").strip()
+    if not text:
+        return SyllabusResult(markdown="", profile=normalize_profile({}) if want_profile else None)
+    with span("syllabus_rules"):
+        rules = syllabus_rules.parse(text)
+    if not _has_openai():
+        return SyllabusResult(
+            markdown=text,
+            profile=normalize_profile(rules.profile) if want_profile else None,
+            events=rules.events,
+            mode="local",
+        )
+    threshold = _rules_threshold()
+    need_events = rules.events_confidence < threshold
+    need_profile = want_profile and rules.profile_confidence < threshold
+    asked = [name for name, need in (("events", need_events), ("profile", need_profile)) if need]
+    log.info(
+        "syllabus rules: events %.2f (%d found), profile %.2f; model asked for %s",
+        rules.events_confidence, len(rules.events), rules.profile_confidence, ", ".join(asked) or "markdown only",
+    )
+    if not need_events and not need_profile:
+        return SyllabusResult(
+            markdown=_markdown_pass(text),
+            profile=normalize_profile(rules.profile) if want_profile else None,
+            events=rules.events,
+            mode="rules",
+        )
+    # the combined call only pays off when it replaces every extraction pass
+    if need_events and (need_profile or not want_profile) and _combined_enabled() and len(text) <= COMBINED_MAX_CHARS:
+        result = _combined(text, want_profile)
+        if result is not None:
+            return result
+
+    # worker threads have no request context: pin the caller's usage attribution (user / brain /
+    # endpoint) into the copied context so the spend still lands on this upload
+    who = usage_ledger.current()
+    with usage_ledger.attribute(who.get("user_id"), who.get("brain_id"), who.get("feature")):
+        pool = _get_pool()
+        markdown = pool.submit(contextvars.copy_context().run, _markdown_pass, text)
+        events = pool.submit(contextvars.copy_context().run, _events_pass, text) if need_events else None
+        profile = pool.submit(contextvars.copy_context().run, _profile_pass, text) if need_profile else None
+    if want_profile and profile is None:
+        profile_out = normalize_profile(rules.profile)
+    else:
+        profile_out = profile.result() if profile is not None else None
+    return SyllabusResult(
+        markdown=markdown.result(),
+        profile=profile_out,
+        events=events.result() if events is not None else rules.events,
+    )
@@ -1,11 +1,10 @@
 """Extract class metadata from syllabus text (LLM + regex fallback)."""
 from __future__ import annotations
 
-import json
-import re
 from typing import Any, Dict
 
-from app.services.openai_service import _has_openai, _get_client
+from app.services import structured_output
+from app.services.openai_service import _chat_json, _has_openai
 
 PROFILE_SYSTEM = """You extract class metadata from a syllabus.
 Return ONLY valid JSON in this exact shape:
@@ -33,6 +32,12 @@ meeting_days (lecture / lab meetings):
 - Do not leave ambiguous strings like "MoWe", "TuTh", "TR", or single letters — spell out Mon, Tue, Wed, Thu, Fri, Sat, Sun.
 """
 
+PROFILE_FIELDS = (
+    "class_title", "class_number", "section", "professor", "meeting_days",
+    "meeting_time", "classroom", "office_hours", "term",
+)
+PROFILE_SCHEMA = structured_output.obj({k: structured_output.nullable("string") for k in PROFILE_FIELDS})
+
 
 def _clean(value: Any, max_len: int = 255) -> str | None:
     if value is None:
@@ -42,106 +47,43 @@ def _clean(value: Any, max_len: int = 255) -> str | None:
 
 
 def _fallback_extract(text: str) -> Dict[str, Any]:
-    lines = [ln.strip() for ln in (text or "").splitlines() if ln.strip()]
-    blob = "\n".join(lines[:400])
-
-    class_number = None
-    m = re.search(r"\b([A-Z]{2,5}\s*\d{3}[A-Z]?)\b", blob)
-    if m:
-        class_number = m.group(1).replace("  ", " ").strip()
-
-    section = None
-    m = re.search(r"\bsection[:\s-]*([0-9A-Za-z-]+)\b", blob, re.IGNORECASE)
-    if m:
-        section = m.group(1).strip()
-
-    professor = None
-    for pat in [
-        r"(?:instructor|professor)[:\s-]+([^\n,]+)",
-        r"\bDr\.\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?",
-    ]:
-        mm = re.search(pat, blob, re.IGNORECASE)
-        if mm:
-            professor = mm.group(1).strip() if mm.lastindex else mm.group(0).strip()
-            break
-
-    term = None
-    m = re.search(r"\b(Spring|Summer|Fall|Winter)\s+20\d{2}\b", blob, re.IGNORECASE)
-    if m:
-        term = m.group(0)
-
-    meeting_days = None
-    meeting_time = None
-    m = re.search(
-        r"\b(Mon|Tue|Wed|Thu|Fri|Sat|Sun)(?:day)?(?:\s*/\s*(Mon|Tue|Wed|Thu|Fri|Sat|Sun)(?:day)?)?(?:\s+|\s*[:\-]\s*)(\d{1,2}:\d{2}\s*(?:AM|PM)\s*(?:-|to)\s*\d{1,2}:\d{2}\s*(?:AM|PM))",
-        blob,
-        re.IGNORECASE,
-    )
-    if m:
-        meeting_days = m.group(1) + (f"/{m.group(2)}" if m.group(2) else "")
-        meeting_time = m.group(3)
-
-    classroom = None
-    m = re.search(r"\b(?:room|classroom|location)[:\s-]+([^\n,]+)", blob, re.IGNORECASE)
-    if m:
-        classroom = m.group(1).strip()
+    from app.services.syllabus_rules import parse
 
-    office_hours = None
-    m = re.search(r"\boffice\s*hours?[:\s-]+([^\n]+)", blob, re.IGNORECASE)
-    if m:
-        office_hours = m.group(1).strip()
-
-    class_title = lines[0][:255] if lines else None
-    return {
-        "class_title": class_title,
-        "class_number": class_number,
-        "section": section,
-        "professor": professor,
-        "meeting_days": meeting_days,
-        "meeting_time": meeting_time,
-        "classroom": classroom,
-        "office_hours": office_hours,
-        "term": term,
-    }
+    return parse(text).profile
 
 
 def extract_syllabus_profile(text: str) -> Dict[str, Any]:
     text = (text or "").strip()
     if not text:
-        return {
-            "class_title": None,
-            "class_number": None,
-            "section": None,
-            "professor": None,
-            "meeting_days": None,
-            "meeting_time": None,
-            "classroom": None,
-            "office_hours": None,
-            "term": None,
-        }
-
-    payload = None
-    if _has_openai():
-        client = _get_client()
-        resp = client.chat.completions.create(
-            model="gpt-4o-mini",
-            temperature=0.0,
-            messages=[
-                {"role": "system", "content": PROFILE_SYSTEM},
-                {"role": "user", "content": text[:45000]},
-            ],
-        )
-        raw = (resp.choices[0].message.content or "").strip()
-        if raw.startswith("```"):
-            raw = raw.split("\n", 1)[-1].rsplit("```", 1)[0].strip()
-        try:
-            payload = json.loads(raw)
-        except Exception:
-            payload = None
-
-    if not isinstance(payload, dict):
-        payload = _fallback_extract(text)
+        return normalize_profile({})
+
+    if not _has_openai():
+        return normalize_profile(_fallback_extract(text))
+    parsed = _chat_json(
+        "gpt-4o-mini",
+        [
+            {"role": "system", "content": PROFILE_SYSTEM},
+            {"role": "user", "content": text[:45000]},
+        ],
+        "syllabus_profile",
+        PROFILE_SCHEMA,
+        op="syllabus_profile",
+        temperature=0.0,
+    )
+    payload = parsed.dict()
+    if not parsed.complete:
+        payload = salvage_profile(payload, text)
+    return normalize_profile(payload)
+
+
+def salvage_profile(payload: Dict[str, Any], text: str) -> Dict[str, Any]:
+    """Fields a cut-off / unreadable reply didn't deliver come from the rule parser."""
+    rules = _fallback_extract(text)
+    return {k: payload.get(k) if payload.get(k) not in (None, "") else rules.get(k) for k in PROFILE_FIELDS}
+
 
+def normalize_profile(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Trim / cap every field to the course_profiles column sizes; missing keys come back as None."""
     return {
         "class_title": _clean(payload.get("class_title"), 255),
         "class_number": _clean(payload.get("class_number"), 64),
@@ -0,0 +1,446 @@
+"""Rule-based syllabus extraction: deadlines + class profile without a model call, each with a confidence.
+
+Most syllabi state their deadlines in one of a handful of shapes:
+- "Midterm 1 — Tuesday, October 14"
+- "Quiz 3  10/2"
+- a schedule table row "Week 5 | Sep 22 | Recursion | Quiz 2" (DOCX tables come out of the extractor
+  as " | " rows, PDF tables as column-spaced lines)
+- "Week 7: Midterm", resolved against the term start ("Classes begin August 24, 2026")
+
+parse() reads those line by line. Each event gets a score from how complete its date was (explicit
+year, inferred year, week-relative) and whether a stated weekday agrees with it. The document as a
+whole scores the mean event confidence, discounted by the deadline-looking lines it couldn't pin to
+a date. syllabus_pipeline only sends the document to the model when that score is low.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+_WEEKDAYS = {"mo": 0, "tu": 1, "we": 2, "th": 3, "fr": 4, "sa": 5, "su": 6}
+_DAY_NAMES = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+_WD = r"(?:(?P<wd>mon|tue|wed|thu|fri|sat|sun)[a-z]*\.?,?\s+)?"
+_MON = r"(?P<mon>jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?"
+_DATE_RES = [
+    ("iso", re.compile(r"\b(?P<y>20\d{2})-(?P<m>\d{1,2})-(?P<d>\d{1,2})\b")),
+    ("numeric", re.compile(_WD + r"\b(?P<m>1[0-2]|0?[1-9])/(?P<d>3[01]|[12]\d|0?[1-9])(?:/(?P<y>(?:20)?\d{2}))?\b(?!/)", re.I)),
+    ("month_day", re.compile(_WD + r"\b" + _MON + r"\s+(?P<d>3[01]|[12]\d|0?[1-9])(?:st|nd|rd|th)?\b(?:,?\s+(?P<y>20\d{2}))?", re.I)),
+    ("day_month", re.compile(_WD + r"\b(?P<d>3[01]|[12]\d|0?[1-9])(?:st|nd|rd|th)?\s+" + _MON + r"(?:,?\s+(?P<y>20\d{2}))?", re.I)),
+]
+_TIME_RE = re.compile(r"\b(?P<h>1[0-2]|0?[1-9])(?::(?P<mi>[0-5]\d))?\s*(?P<ap>[ap])\.?m\.?(?![a-z])|\b(?P<h24>[01]?\d|2[0-3]):(?P<mi24>[0-5]\d)\b", re.I)
+_WEEK_RE = re.compile(r"\bweek\s*#?\s*(?P<n>\d{1,2})\b", re.I)
+_TERM_RE = re.compile(r"\b(?P<season>spring|summer|fall|autumn|winter)\s+(?:semester\s+|quarter\s+|term\s+)?(?P<y>20\d{2})\b", re.I)
+_TERM_START_RE = re.compile(
+    r"\b(?:(?:classes|instruction|lectures?|semester|term|quarter)\s+(?:begins?|starts?)|first\s+(?:day|week)\s+of\s+(?:class(?:es)?|instruction|the\s+(?:semester|term)))\b",
+    re.I,
+)
+# date-looking words: a keyword line with one of these but no parsed date counts against the document
+_DATE_HINT_RE = re.compile(
+    r"\b(?:mon|tue|wed|thu|fri|sat|sun)[a-z]*\b|\b(?:jan|feb|mar|apr|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?\s|\bweek\s*\d|\d{1,2}/\d{1,2}|\bdue\b",
+    re.I,
+)
+
+# first match wins, so the specific phrasings sit above the generic ones
+_KINDS = [
+    ("final", re.compile(r"\bfinal\s+(?:exam(?:ination)?|test)s?\b", re.I)),
+    ("project", re.compile(r"\b(?:projects?|capstone|presentations?|portfolio)\b", re.I)),
+    ("final", re.compile(r"\bfinals?\b(?!\s+(?:grades?|week\s+schedule))", re.I)),
+    ("midterm", re.compile(r"\bmid-?\s?terms?\b", re.I)),
+    ("quiz", re.compile(r"\bquiz(?:zes)?\b", re.I)),
+    ("test", re.compile(r"\b(?:exam(?:ination)?s?|tests?)\b", re.I)),
+    ("assignment", re.compile(
+        r"\b(?:assignments?|homeworks?|hw\s*#?\d+|problem\s+sets?|psets?|lab\s+reports?|labs?\s*#?\d+|essays?|papers?|"
+        r"reports?|reading\s+responses?|worksheets?|deliverables?)\b",
+        re.I,
+    )),
+]
+_SKIP_RE = re.compile(
+    r"\b(?:no\s+class(?:es)?|holiday|spring\s+break|fall\s+break|thanksgiving|last\s+day\s+to\s+(?:add|drop|withdraw)|"
+    r"grades?\s+(?:due|posted|available)|% of|percent of|worth)\b",
+    re.I,
+)
+_CELL_SPLIT_RE = re.compile(r"\s*\|\s*|\t+|\s{3,}")
+_BULLET_RE = re.compile(r"^\s*(?:[-*•·▪◦]+|\d{1,2}[.)])\s+")
+
+# course profile
+_CODE_RE = re.compile(r"\b(?P<dept>[A-Z]{2,5})\s?-?\s?(?P<num>\d{3,4}[A-Z]?)\b")
+_SECTION_RE = re.compile(r"\bsec(?:tion)?\.?\s*[:#-]?\s*(?P<s>\d{1,3}[A-Z]?)\b", re.I)
+_PROF_RE = re.compile(
+    r"\b(?:instructor|professor|lecturer|faculty|taught\s+by)(?:'s)?(?:\s+name)?\s*[:\-–—]\s*(?P<name>[^\n|;]+)", re.I
+)
+_DR_RE = re.compile(r"\b(?:Dr|Prof|Professor)\.?\s+[A-Z][a-zA-Z'\-]+(?:\s+[A-Z][a-zA-Z'\-]+){0,2}")
+_ROOM_RE = re.compile(r"\b(?:room|classroom|location|where|lecture\s+hall)\s*[:\-–—]\s*(?P<room>[^\n|;]+)", re.I)
+_ROOM_INLINE_RE = re.compile(r"\b(?:in|room)\s+(?P<room>[A-Z]{1,5}[- ]?\d{2,4}[A-Z]?)\b")
+_OFFICE_RE = re.compile(r"\boffice\s*hours?\s*[:\-–—]?\s*(?P<oh>[^\n|]+)", re.I)
+_TIME_RANGE_RE = re.compile(
+    r"(?P<a>(?:1[0-2]|0?[1-9])(?::[0-5]\d)?)\s*(?P<ap1>[ap]\.?m\.?)?\s*(?:-|–|—|to)\s*"
+    r"(?P<b>(?:1[0-2]|0?[1-9])(?::[0-5]\d)?)\s*(?P<ap2>[ap]\.?m\.?)",
+    re.I,
+)
+_FULL_DAYS_RE = re.compile(
+    r"\b(mon|tue|wed|thu|fri|sat|sun)(?:day|s|sday|nesday|rs|rsday|urday)?s?\b\.?", re.I
+)
+_SHORTHAND_RE = re.compile(
+    r"\b(?P<tok>(?:Mo|Tu|We|Th|Fr|Sa|Su|M|T|W|R|F)(?:/?(?:Mo|Tu|We|Th|Fr|Sa|Su|M|T|W|R|F)){0,4})\b(?=[\s,:]+\d)"
+)
+_MEETING_HINT_RE = re.compile(r"\b(?:meets?|meeting|lectures?|class\s+(?:time|meets|schedule)|days?\s*(?:/|and)\s*times?|time)\b", re.I)
+
+_PROFILE_WEIGHTS = {"class_number": 0.3, "term": 0.2, "professor": 0.2, "meeting_days": 0.15, "meeting_time": 0.15}
+
+
+@dataclass
+class RuleParse:
+    events: List[Dict[str, Any]] = field(default_factory=list)
+    events_confidence: float = 0.0
+    profile: Dict[str, Any] = field(default_factory=dict)
+    profile_confidence: float = 0.0
+    term_start: Optional[date] = None
+    unresolved: int = 0  # deadline-looking lines with no date we could pin down
+
+
+@dataclass
+class _Ctx:
+    today: date
+    term_year: Optional[int] = None
+    season: Optional[str] = None
+    term_start: Optional[date] = None
+    meeting_days: List[int] = field(default_factory=list)
+
+
+def _lines(text: str) -> List[str]:
+    return [ln.strip() for ln in (text or "").splitlines() if ln.strip()]
+
+
+# ---- dates -------------------------------------------------------------------------------------
+
+
+def _resolve_year(month: int, day: int, ctx: _Ctx) -> Optional[int]:
+    if ctx.term_year:
+        year = ctx.term_year
+        if ctx.season in ("fall", "autumn") and month <= 5:
+            year += 1  # finals / drop dates spilling into January
+        elif ctx.season == "winter" and month >= 11:
+            year -= 1
+        return year
+    # no term on the page: the year that lands closest to "this term" around today
+    best = None
+    for year in (ctx.today.year - 1, ctx.today.year, ctx.today.year + 1):
+        try:
+            d = date(year, month, day)
+        except ValueError:
+            continue
+        gap = abs((d - (ctx.today + timedelta(days=60))).days)
+        if best is None or gap < best[0]:
+            best = (gap, year)
+    return best[1] if best else None
+
+
+def _find_dates(s: str, ctx: _Ctx) -> List[tuple]:
+    """[(start, end, date, confidence)] in reading order, overlapping matches dropped."""
+    found = []
+    taken: List[tuple] = []
+    for form, rx in _DATE_RES:
+        for m in rx.finditer(s):
+            if any(m.start() < b and a < m.end() for a, b in taken):
+                continue
+            g = m.groupdict()
+            month = _MONTHS[g["mon"][:3].lower()] if g.get("mon") else int(g["m"])
+            day = int(g["d"])
+            year = g.get("y")
+            explicit = year is not None
+            if explicit:
+                year = int(year)
+                if year < 100:
+                    year += 2000
+            else:
+                year = _resolve_year(month, day, ctx)
+            try:
+                d = date(year, month, day)
+            except (TypeError, ValueError):
+                continue
+            if explicit:
+                conf = 0.9
+            elif form == "numeric":
+                conf = 0.8 if ctx.term_year else 0.7
+            else:
+                conf = 0.85 if ctx.term_year else 0.75
+            wd = g.get("wd")
+            if wd:
+                want = _WEEKDAYS[wd[:2].lower()]
+                if d.weekday() == want:
+                    conf = min(0.97, conf + 0.07)
+                elif not explicit:
+                    # inferred year disagrees with the stated weekday - try the neighbours
+                    for alt in (year + 1, year - 1):
+                        try:
+                            alt_d = date(alt, month, day)
+                        except ValueError:
+                            continue
+                        if alt_d.weekday() == want:
+                            d, conf = alt_d, conf - 0.1
+                            break
+                    else:
+                        conf -= 0.35
+                else:
+                    conf -= 0.35
+            taken.append((m.start(), m.end()))
+            found.append((m.start(), m.end(), d, conf))
+    found.sort(key=lambda f: f[0])
+    return found
+
+
+def _find_time(s: str):
+    m = _TIME_RE.search(s)
+    if not m:
+        return None
+    if m.group("h24") is not None:
+        return int(m.group("h24")), int(m.group("mi24"))
+    hour = int(m.group("h")) % 12
+    if m.group("ap").lower() == "p":
+        hour += 12
+    return hour, int(m.group("mi") or 0)
+
+
+def _week_date(n: int, ctx: _Ctx) -> Optional[date]:
+    if not ctx.term_start or not 1 <= n <= 20:
+        return None
+    monday = ctx.term_start - timedelta(days=ctx.term_start.weekday()) + timedelta(weeks=n - 1)
+    offset = min(ctx.meeting_days) if ctx.meeting_days else 0
+    return monday + timedelta(days=offset)
+
+
+# ---- events ------------------------------------------------------------------------------------
+
+
+def _classify(s: str):
+    for kind, rx in _KINDS:
+        m = rx.search(s)
+        if m:
+            return kind, m
+    return None, None
+
+
+def _title(segment: str, kind_match, spans: List[tuple]) -> str:
+    cells = [c for c in _CELL_SPLIT_RE.split(segment) if c.strip()]
+    if len(cells) > 1:
+        for c in cells:
+            if _classify(c)[0]:
+                segment = c
+                spans = []
+                break
+    s = segment
+    for a, b in sorted(spans, reverse=True):
+        s = s[:a] + " " + s[b:]
+    s = _TIME_RE.sub(" ", s)
+    s = _WEEK_RE.sub(" ", s)
+    s = _BULLET_RE.sub("", s)
+    s = re.sub(r"(?:\s*\b(?:due|on|by|at|held|is|will\s+be)\b)+\s*$", "", s.strip(), flags=re.I)
+    s = re.sub(r"\(\s*\)|\[\s*\]", " ", s)
+    s = re.sub(r"\s*[|:,;–—-]+\s*$", "", re.sub(r"^\s*[|:,;–—-]+\s*", "", s))
+    s = re.sub(r"\s{2,}", " ", s).strip(" .:-–—|,")
+    if len(s) > 80:
+        # long prose line - keep the keyword and a few words after it
+        words = segment[kind_match.start():].split()
+        s = " ".join(words[:5]).strip(" .,:;")
+    return (s or kind_match.group(0)).strip()[:512]
+
+
+def _event(title, kind, day: date, hm, conf) -> Dict[str, Any]:
+    hour, minute = hm or (23, 59)
+    return {
+        "title": title,
+        "event_type": kind,
+        "due_at": datetime(day.year, day.month, day.day, hour, minute, tzinfo=timezone.utc),
+        "course_label": None,
+        "confidence": round(max(0.05, min(conf, 0.97)), 2),
+        "notes": "Extracted by rule parser",
+    }
+
+
+def _parse_events(lines: List[str], ctx: _Ctx):
+    events: List[Dict[str, Any]] = []
+    unresolved = 0
+    seen = set()
+    for i, line in enumerate(lines):
+        if _SKIP_RE.search(line) and not re.search(r"\bdue\b", line, re.I):
+            continue
+        line_dates = _find_dates(line, ctx)
+        segments = [line] if len(line_dates) <= 1 else [s for s in re.split(r";|\s{2,}(?=[A-Z])", line) if s.strip()]
+        week = _WEEK_RE.search(line)
+        for seg in segments:
+            kind, km = _classify(seg)
+            if not kind:
+                continue
+            dates = _find_dates(seg, ctx) if seg is not line else line_dates
+            spans = [(a, b) for a, b, _, _ in dates]
+            if dates:
+                _, _, day, conf = dates[0]
+            elif line_dates:
+                _, _, day, conf = line_dates[0]
+                conf -= 0.05
+            elif week and _week_date(int(week.group("n")), ctx):
+                day = _week_date(int(week.group("n")), ctx)
+                conf = 0.8 if ctx.meeting_days else 0.65  # first class day of that week
+            else:
+                # "Midterm Exam" with the date alone on the next line
+                nxt = lines[i + 1] if i + 1 < len(lines) else ""
+                nxt_dates = _find_dates(nxt, ctx) if len(nxt) <= 40 and not _classify(nxt)[0] else []
+                if nxt_dates:
+                    day, conf = nxt_dates[0][2], nxt_dates[0][3] - 0.05
+                else:
+                    if _DATE_HINT_RE.search(seg):
+                        unresolved += 1
+                    continue
+            if kind == "assignment":
+                conf -= 0.05  # broadest bucket, most false positives
+            title = _title(seg, km, spans)
+            key = (kind, day, title.lower())
+            if key in seen:
+                continue
+            seen.add(key)
+            events.append(_event(title, kind, day, _find_time(seg), conf))
+    events.sort(key=lambda e: e["due_at"])
+    return events, unresolved
+
+
+def _events_confidence(events, unresolved) -> float:
+    if not events:
+        return 0.0
+    mean = sum(e["confidence"] for e in events) / len(events)
+    return round(mean * len(events) / (len(events) + unresolved), 3)
+
+
+# ---- profile -----------------------------------------------------------------------------------
+
+
+def _expand_shorthand(tok: str) -> List[int]:
+    days = []
+    for part in re.findall(r"Mo|Tu|We|Th|Fr|Sa|Su|M|T|W|R|F", tok):
+        idx = {"M": 0, "T": 1, "W": 2, "R": 3, "F": 4}.get(part)
+        if idx is None:
+            idx = _WEEKDAYS[part.lower()]
+        if idx not in days:
+            days.append(idx)
+    return days
+
+
+def _meeting(lines: List[str]):
+    """(day indexes, "9:00 AM - 10:15 AM") from the first line that looks like the lecture schedule."""
+    for line in lines[:80]:
+        if _OFFICE_RE.search(line):
+            continue
+        tr = _TIME_RANGE_RE.search(line)
+        if not tr:
+            continue
+        head = line[: tr.start()]
+        days = []
+        sh = list(_SHORTHAND_RE.finditer(line))
+        if sh:
+            days = _expand_shorthand(sh[-1].group("tok") if sh[-1].start() < tr.start() else sh[0].group("tok"))
+        if not days:
+            days = sorted({_WEEKDAYS[m.group(1)[:2].lower()] for m in _FULL_DAYS_RE.finditer(head or line)})
+        if not days and not _MEETING_HINT_RE.search(line):
+            continue
+        ap2 = tr.group("ap2").replace(".", "").upper()
+        ap1 = (tr.group("ap1") or "").replace(".", "").upper() or ap2
+
+        def fmt(t, ap):
+            return f"{t}:00 {ap}" if ":" not in t else f"{t} {ap}"
+
+        return days, f"{fmt(tr.group('a'), ap1)} - {fmt(tr.group('b'), ap2)}"
+    return [], None
+
+
+def _clean_name(s: str) -> Optional[str]:
+    s = re.sub(r"\S+@\S+|\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}", " ", s)
+    s = re.split(r"\s{2,}|,\s*(?:email|e-mail|phone|office)\b", s, flags=re.I)[0]
+    s = s.strip(" .,:;-–—")
+    return s[:255] or None
+
+
+def _parse_profile(lines: List[str], ctx: _Ctx) -> Dict[str, Any]:
+    head = "\n".join(lines[:120])
+    out: Dict[str, Any] = {k: None for k in (
+        "class_title", "class_number", "section", "professor", "meeting_days",
+        "meeting_time", "classroom", "office_hours", "term",
+    )}
+    for i, line in enumerate(lines[:25]):
+        m = _CODE_RE.search(line)
+        if not m or _ROOM_RE.search(line):
+            continue
+        out["class_number"] = f"{m.group('dept')} {m.group('num')}"
+        rest = (line[: m.start()] + " " + line[m.end():]).strip()
+        rest = _SECTION_RE.sub("", rest)
+        rest = _TERM_RE.sub("", rest)
+        rest = re.sub(r"^\s*(?:course|class)\s*(?:title|number)?\s*[:\-–—]\s*", "", rest, flags=re.I)
+        rest = re.sub(r"\s{2,}", " ", rest).strip(" :-–—|,()")
+        if not rest and i + 1 < len(lines) and len(lines[i + 1]) < 80 and ":" not in lines[i + 1]:
+            rest = lines[i + 1].strip()
+        out["class_title"] = rest[:255] or None
+        break
+    if not out["class_title"] and lines:
+        out["class_title"] = lines[0][:255]
+    if m := _SECTION_RE.search(head):
+        out["section"] = m.group("s")
+    if m := _PROF_RE.search(head):
+        out["professor"] = _clean_name(m.group("name"))
+    elif m := _DR_RE.search(head):
+        out["professor"] = m.group(0).strip()
+    if m := _TERM_RE.search(head):
+        out["term"] = f"{m.group('season').title()} {m.group('y')}"
+    days, times = _meeting(lines)
+    if days:
+        out["meeting_days"] = "/".join(_DAY_NAMES[d] for d in days)
+    out["meeting_time"] = times
+    if m := _ROOM_RE.search(head):
+        out["classroom"] = m.group("room").strip(" .,")[:128]
+    elif m := _ROOM_INLINE_RE.search(head):
+        out["classroom"] = m.group("room")
+    if m := _OFFICE_RE.search(head):
+        out["office_hours"] = m.group("oh").strip(" .,")[:255]
+    ctx.meeting_days = days
+    return out
+
+
+def _profile_confidence(profile: Dict[str, Any]) -> float:
+    return round(sum(w for k, w in _PROFILE_WEIGHTS.items() if profile.get(k)), 3)
+
+
+def _term_start(lines: List[str], ctx: _Ctx) -> Optional[date]:
+    for line in lines:
+        if _TERM_START_RE.search(line):
+            dates = _find_dates(line, ctx)
+            if dates:
+                return dates[0][2]
+    for line in lines:
+        m = _WEEK_RE.search(line)
+        if m and m.group("n") == "1":
+            dates = _find_dates(line[m.end():], ctx)
+            if dates:
+                return dates[0][2]
+    return None
+
+
+def parse(text: str, today: Optional[date] = None) -> RuleParse:
+    lines = _lines(text)
+    ctx = _Ctx(today=today or datetime.now(timezone.utc).date())
+    if m := _TERM_RE.search("\n".join(lines[:200])):
+        ctx.term_year, ctx.season = int(m.group("y")), m.group("season").lower()
+    profile = _parse_profile(lines, ctx)  # also fills ctx.meeting_days for "Week N" rows
+    ctx.term_start = _term_start(lines, ctx)
+    events, unresolved = _parse_events(lines[:1500], ctx)
+    return RuleParse(
+        events=events,
+        events_confidence=_events_confidence(events, unresolved),
+        profile=profile,
+        profile_confidence=_profile_confidence(profile),
+        term_start=ctx.term_start,
+        unresolved=unresolved,
+    )
@@ -0,0 +1,361 @@
+"""Lecture-length recordings to text: cut at pauses, transcribe the pieces side by side, stitch.
+
+Whisper takes one file of at most 25 MB per call and answers only when the whole file is done, so a
+75-minute lecture either doesn't fit or takes minutes in one call. transcribe():
+
+1. finds the pauses: ffmpeg's silencedetect, or a scan of the samples for plain PCM WAV when
+   ffmpeg isn't installed;
+2. cuts at the pause nearest every TRANSCRIBE_SEGMENT_SECONDS (a hard cut only when a stretch has
+   no pause). Each piece reaches OVERLAP_SECONDS past its cut on both sides, so a word spoken
+   across a cut is heard whole by at least one call;
+3. sends up to TRANSCRIBE_CONCURRENCY pieces to Whisper at once (verbose_json, for timestamps);
+4. shifts each piece's timestamps by where it starts and, where two pieces overlap, keeps each
+   line from the piece whose own stretch holds the line's midpoint.
+
+Short clips (under DIRECT_BYTES) and clips that can't be cut (no ffmpeg, not WAV, under the API's
+25 MB) go to Whisper in one call as before.
+"""
+from __future__ import annotations
+
+import array
+import contextvars
+import io
+import logging
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+from flask import current_app
+
+from app.services import usage_ledger
+from app.services.openai_service import WHISPER_API_MAX_BYTES, transcribe_audio_timed
+from app.services.stage_timing import span
+
+log = logging.getLogger(__name__)
+
+DIRECT_BYTES = 4 * 1024 * 1024  # ~15 min of browser webm/opus: one call is fine
+OVERLAP_SECONDS = 2.0
+SECTION_SECONDS = 300  # lecture nodes: one "## Lecture h:mm:ss" heading per ~5 minutes
+SILENCE_DB = -35.0  # ffmpeg silencedetect noise floor
+MIN_PAUSE_SECONDS = 0.4
+SEGMENT_BITRATE = 32000  # ffmpeg re-encodes pieces as 16 kHz mono MP3 at this bitrate
+_SEGMENT_BYTES_PER_SECOND = SEGMENT_BITRATE // 8
+_WINDOW_SECONDS = 0.05  # WAV scan resolution
+
+_SILENCE_RE = re.compile(r"silence_(start|end): (-?[\d.]+)")
+_DURATION_RE = re.compile(r"Duration: (\d+):(\d+):([\d.]+)")
+
+
+@dataclass
+class Line:
+    start: float
+    end: float
+    text: str
+
+
+@dataclass
+class Transcript:
+    lines: List[Line]
+    duration: float
+    pieces: int = 1
+
+    @property
+    def text(self) -> str:
+        return " ".join(line.text for line in self.lines).strip()
+
+    def markdown(self, every: int = SECTION_SECONDS) -> str:
+        """The transcript as paragraphs under a timestamp heading every ~`every` seconds (chunker-friendly)."""
+        out: List[str] = []
+        section_end = -1.0
+        paragraph: List[str] = []
+        for line in self.lines:
+            if line.start >= section_end:
+                if paragraph:
+                    out.append(" ".join(paragraph))
+                    paragraph = []
+                section_start = (line.start // every) * every
+                section_end = section_start + every
+                out.append(f"## Lecture {_clock(section_start)} - {_clock(min(section_end, self.duration))}")
+            paragraph.append(line.text)
+        if paragraph:
+            out.append(" ".join(paragraph))
+        return "\n\n".join(out)
+
+
+@dataclass
+class _Piece:
+    start: float  # this piece owns [start, end) of the recording
+    end: float
+    lo: float  # and is cut from [lo, hi), overlap included
+    hi: float
+    data: bytes = b""
+    filename: str = ""
+    lines: List[Line] = field(default_factory=list)
+
+
+def _clock(seconds: float) -> str:
+    s = int(seconds)
+    return f"{s // 3600}:{s % 3600 // 60:02d}:{s % 60:02d}"
+
+
+def _setting(name: str, default: int) -> int:
+    try:
+        return int(current_app.config.get(name) or default)
+    except RuntimeError:
+        return default
+
+
+def max_bytes() -> int:
+    return _setting("TRANSCRIBE_MAX_MB", 500) * 1024 * 1024
+
+
+def _ffmpeg() -> Optional[str]:
+    return shutil.which("ffmpeg")
+
+
+def plan_cuts(duration: float, pauses: List[Tuple[float, float]], target: float, longest: float) -> List[float]:
+    """Cut points from 0 to duration: each at the pause midpoint nearest `target` seconds on, never more than `longest` apart."""
+    mids = sorted((s + e) / 2 for s, e in pauses)
+    cuts = [0.0]
+    while duration - cuts[-1] > longest:
+        pos = cuts[-1]
+        want = pos + target
+        near = [m for m in mids if pos + target / 2 <= m <= pos + longest]
+        cuts.append(min(near, key=lambda m: abs(m - want)) if near else pos + target)
+    cuts.append(duration)
+    return cuts
+
+
+def _pieces(cuts: List[float], duration: float) -> List[_Piece]:
+    return [
+        _Piece(a, b, max(0.0, a - OVERLAP_SECONDS), min(duration, b + OVERLAP_SECONDS))
+        for a, b in zip(cuts, cuts[1:])
+    ]
+
+
+# ffmpeg: any container Whisper takes (and video), decoded once per piece
+
+
+def _probe_ffmpeg(ffmpeg: str, path: str) -> Tuple[float, List[Tuple[float, float]]]:
+    cmd = [
+        ffmpeg, "-hide_banner", "-nostats", "-i", path, "-vn",
+        "-af", f"silencedetect=noise={SILENCE_DB}dB:d={MIN_PAUSE_SECONDS}", "-f", "null", "-",
+    ]
+    proc = subprocess.run(cmd, capture_output=True, text=True, errors="replace")
+    if proc.returncode != 0:
+        last = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+        raise ValueError(f"could not read the audio file (ffmpeg: {last})")
+    return parse_silencedetect(proc.stderr)
+
+
+def parse_silencedetect(stderr: str) -> Tuple[float, List[Tuple[float, float]]]:
+    m = _DURATION_RE.search(stderr)
+    duration = int(m.group(1)) * 3600 + int(m.group(2)) * 60 + float(m.group(3)) if m else 0.0
+    pauses: List[Tuple[float, float]] = []
+    start = None
+    for kind, value in _SILENCE_RE.findall(stderr):
+        if kind == "start":
+            start = max(0.0, float(value))
+        elif start is not None:
+            pauses.append((start, float(value)))
+            start = None
+    if start is not None and duration:
+        pauses.append((start, duration))
+    return duration, pauses
+
+
+def _cut_ffmpeg(ffmpeg: str, path: str, piece: _Piece) -> None:
+    cmd = [
+        ffmpeg, "-hide_banner", "-nostats", "-loglevel", "error",
+        "-ss", f"{piece.lo:.3f}", "-t", f"{piece.hi - piece.lo:.3f}", "-i", path,
+        "-vn", "-ac", "1", "-ar", "16000", "-c:a", "libmp3lame", "-b:a", str(SEGMENT_BITRATE), "-f", "mp3", "-",
+    ]
+    proc = subprocess.run(cmd, capture_output=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg could not cut {_clock(piece.lo)}: {proc.stderr.decode(errors='replace').strip()[-300:]}")
+    piece.data = proc.stdout
+    piece.filename = f"lecture-{int(piece.lo)}.mp3"
+
+
+# no ffmpeg: 16-bit PCM WAV can still be split in pure Python
+
+
+def _wav_samples(src):
+    """(mono samples, frame rate) for 16-bit PCM WAV (a path or a file object), else None."""
+    try:
+        with wave.open(src) as w:
+            if w.getsampwidth() != 2 or w.getcomptype() != "NONE":
+                return None
+            channels, rate = w.getnchannels(), w.getframerate()
+            frames = w.readframes(w.getnframes())
+    except (wave.Error, EOFError):
+        return None
+    samples = array.array("h")
+    samples.frombytes(frames[: len(frames) // 2 * 2])
+    if sys.byteorder == "big":
+        samples.byteswap()
+    if channels > 1:
+        samples = samples[::channels]  # first channel is plenty for speech
+    return samples, rate
+
+
+def wav_pauses(samples, rate: int) -> List[Tuple[float, float]]:
+    """Stretches of at least MIN_PAUSE_SECONDS whose peak stays near the recording's noise floor."""
+    step = max(1, int(rate * _WINDOW_SECONDS))
+    peaks = []
+    for i in range(0, len(samples), step):
+        window = samples[i : i + step]
+        peaks.append(max(max(window), -min(window)))
+    if not peaks:
+        return []
+    floor = sorted(peaks)[len(peaks) // 10]
+    threshold = max(floor * 2, 32768 * 10 ** (SILENCE_DB / 20))
+    need = max(1, int(MIN_PAUSE_SECONDS / _WINDOW_SECONDS))
+    pauses: List[Tuple[float, float]] = []
+    run_start = None
+    for i, peak in enumerate(peaks + [threshold]):  # sentinel closes a trailing run
+        if peak < threshold:
+            if run_start is None:
+                run_start = i
+        elif run_start is not None:
+            if i - run_start >= need:
+                pauses.append((run_start * _WINDOW_SECONDS, i * _WINDOW_SECONDS))
+            run_start = None
+    return pauses
+
+
+def _cut_wav(samples, rate: int, piece: _Piece) -> None:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        part = samples[int(piece.lo * rate) : int(piece.hi * rate)]
+        if sys.byteorder == "big":
+            part = array.array("h", part)
+            part.byteswap()
+        w.writeframes(part.tobytes())
+    piece.data = buf.getvalue()
+    piece.filename = f"lecture-{int(piece.lo)}.wav"
+
+
+def _target_seconds(bytes_per_second: float) -> Tuple[float, float]:
+    """(target, longest) piece length: TRANSCRIBE_SEGMENT_SECONDS, kept under the API's 25 MB."""
+    cap = WHISPER_API_MAX_BYTES * 0.9 / bytes_per_second - 2 * OVERLAP_SECONDS
+    target = min(float(max(30, _setting("TRANSCRIBE_SEGMENT_SECONDS", 600))), cap / 1.25)
+    return target, min(target * 1.25, cap)
+
+
+def _transcribe_piece(piece: _Piece) -> None:
+    with span("whisper_segment"):
+        out = transcribe_audio_timed(piece.data, piece.filename, seconds=piece.hi - piece.lo)
+    piece.data = b""
+    segments = out["segments"] or [{"start": 0.0, "end": piece.hi - piece.lo, "text": out["text"]}]
+    for seg in segments:
+        start, end = piece.lo + seg["start"], piece.lo + max(seg["end"], seg["start"])
+        mid = (start + end) / 2
+        # the overlap is heard twice: the piece that owns the midpoint keeps the line
+        if piece.start <= mid < piece.end or (mid >= piece.end and piece.end >= piece.hi):
+            piece.lines.append(Line(round(start, 2), round(end, 2), seg["text"]))
+
+
+def _run(pieces: List[_Piece], cut) -> None:
+    """Cut and transcribe every piece, TRANSCRIBE_CONCURRENCY at a time."""
+
+    def work(piece: _Piece) -> None:
+        cut(piece)
+        _transcribe_piece(piece)
+
+    workers = max(1, min(_setting("TRANSCRIBE_CONCURRENCY", 4), len(pieces)))
+    if workers == 1:
+        for piece in pieces:
+            work(piece)
+        return
+    # pool threads have no request context: pin the caller's usage attribution into each copy
+    who = usage_ledger.current()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="whisper") as pool:
+        with usage_ledger.attribute(who.get("user_id"), who.get("brain_id"), who.get("feature")):
+            futures = [pool.submit(contextvars.copy_context().run, work, p) for p in pieces]
+        try:
+            for f in futures:
+                f.result()
+        except BaseException:
+            for f in futures:
+                f.cancel()
+            raise
+
+
+def _direct(data: bytes, filename: str) -> Transcript:
+    with span("whisper_segment"):
+        out = transcribe_audio_timed(data, filename)
+    lines = [Line(s["start"], s["end"], s["text"]) for s in out["segments"]]
+    if not lines and out["text"]:
+        lines = [Line(0.0, out["duration"], out["text"])]
+    return Transcript(lines, out["duration"])
+
+
+def _read(data: Union[bytes, Path]) -> bytes:
+    return data.read_bytes() if isinstance(data, Path) else data
+
+
+def transcribe(data: Union[bytes, Path], filename: str = "recording.webm") -> Transcript:
+    """Whole recording to timestamped lines, however long (up to TRANSCRIBE_MAX_MB).
+
+    data is the file's bytes or, for a finalized resumable upload, its path; ffmpeg then reads
+    the file where it is.
+    """
+    size = data.stat().st_size if isinstance(data, Path) else len(data or b"")
+    if not size:
+        raise ValueError("Audio clip is too short or empty.")
+    if size > max_bytes():
+        raise ValueError(f"Audio file too large (max {max_bytes() // (1024 * 1024)} MB).")
+    if size <= DIRECT_BYTES:
+        return _direct(_read(data), filename)
+
+    ffmpeg = _ffmpeg()
+    if ffmpeg:
+        if isinstance(data, Path):
+            path, temp = str(data), False
+        else:
+            fd, path = tempfile.mkstemp(suffix=os.path.splitext(filename or "")[1] or ".bin")
+            temp = True
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+        try:
+            with span("audio_probe"):
+                duration, pauses = _probe_ffmpeg(ffmpeg, path)
+            if not duration:
+                raise ValueError("could not tell how long the recording is")
+            target, longest = _target_seconds(_SEGMENT_BYTES_PER_SECOND)
+            pieces = _pieces(plan_cuts(duration, pauses, target, longest), duration)
+            if len(pieces) == 1 and size <= WHISPER_API_MAX_BYTES:
+                return _direct(_read(data), filename)
+            _run(pieces, lambda p: _cut_ffmpeg(ffmpeg, path, p))
+        finally:
+            if temp:
+                os.unlink(path)
+    else:
+        wav = _wav_samples(str(data) if isinstance(data, Path) else io.BytesIO(data))
+        if wav is None:
+            if size <= WHISPER_API_MAX_BYTES:
+                return _direct(_read(data), filename)
+            raise ValueError("Recordings over 25 MB need ffmpeg on the server to be split (or upload a WAV file).")
+        samples, rate = wav
+        duration = len(samples) / rate
+        with span("audio_probe"):
+            pauses = wav_pauses(samples, rate)
+        target, longest = _target_seconds(rate * 2)
+        pieces = _pieces(plan_cuts(duration, pauses, target, longest), duration)
+        _run(pieces, lambda p: _cut_wav(samples, rate, p))
+
+    lines = [line for p in pieces for line in p.lines]
+    log.info("transcribed %s: %.0fs of audio in %d pieces, %d lines", filename, duration, len(pieces), len(lines))
+    return Transcript(lines, duration, len(pieces))
@@ -0,0 +1,223 @@
+"""Text-to-speech for text of any length: sentence-sized segments, synthesized side by side, streamed in order.
+
+The speech API takes at most 4096 characters per call and answers with the whole clip. A study guide
+read aloud is many times that. stream() splits the text on sentence boundaries, keeps up to
+TTS_CONCURRENCY segments in flight on a shared pool, and yields each segment's MP3 as soon as it and
+every segment before it are done. The first segment is kept short, so playback starts after one
+short call instead of after the whole document.
+
+MP3 is a sequence of self-contained frames, so segments join by concatenation. The ID3 tags and the
+Xing/Info header frame each clip starts with are stripped first. Left in, the Info frame would give
+players the first segment's duration as the length of the whole stream.
+
+Segments already in tts_cache are read from disk instead of synthesized. Boundaries are chosen so
+that editing a sentence leaves the other segments byte-identical, which keeps those cache hits.
+"""
+from __future__ import annotations
+
+import contextvars
+import re
+import threading
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator, List, Optional
+
+from flask import current_app
+
+from app.services import tts_cache, usage_ledger
+from app.services.openai_service import TTS_MODEL, TTS_VOICES, synthesize_speech_mp3
+from app.services.stage_timing import span
+
+API_MAX_CHARS = 4096
+FIRST_SEGMENT_CHARS = 300  # one or two sentences: the first audio is back in ~1s
+SEGMENT_CHARS = 1500  # later segments: fewer calls, each still well under the API cap
+BOUNDARY_ODDS = 4  # inside a paragraph, ~1 sentence in 4 may end a segment (once it is SEGMENT_CHARS/2)
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?…])\s+|(?<=[.!?…][\"')\]])\s+|\s*\n\s*")  # lines of a list count too
+_SOFT_BREAK_RE = re.compile(r"(?<=[,;:])\s+|\s+[-–—]\s+")
+
+# MPEG audio frame header tables (layer III)
+_BITRATES_V1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_BITRATES_V2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+_SAMPLE_RATES = {3: (44100, 48000, 32000), 2: (22050, 24000, 16000), 0: (11025, 12000, 8000)}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="tts")
+        return _pool
+
+
+def _setting(name: str, default: int) -> int:
+    try:
+        return int(current_app.config.get(name) or default)
+    except RuntimeError:
+        return default
+
+
+def max_chars() -> int:
+    return _setting("TTS_MAX_CHARS", 60000)
+
+
+def _pieces(text: str, limit: int, pattern) -> List[str]:
+    parts = [p.strip() for p in pattern.split(text) if p and p.strip()]
+    out: List[str] = []
+    for p in parts:
+        if len(p) <= limit:
+            out.append(p)
+        elif pattern is _SENTENCE_END_RE:
+            out.extend(_pieces(p, limit, _SOFT_BREAK_RE))
+        else:
+            # a run-on with no punctuation: break between words
+            line = ""
+            for word in p.split():
+                while len(word) > limit:
+                    out.append(word[:limit])
+                    word = word[limit:]
+                if line and len(line) + 1 + len(word) > limit:
+                    out.append(line)
+                    line = word
+                else:
+                    line = f"{line} {word}".strip()
+            if line:
+                out.append(line)
+    return out
+
+
+def split_text(text: str, first: int = FIRST_SEGMENT_CHARS, size: int = SEGMENT_CHARS) -> List[str]:
+    """Segments of whole sentences: the first up to `first` chars, the rest up to `size`.
+
+    A paragraph break always ends a segment. Inside a paragraph a segment ends after a sentence
+    whose own hash says so, or when the next sentence won't fit. Either way the boundary depends on
+    the nearby text and not on where the previous segment started, so the cut points realign
+    right after an edited sentence.
+    """
+    text = (text or "").strip()
+    if not text:
+        return []
+    segments: List[str] = []
+    for paragraph in _PARAGRAPH_RE.split(text):
+        current = ""
+        for sentence in _pieces(paragraph, min(size, API_MAX_CHARS), _SENTENCE_END_RE):
+            limit = first if not segments else size
+            if current and len(current) + 1 + len(sentence) > limit:
+                segments.append(current)
+                current = ""
+            current = f"{current} {sentence}".strip()
+            if segments and len(current) >= size // 2 and zlib.crc32(sentence.encode()) % BOUNDARY_ODDS == 0:
+                segments.append(current)
+                current = ""
+        if current:
+            segments.append(current)
+    return segments
+
+
+def _frame_length(data: bytes, pos: int) -> int:
+    """Byte length of the MPEG layer III frame starting at pos, or 0 if there isn't one."""
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+        return 0
+    version = (data[pos + 1] >> 3) & 0x3
+    layer = (data[pos + 1] >> 1) & 0x3
+    bitrate_idx = data[pos + 2] >> 4
+    rate_idx = (data[pos + 2] >> 2) & 0x3
+    padding = (data[pos + 2] >> 1) & 0x1
+    if version == 1 or layer != 1 or bitrate_idx in (0, 15) or rate_idx == 3:
+        return 0
+    bitrate = (_BITRATES_V1 if version == 3 else _BITRATES_V2)[bitrate_idx] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_idx]
+    return (144 if version == 3 else 72) * bitrate // sample_rate + padding
+
+
+def strip_headers(mp3: bytes) -> bytes:
+    """Audio frames only: drop a leading ID3v2 tag, a Xing/Info/VBRI frame and a trailing ID3v1 tag."""
+    start = 0
+    if mp3[:3] == b"ID3" and len(mp3) >= 10:
+        size = (mp3[6] << 21) | (mp3[7] << 14) | (mp3[8] << 7) | mp3[9]
+        start = 10 + size + (10 if mp3[5] & 0x10 else 0)
+    end = len(mp3) - 128 if len(mp3) >= 128 and mp3[-128:-125] == b"TAG" else len(mp3)
+    n = _frame_length(mp3, start)
+    if n and any(tag in mp3[start:start + min(n, 200)] for tag in (b"Xing", b"Info", b"VBRI")):
+        start += n
+    return mp3[start:end]
+
+
+@dataclass
+class Plan:
+    """One /audio/tts request: its segments, their cache keys and the clip id for replays."""
+
+    voice: str
+    segments: List[str]
+    keys: List[str]
+    clip_id: Optional[str] = None
+
+
+def plan(text: str, voice: str = "alloy") -> Plan:
+    voice = (voice or "alloy").lower().strip()
+    if voice not in TTS_VOICES:
+        voice = "alloy"
+    segments = split_text(text)
+    if not segments:
+        raise ValueError("text is required")
+    keys = [tts_cache.segment_key(seg, voice, TTS_MODEL) for seg in segments]
+    return Plan(voice, segments, keys, tts_cache.save_clip(keys))
+
+
+def _segment(text: str, voice: str, key: str) -> bytes:
+    with span("tts_segment"):
+        data = strip_headers(synthesize_speech_mp3(text, voice=voice))
+    tts_cache.put(key, data)
+    return data
+
+
+def stream(p: Plan) -> Iterator[bytes]:
+    """MP3 bytes for the whole plan, one segment at a time, in order.
+
+    Cached segments come off disk. The rest are synthesized, up to TTS_CONCURRENCY at a time.
+    Errors from a segment surface when the iteration reaches it. Call next() once inside the
+    request to turn "no key" into a normal error response before any audio is sent.
+    """
+    ahead = max(1, _setting("TTS_CONCURRENCY", 4))
+    # pool threads have no request context: pin the caller's usage attribution into each copy
+    who = usage_ledger.current()
+    pool = _get_pool()
+    queued = iter(zip(p.segments, p.keys))
+    pending: deque = deque()  # bytes (cache hit) or Future
+
+    def fill() -> None:
+        while sum(isinstance(x, Future) for x in pending) < ahead:
+            item = next(queued, None)
+            if item is None:
+                return
+            seg, key = item
+            cached = tts_cache.get(key)
+            if cached is not None:
+                pending.append(cached)
+                continue
+            with usage_ledger.attribute(who.get("user_id"), who.get("brain_id"), who.get("feature")):
+                pending.append(pool.submit(contextvars.copy_context().run, _segment, seg, p.voice, key))
+
+    fill()
+    try:
+        while pending:
+            item = pending.popleft()
+            data = item.result() if isinstance(item, Future) else item
+            fill()
+            yield data
+    finally:
+        # client went away / a segment failed: don't pay for audio nobody will hear
+        for f in pending:
+            if isinstance(f, Future):
+                f.cancel()
+
+
+def synthesize(text: str, voice: str = "alloy") -> bytes:
+    """stream() collected into one MP3."""
+    return b"".join(stream(plan(text, voice)))
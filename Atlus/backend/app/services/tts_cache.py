@@ -0,0 +1,231 @@
+"""Synthesized speech cached on disk, one file per sentence segment, plus the clips built from them.
+
+    <TTS_CACHE_DIR>/3f/<sha256>.mp3   one segment's audio frames (tags already stripped)
+    <TTS_CACHE_DIR>/clips/<id>.json   the ordered segment keys of one /audio/tts request
+    <TTS_CACHE_DIR>/clips/<id>.mp3    those segments joined, written on the first GET (range requests)
+
+A segment key hashes the model, the voice and the segment text with its whitespace collapsed.
+tts.split_text picks segment boundaries from the text around them, so an edited note only misses on
+the segments near the edit. Replaying an unchanged note needs no API call at all.
+
+The whole directory is kept under TTS_CACHE_MB. A read bumps a file's mtime; when a write pushes the
+total over the limit, the least recently used files go first, down to 80% of the limit.
+TTS_CACHE_MB=0 turns the cache off.
+
+Clip ids are deterministic in the text, so a clip id alone must not be a way in: GET
+/audio/tts/clips/<id>.mp3 needs the u / exp / sig query from clip_query(), an HMAC (SECRET_KEY) over
+the clip, the user it was made for and an expiry TTS_CLIP_URL_SECONDS out.
+"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+log = logging.getLogger(__name__)
+
+CLIP_ID_RE = re.compile(r"^[0-9a-f]{40}$")
+
+_settings = {"dir": None, "max_bytes": 0, "secret": b"", "url_seconds": 3600}
+_state = {"size": None}  # bytes on disk, counted on first write, then kept up to date
+_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return bool(_settings["dir"] and _settings["max_bytes"] > 0)
+
+
+def segment_key(text: str, voice: str, model: str) -> str:
+    norm = " ".join((text or "").split())
+    return hashlib.sha256(f"{model}\0{voice}\0{norm}".encode("utf-8")).hexdigest()
+
+
+def _root() -> Path:
+    return Path(_settings["dir"])
+
+
+def _segment_path(key: str) -> Path:
+    return _root() / key[:2] / f"{key}.mp3"
+
+
+def _clip_path(clip_id: str, ext: str) -> Path:
+    return _root() / "clips" / f"{clip_id}.{ext}"
+
+
+def _write(path: Path, data: bytes) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    _added(len(data))
+
+
+def _touch(path: Path) -> None:
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def get(key: str) -> Optional[bytes]:
+    if not enabled():
+        return None
+    path = _segment_path(key)
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    _touch(path)
+    return data
+
+
+def put(key: str, data: bytes) -> None:
+    if not enabled() or not data:
+        return
+    try:
+        _write(_segment_path(key), data)
+    except OSError:
+        log.warning("could not cache TTS segment %s", key[:12], exc_info=True)
+
+
+def save_clip(keys: List[str]) -> Optional[str]:
+    """Record the segment order for a request; returns the clip id (same keys -> same id)."""
+    if not enabled() or not keys:
+        return None
+    clip_id = hashlib.sha1("\n".join(keys).encode()).hexdigest()
+    path = _clip_path(clip_id, "json")
+    if path.exists():
+        _touch(path)
+        return clip_id
+    try:
+        _write(path, json.dumps(keys).encode())
+    except OSError:
+        log.warning("could not record TTS clip %s", clip_id, exc_info=True)
+        return None
+    return clip_id
+
+
+def _clip_sig(clip_id: str, user_id, exp: int) -> str:
+    msg = f"{clip_id}:{user_id}:{exp}".encode()
+    return hmac.new(_settings["secret"], msg, hashlib.sha256).hexdigest()
+
+
+def clip_query(clip_id: str, user_id) -> dict:
+    """Query args for a replay URL only this user can use, until it expires."""
+    exp = int(time.time()) + _settings["url_seconds"]
+    return {"u": user_id, "exp": exp, "sig": _clip_sig(clip_id, user_id, exp)}
+
+
+def clip_seconds_left(clip_id: str, user_id, exp, sig) -> Optional[int]:
+    """Seconds the signed URL is still good for; None if the signature is wrong or it expired."""
+    try:
+        exp = int(exp)
+    except (TypeError, ValueError):
+        return None
+    left = exp - int(time.time())
+    if left <= 0 or not hmac.compare_digest(str(sig or ""), _clip_sig(clip_id, user_id, exp)):
+        return None
+    return left
+
+
+def clip_segments(clip_id: str) -> Optional[List[bytes]]:
+    """Every segment of the clip from the cache, in order; None if any is missing."""
+    if not enabled() or not CLIP_ID_RE.match(clip_id or ""):
+        return None
+    try:
+        keys = json.loads(_clip_path(clip_id, "json").read_text())
+    except (OSError, ValueError):
+        return None
+    parts = []
+    for key in keys:
+        data = get(key)
+        if data is None:
+            return None
+        parts.append(data)
+    return parts
+
+
+def clip_file(clip_id: str) -> Optional[Path]:
+    """The clip as one MP3 on disk, joined from its segments if needed; None if any segment is gone."""
+    if not enabled() or not CLIP_ID_RE.match(clip_id or ""):
+        return None
+    path = _clip_path(clip_id, "mp3")
+    if path.exists():
+        _touch(path)
+        return path
+    parts = clip_segments(clip_id)
+    if parts is None:
+        return None
+    try:
+        _write(path, b"".join(parts))
+    except OSError:
+        log.warning("could not write TTS clip %s", clip_id, exc_info=True)
+        return None
+    return path
+
+
+def _files():
+    root = _root()
+    if not root.is_dir():
+        return
+    for sub in os.scandir(root):
+        if not sub.is_dir():
+            continue
+        for entry in os.scandir(sub.path):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                st = entry.stat()
+                yield entry.path, st.st_size, st.st_mtime
+
+
+def _added(n: int) -> None:
+    with _lock:
+        if _state["size"] is None:
+            _state["size"] = sum(size for _, size, _ in _files())
+        else:
+            _state["size"] += n
+        if _state["size"] <= _settings["max_bytes"]:
+            return
+        _evict()
+
+
+def _evict() -> None:
+    """Oldest-used first until under 80% of the limit (caller holds _lock)."""
+    started = time.monotonic()
+    files = sorted(_files(), key=lambda f: f[2])
+    total = sum(size for _, size, _ in files)
+    target = int(_settings["max_bytes"] * 0.8)
+    removed = 0
+    for path, size, _ in files:
+        if total <= target:
+            break
+        try:
+            os.unlink(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    _state["size"] = total
+    log.info("TTS cache: evicted %d files in %.0f ms, %.1f MB left", removed, (time.monotonic() - started) * 1000, total / 1e6)
+
+
+def init_app(app) -> None:
+    directory = app.config.get("TTS_CACHE_DIR") or os.path.join(app.instance_path, "tts_cache")
+    _settings["dir"] = directory
+    _settings["max_bytes"] = int(float(app.config.get("TTS_CACHE_MB") or 0) * 1024 * 1024)
+    _settings["secret"] = (app.config.get("SECRET_KEY") or "").encode()
+    _settings["url_seconds"] = int(app.config.get("TTS_CLIP_URL_SECONDS") or 3600)
+    _state["size"] = None
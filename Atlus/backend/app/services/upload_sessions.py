@@ -0,0 +1,245 @@
+"""Resumable uploads: open a session, PUT byte ranges (any order, any retries), finalize.
+
+    <UPLOAD_FOLDER>/.incoming/<id>.json     owner, filename, size, whole-file sha256 if the client sent one
+    <UPLOAD_FOLDER>/.incoming/<id>.part     the file itself; each range is written at its offset as it streams in
+    <UPLOAD_FOLDER>/.incoming/<id>.ranges   one "start end" line per stored range
+
+A dropped connection costs only the range that was in flight: GET /uploads/<id> lists what
+arrived and the client sends the rest. Range lines are appended with O_APPEND (one short write
+each), so parallel PUTs and several worker processes can record ranges without a lock. A range is
+recorded only once all of its bytes are on disk and match its X-Chunk-SHA256.
+
+finalize() checks that every byte arrived and that the sha256 matches, then renames the .part
+file to .ready. Consumers (/brain/ingest, /brain/create, /brain/ocr, /audio/transcribe) take it
+as a StoredUpload and read it from disk, not from a request body held in memory, then discard it.
+Sessions untouched for UPLOAD_SESSION_HOURS are swept when the next one is opened.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Tuple
+
+from flask import current_app
+
+INCOMING_DIR = ".incoming"
+CHUNK_BYTES = 8 * 1024 * 1024  # what clients are told to send per PUT
+MAX_RANGE_BYTES = 64 * 1024 * 1024
+_COPY_BYTES = 1024 * 1024
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+_CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+
+class UploadError(Exception):
+    """A request the session can't take; status is the HTTP code to answer with."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class StoredUpload:
+    """A finalized upload: consumers read `path` and call discard() when done."""
+
+    upload_id: str
+    filename: str
+    path: Path
+    size: int
+
+
+def _root() -> Path:
+    return Path(current_app.root_path).parent / current_app.config.get("UPLOAD_FOLDER", "uploads") / INCOMING_DIR
+
+
+def _path(upload_id: str, ext: str) -> Path:
+    if not _ID_RE.match(upload_id or ""):
+        raise UploadError("upload not found", 404)
+    return _root() / f"{upload_id}.{ext}"
+
+
+def max_bytes() -> int:
+    return int(current_app.config.get("UPLOAD_MAX_MB") or 1024) * 1024 * 1024
+
+
+def _meta(upload_id: str, user_id: int) -> dict:
+    try:
+        meta = json.loads(_path(upload_id, "json").read_text())
+    except (OSError, ValueError):
+        raise UploadError("upload not found", 404)
+    if meta.get("user_id") != user_id:
+        raise UploadError("upload not found", 404)
+    return meta
+
+
+def received(upload_id: str) -> List[Tuple[int, int]]:
+    """Stored ranges, merged, as [start, end) pairs."""
+    try:
+        lines = _path(upload_id, "ranges").read_text().split("\n")
+    except OSError:
+        return []
+    spans = sorted(tuple(int(x) for x in line.split()) for line in lines if line.strip())
+    merged: List[List[int]] = []
+    for start, end in spans:
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(a, b) for a, b in merged]
+
+
+def _status(upload_id: str, meta: dict) -> dict:
+    ranges = received(upload_id)
+    got = sum(b - a for a, b in ranges)
+    return {
+        "upload_id": upload_id,
+        "filename": meta["filename"],
+        "size": meta["size"],
+        "chunk_size": CHUNK_BYTES,
+        "received": [[a, b] for a, b in ranges],
+        "bytes_received": got,
+        "complete": got >= meta["size"],
+        "ready": _path(upload_id, "ready").exists(),
+    }
+
+
+def sweep() -> int:
+    """Drop sessions nobody has touched for UPLOAD_SESSION_HOURS."""
+    root = _root()
+    if not root.is_dir():
+        return 0
+    cutoff = time.time() - float(current_app.config.get("UPLOAD_SESSION_HOURS") or 24) * 3600
+    removed = 0
+    for entry in os.scandir(root):
+        try:
+            if entry.is_file() and entry.stat().st_mtime < cutoff:
+                os.unlink(entry.path)
+                removed += 1
+        except OSError:
+            continue
+    return removed
+
+
+def create(user_id: int, filename: str, size: int, sha256: Optional[str] = None) -> dict:
+    filename = Path(filename or "").name.strip()
+    if not filename:
+        raise UploadError("filename required")
+    if not isinstance(size, int) or size <= 0:
+        raise UploadError("size must be a positive number of bytes")
+    if size > max_bytes():
+        raise UploadError(f"file too large (max {max_bytes() // (1024 * 1024)} MB)", 413)
+    sha256 = (sha256 or "").strip().lower() or None
+    if sha256 and not _SHA256_RE.match(sha256):
+        raise UploadError("sha256 must be 64 hex characters")
+    sweep()
+    upload_id = uuid.uuid4().hex
+    root = _root()
+    root.mkdir(parents=True, exist_ok=True)
+    meta = {"user_id": user_id, "filename": filename, "size": size, "sha256": sha256, "created": time.time()}
+    with open(_path(upload_id, "part"), "wb") as f:
+        f.truncate(size)  # sparse; ranges land at their offsets
+    _path(upload_id, "json").write_text(json.dumps(meta))
+    return _status(upload_id, meta)
+
+
+def status(upload_id: str, user_id: int) -> dict:
+    return _status(upload_id, _meta(upload_id, user_id))
+
+
+def parse_content_range(header: Optional[str]) -> Tuple[int, int, int]:
+    """'bytes 0-8388607/314572800' -> (start, end exclusive, total)."""
+    m = _CONTENT_RANGE_RE.match((header or "").strip())
+    if not m:
+        raise UploadError("Content-Range: bytes <start>-<end>/<size> required")
+    start, last, total = (int(g) for g in m.groups())
+    if last < start:
+        raise UploadError("Content-Range end before start", 416)
+    return start, last + 1, total
+
+
+def write_range(upload_id: str, user_id: int, content_range: str, stream: BinaryIO, chunk_sha256: Optional[str] = None) -> dict:
+    """Stream one range from the request body into place, then record it."""
+    meta = _meta(upload_id, user_id)
+    start, end, total = parse_content_range(content_range)
+    if total != meta["size"] or end > total:
+        raise UploadError(f"range outside the upload's {meta['size']} bytes", 416)
+    if end - start > MAX_RANGE_BYTES:
+        raise UploadError(f"at most {MAX_RANGE_BYTES // (1024 * 1024)} MB per request", 413)
+    part = _path(upload_id, "part")
+    if not part.exists():
+        raise UploadError("upload already finalized", 409)
+    digest = hashlib.sha256()
+    remaining = end - start
+    with open(part, "r+b") as f:
+        f.seek(start)
+        while remaining:
+            block = stream.read(min(_COPY_BYTES, remaining))
+            if not block:
+                break
+            f.write(block)
+            digest.update(block)
+            remaining -= len(block)
+    if remaining:
+        raise UploadError(f"body ended {remaining} bytes short of the Content-Range")
+    if chunk_sha256 and digest.hexdigest() != chunk_sha256.strip().lower():
+        raise UploadError("chunk checksum mismatch; send the range again", 422)
+    fd = os.open(_path(upload_id, "ranges"), os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        os.write(fd, f"{start} {end}\n".encode())
+    finally:
+        os.close(fd)
+    os.utime(_path(upload_id, "json"))  # still in progress: keep it out of sweep()
+    return _status(upload_id, meta)
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_COPY_BYTES), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def finalize(upload_id: str, user_id: int, sha256: Optional[str] = None) -> dict:
+    """All bytes present and the checksum right: the upload becomes ready for a consumer."""
+    meta = _meta(upload_id, user_id)
+    ready = _path(upload_id, "ready")
+    if ready.exists():
+        return _status(upload_id, meta)
+    state = _status(upload_id, meta)
+    if not state["complete"]:
+        raise UploadError(f"upload incomplete: {state['bytes_received']} of {meta['size']} bytes", 409)
+    expected = (sha256 or "").strip().lower() or meta.get("sha256")
+    part = _path(upload_id, "part")
+    actual = _file_sha256(part)
+    if expected and actual != expected:
+        # something in the stored ranges is wrong and we can't tell which: start over
+        discard(upload_id)
+        raise UploadError("checksum mismatch; upload the file again", 422)
+    os.replace(part, ready)
+    meta["sha256"] = actual
+    _path(upload_id, "json").write_text(json.dumps(meta))
+    return _status(upload_id, meta)
+
+
+def claim(upload_id: str, user_id: int) -> StoredUpload:
+    """A finalized upload for a consumer route."""
+    meta = _meta(upload_id, user_id)
+    ready = _path(upload_id, "ready")
+    if not ready.exists():
+        raise UploadError("upload not finalized", 409)
+    return StoredUpload(upload_id, meta["filename"], ready, meta["size"])
+
+
+def discard(upload_id: str) -> None:
+    for ext in ("part", "ready", "ranges", "json"):
+        try:
+            _path(upload_id, ext).unlink()
+        except (OSError, UploadError):
+            pass
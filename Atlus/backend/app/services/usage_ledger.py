@@ -0,0 +1,351 @@
+"""Token / cost ledger for every OpenAI call (llm_usage table), plus the rollups the usage routes serve.
+
+Who pays is kept in a contextvar, like the llm lane:
+
+    with attribute(user_id=..., brain_id=..., feature="ingest"):
+        ...
+
+Anything left unset is filled in from the request being served (JWT identity, <brain_id> in the
+URL, the endpoint name), so most routes need nothing. Rows are buffered and written by a
+background thread through the engine on its own connection, so recording never touches the
+caller's session / transaction and works from the OpenAI event loop thread too.
+"""
+import atexit
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from flask import has_request_context, request
+from sqlalchemy import func, select
+
+from app.models.usage import LlmUsage
+from app.services import metrics
+
+log = logging.getLogger(__name__)
+
+TOKENS = metrics.counter("atlus_llm_tokens_total", "OpenAI tokens by model, feature and kind (prompt/cached/completion).")
+COST = metrics.counter("atlus_llm_cost_usd_total", "Estimated OpenAI spend in USD by model and feature.")
+
+# USD per 1M tokens (chat), per 1M characters (tts) or per minute (whisper). Override / extend
+# with ATLUS_LLM_PRICES='{"gpt-4o": {"input": 2.5, "cached_input": 1.25, "output": 10}}'.
+DEFAULT_PRICES: Dict[str, dict] = {
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "tts-1": {"per_million_chars": 15.00},
+    "tts-1-hd": {"per_million_chars": 30.00},
+    "whisper-1": {"per_minute": 0.006},
+}
+
+_MAX_PENDING = 10000  # rows kept while the DB is unreachable; oldest dropped past this
+
+_attribution: contextvars.ContextVar["dict | None"] = contextvars.ContextVar("llm_attribution", default=None)
+
+_lock = threading.Lock()
+_pending: List[dict] = []
+_wake = threading.Event()
+_writer: Optional[threading.Thread] = None
+_engine = None
+_settings = {"flush_seconds": 2.0, "batch": 200, "rollup_ttl": 60.0}
+_prices: Optional[Dict[str, dict]] = None
+_rollups: Dict[tuple, tuple] = {}
+
+
+@contextlib.contextmanager
+def attribute(user_id=None, brain_id=None, feature: str | None = None):
+    """Charge OpenAI calls in the block (and work submitted with a copied context) to these ids."""
+    merged = dict(_attribution.get() or {})
+    for key, value in (("user_id", user_id), ("brain_id", brain_id), ("feature", feature)):
+        if value is not None:
+            merged[key] = value
+    token = _attribution.set(merged)
+    try:
+        yield
+    finally:
+        _attribution.reset(token)
+
+
+def current() -> dict:
+    out = dict(_attribution.get() or {})
+    if has_request_context():
+        if out.get("user_id") is None:
+            try:
+                from flask_jwt_extended import get_jwt_identity
+
+                out["user_id"] = get_jwt_identity()
+            except Exception:
+                pass  # no JWT on this request (or not verified yet)
+        if out.get("brain_id") is None and request.view_args:
+            out["brain_id"] = request.view_args.get("brain_id")
+        if not out.get("feature") and request.endpoint:
+            out["feature"] = request.endpoint
+    try:
+        out["user_id"] = int(out["user_id"]) if out.get("user_id") is not None else None
+    except (TypeError, ValueError):
+        out["user_id"] = None
+    return out
+
+
+def prices() -> Dict[str, dict]:
+    global _prices
+    if _prices is None:
+        table = {k: dict(v) for k, v in DEFAULT_PRICES.items()}
+        raw = (os.environ.get("ATLUS_LLM_PRICES") or "").strip()
+        if raw:
+            try:
+                for model, p in json.loads(raw).items():
+                    table.setdefault(model, {}).update(p)
+            except (ValueError, AttributeError) as e:
+                log.warning("ignoring ATLUS_LLM_PRICES: %s", e)
+        _prices = table
+    return _prices
+
+
+def _price_for(model: str) -> dict:
+    table = prices()
+    if model in table:
+        return table[model]
+    # dated snapshots (gpt-4o-2024-08-06) bill like their family; longest prefix wins
+    for name in sorted(table, key=len, reverse=True):
+        if model.startswith(name):
+            return table[name]
+    return {}
+
+
+def estimate_cost(model: str, prompt_tokens=0, cached_tokens=0, completion_tokens=0, tts_chars=0, audio_seconds=0.0) -> float:
+    p = _price_for(model)
+    uncached = max(0, prompt_tokens - cached_tokens)
+    cost = (
+        uncached * p.get("input", 0)
+        + cached_tokens * p.get("cached_input", p.get("input", 0))
+        + completion_tokens * p.get("output", 0)
+        + tts_chars * p.get("per_million_chars", 0)
+    ) / 1_000_000
+    cost += audio_seconds / 60.0 * p.get("per_minute", 0)
+    return round(cost, 8)
+
+
+def _usage_fields(response) -> dict:
+    """prompt / cached / completion tokens (+ audio seconds) from a chat or transcription response."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return {}
+    if getattr(usage, "type", None) == "duration":
+        return {"audio_seconds": float(getattr(usage, "seconds", 0) or 0)}
+    prompt = getattr(usage, "prompt_tokens", None)
+    if prompt is None:
+        prompt = getattr(usage, "input_tokens", None)  # transcription token usage
+    completion = getattr(usage, "completion_tokens", None)
+    if completion is None:
+        completion = getattr(usage, "output_tokens", None)
+    details = getattr(usage, "prompt_tokens_details", None) or getattr(usage, "input_token_details", None)
+    cached = getattr(details, "cached_tokens", None) if details is not None else None
+    return {
+        "prompt_tokens": int(prompt or 0),
+        "completion_tokens": int(completion or 0),
+        "cached_tokens": int(cached or 0),
+    }
+
+
+def record(model: str, operation: str, response=None, *, tts_chars: int = 0, audio_seconds: float = 0.0, latency_s: float | None = None) -> None:
+    """Ledger one successful API call. Never raises — accounting must not break the request."""
+    try:
+        who = current()
+        fields = _usage_fields(response)
+        if audio_seconds and not fields.get("audio_seconds"):
+            fields["audio_seconds"] = audio_seconds
+        row = {
+            "created_at": datetime.now(timezone.utc),
+            "user_id": who.get("user_id"),
+            "brain_id": who.get("brain_id"),
+            "feature": (who.get("feature") or operation or "other")[:64],
+            "operation": (operation or "chat")[:64],
+            "model": (model or "unknown")[:64],
+            "prompt_tokens": fields.get("prompt_tokens", 0),
+            "cached_tokens": fields.get("cached_tokens", 0),
+            "completion_tokens": fields.get("completion_tokens", 0),
+            "tts_chars": int(tts_chars or 0),
+            "audio_seconds": float(fields.get("audio_seconds") or 0),
+            "latency_ms": round(latency_s * 1000, 1) if latency_s is not None else None,
+        }
+        row["cost_usd"] = estimate_cost(
+            row["model"],
+            row["prompt_tokens"],
+            row["cached_tokens"],
+            row["completion_tokens"],
+            row["tts_chars"],
+            row["audio_seconds"],
+        )
+        labels = {"model": row["model"], "feature": row["feature"]}
+        TOKENS.inc(row["prompt_tokens"] - row["cached_tokens"], kind="prompt", **labels)
+        TOKENS.inc(row["cached_tokens"], kind="cached", **labels)
+        TOKENS.inc(row["completion_tokens"], kind="completion", **labels)
+        COST.inc(row["cost_usd"], **labels)
+        with _lock:
+            _pending.append(row)
+            if len(_pending) > _MAX_PENDING:
+                del _pending[: len(_pending) - _MAX_PENDING]
+            full = len(_pending) >= _settings["batch"]
+        _ensure_writer()
+        if full:
+            _wake.set()
+    except Exception:
+        log.exception("usage ledger: could not record %s call", model)
+
+
+def flush() -> int:
+    """Write buffered rows now; returns how many were written."""
+    with _lock:
+        rows = _pending[:]
+        del _pending[:]
+    if not rows:
+        return 0
+    if _engine is None:
+        with _lock:
+            _pending[:0] = rows  # no app yet (script / worker before init_app) — keep them
+        return 0
+    try:
+        with _engine.begin() as conn:
+            conn.execute(LlmUsage.__table__.insert(), rows)
+    except Exception as e:
+        log.warning("usage ledger: write of %s rows failed, will retry: %s", len(rows), e)
+        with _lock:
+            _pending[:0] = rows
+            if len(_pending) > _MAX_PENDING:
+                del _pending[: len(_pending) - _MAX_PENDING]
+        return 0
+    return len(rows)
+
+
+def _writer_loop():
+    while True:
+        _wake.wait(_settings["flush_seconds"])
+        _wake.clear()
+        flush()
+
+
+def _ensure_writer():
+    global _writer
+    if _writer is not None or _engine is None:
+        return
+    with _lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_writer_loop, name="usage-ledger", daemon=True)
+            _writer.start()
+
+
+def init_app(app) -> None:
+    """Point the writer at this app's engine. Call after db.init_app."""
+    global _engine
+    from app.extensions import db
+
+    with app.app_context():
+        _engine = db.engine
+    _settings["flush_seconds"] = float(app.config.get("USAGE_FLUSH_SECONDS") or 2)
+    _settings["rollup_ttl"] = float(app.config.get("USAGE_ROLLUP_TTL", 60) or 0)
+    _rollups.clear()
+    _ensure_writer()
+
+
+def _after_fork() -> None:
+    # a preforked worker has the parent's module state but not its writer thread
+    global _writer, _lock
+    _lock = threading.Lock()
+    del _pending[:]  # the parent writes its own
+    _writer = None
+    _ensure_writer()
+
+
+atexit.register(flush)
+if hasattr(os, "register_at_fork"):  # not on Windows, which doesn't fork
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+GROUPS = {
+    "feature": LlmUsage.feature,
+    "operation": LlmUsage.operation,
+    "model": LlmUsage.model,
+    "brain": LlmUsage.brain_id,
+    "user": LlmUsage.user_id,
+    "day": func.date(LlmUsage.created_at),
+}
+
+
+def summarize(group_by: str = "feature", *, user_id=None, brain_id=None, since: datetime | None = None) -> dict:
+    """Totals plus one row per group (largest spend first) straight from llm_usage."""
+    if group_by not in GROUPS:
+        raise ValueError(f"group_by must be one of {', '.join(GROUPS)}")
+    key = GROUPS[group_by].label("key")
+    measures = [
+        func.count().label("calls"),
+        func.coalesce(func.sum(LlmUsage.prompt_tokens), 0).label("prompt_tokens"),
+        func.coalesce(func.sum(LlmUsage.cached_tokens), 0).label("cached_tokens"),
+        func.coalesce(func.sum(LlmUsage.completion_tokens), 0).label("completion_tokens"),
+        func.coalesce(func.sum(LlmUsage.tts_chars), 0).label("tts_chars"),
+        func.coalesce(func.sum(LlmUsage.audio_seconds), 0).label("audio_seconds"),
+        func.coalesce(func.sum(LlmUsage.cost_usd), 0).label("cost_usd"),
+    ]
+    filters = []
+    if user_id is not None:
+        filters.append(LlmUsage.user_id == user_id)
+    if brain_id is not None:
+        filters.append(LlmUsage.brain_id == brain_id)
+    if since is not None:
+        filters.append(LlmUsage.created_at >= since)
+
+    with _engine.connect() as conn:
+        rows = conn.execute(select(key, *measures).where(*filters).group_by(key)).mappings().all()
+
+    def shape(m) -> dict:
+        prompt = int(m["prompt_tokens"] or 0)
+        cached = int(m["cached_tokens"] or 0)
+        return {
+            "calls": int(m["calls"] or 0),
+            "prompt_tokens": prompt,
+            "cached_tokens": cached,
+            "completion_tokens": int(m["completion_tokens"] or 0),
+            "cache_hit_ratio": round(cached / prompt, 3) if prompt else None,
+            "tts_chars": int(m["tts_chars"] or 0),
+            "audio_seconds": round(float(m["audio_seconds"] or 0), 1),
+            "cost_usd": round(float(m["cost_usd"] or 0), 6),
+        }
+
+    groups = [{group_by: r["key"] if group_by != "day" else str(r["key"]), **shape(r)} for r in rows]
+    groups.sort(key=lambda g: g["cost_usd"], reverse=True)
+    totals = {k: 0 for k in ("calls", "prompt_tokens", "cached_tokens", "completion_tokens", "tts_chars", "audio_seconds", "cost_usd")}
+    for g in groups:
+        for k in totals:
+            totals[k] += g[k]
+    totals["cost_usd"] = round(totals["cost_usd"], 6)
+    totals["audio_seconds"] = round(totals["audio_seconds"], 1)
+    totals["cache_hit_ratio"] = round(totals["cached_tokens"] / totals["prompt_tokens"], 3) if totals["prompt_tokens"] else None
+    return {"group_by": group_by, "totals": totals, "groups": groups}
+
+
+def rollup(group_by: str = "feature", *, user_id=None, brain_id=None, days: int = 30) -> dict:
+    """summarize() over the last `days`, cached for USAGE_ROLLUP_TTL seconds per scope."""
+    cache_key = (group_by, user_id, brain_id, days)
+    ttl = _settings["rollup_ttl"]
+    now = time.monotonic()
+    hit = _rollups.get(cache_key)
+    if hit is not None and now - hit[0] < ttl:
+        return hit[1]
+    flush()
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    out = summarize(group_by, user_id=user_id, brain_id=brain_id, since=since)
+    out["days"] = days
+    if ttl > 0:
+        if len(_rollups) > 1000:
+            _rollups.clear()
+        _rollups[cache_key] = (now, out)
+    return out
+
+
+def spent_usd(user_id: int, days: int = 30) -> float:
+    """Rolling spend for one user — what a quota check would compare against."""
+    return rollup("model", user_id=user_id, days=days)["totals"]["cost_usd"]
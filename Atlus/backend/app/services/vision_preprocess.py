@@ -0,0 +1,310 @@
+"""Shrink page photos / scans before they go to the vision model (PIL only, no numpy).
+
+A gpt-4o vision call is billed per 512px tile of the image *after* OpenAI resizes it (fit in
+2048x2048, then shortest side down to 768), so pixels beyond that are upload bytes for nothing
+and a page that lands just over a tile boundary pays for a whole extra row of tiles. prepare():
+
+1. honours EXIF rotation and flattens alpha onto white;
+2. deskews small rotations (projection profile over -6..6 degrees);
+3. crops to the ink bounding box plus a margin, dropping the desk / empty paper around the page;
+4. goes grayscale when the page has no real colour (pencil / pen handwriting);
+5. sizes the content at the resolution OpenAI kept from the whole upload before (so text is
+   no less legible than today), shaves it to a tile boundary when that is a small change, and
+   picks detail="low" when it then fits one 512px tile;
+6. re-encodes as JPEG.
+
+ATLUS_VISION_PREPROCESS=0 goes back to prepare_basic() (the old flatten / cap at 3072 / JPEG 90).
+"""
+import io
+import logging
+import math
+import os
+from dataclasses import dataclass
+
+from PIL import Image, ImageChops, ImageFilter, ImageOps, ImageStat
+
+log = logging.getLogger(__name__)
+
+TILE = 512
+HIGH_FIT = 2048
+HIGH_SHORT_SIDE = 768
+BASE_TOKENS = 85
+TILE_TOKENS = 170
+
+_ANALYSIS_SIDE = 800  # deskew / crop / colour checks run on a copy this size
+
+
+@dataclass
+class PreparedImage:
+    data: bytes
+    mime: str
+    detail: str
+    width: int
+    height: int
+
+    @property
+    def tokens(self) -> int:
+        return vision_tokens(self.width, self.height, self.detail)
+
+
+def _env(name: str, default: str) -> str:
+    return (os.environ.get(name) or default).strip().lower() or default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float((os.environ.get(name) or "").strip() or default)
+    except ValueError:
+        return default
+
+
+def high_detail_size(w: int, h: int) -> tuple:
+    """Size OpenAI actually looks at for detail=high."""
+    if max(w, h) > HIGH_FIT:
+        s = HIGH_FIT / max(w, h)
+        w, h = w * s, h * s
+    if min(w, h) > HIGH_SHORT_SIDE:
+        s = HIGH_SHORT_SIDE / min(w, h)
+        w, h = w * s, h * s
+    return max(1, int(round(w))), max(1, int(round(h)))
+
+
+def vision_tokens(w: int, h: int, detail: str = "high") -> int:
+    """Prompt tokens one image costs on gpt-4o (85 flat for low, 85 + 170 per 512px tile for high)."""
+    if detail == "low":
+        return BASE_TOKENS
+    sw, sh = high_detail_size(w, h)
+    return BASE_TOKENS + TILE_TOKENS * math.ceil(sw / TILE) * math.ceil(sh / TILE)
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        rgba = img.convert("RGBA")
+        background.paste(rgba, mask=rgba.split()[3])
+        return background
+    return img.convert("RGB")
+
+
+def prepare_basic(image_bytes: bytes) -> PreparedImage:
+    """The original path: flatten alpha → RGB, shrink huge scans, JPEG, always detail=high."""
+    img = _flatten(Image.open(io.BytesIO(image_bytes)))
+
+    max_side = int((os.environ.get("OCR_IMAGE_MAX_SIDE") or "3072").strip() or "3072")
+    w, h = img.size
+    if max(w, h) > max_side:
+        scale = max_side / max(w, h)
+        img = img.resize((int(w * scale), int(h * scale)), Image.Resampling.LANCZOS)
+
+    out = io.BytesIO()
+    quality = int((os.environ.get("OCR_JPEG_QUALITY") or "90").strip() or "90")
+    quality = max(60, min(quality, 100))
+    img.save(out, format="JPEG", quality=quality, optimize=True)
+    return PreparedImage(out.getvalue(), "image/jpeg", "high", img.width, img.height)
+
+
+def _otsu(gray: Image.Image) -> int:
+    hist = gray.histogram()
+    total = sum(hist)
+    sum_all = sum(i * n for i, n in enumerate(hist))
+    weight_bg = sum_bg = 0
+    best, best_var = 127, -1.0
+    for t in range(256):
+        weight_bg += hist[t]
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * hist[t]
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_all - sum_bg) / weight_fg
+        var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if var > best_var:
+            best, best_var = t, var
+    return best
+
+
+def _paper_box(gray: Image.Image):
+    """Bounding box of the bright sheet when it sits on a darker desk / table, else None."""
+    cutoff = _otsu(gray)
+    bright = gray.point(lambda v: 255 if v > cutoff else 0).filter(ImageFilter.MinFilter(5))
+    box = bright.getbbox()
+    if box is None:
+        return None
+    if (box[2] - box[0]) * (box[3] - box[1]) >= 0.9 * gray.width * gray.height:
+        return None
+    return box
+
+
+def _ink_mask(gray: Image.Image) -> Image.Image:
+    """255 where something darker than the paper is, 0 elsewhere."""
+    smooth = gray.filter(ImageFilter.MedianFilter(3))
+    # paper = bright end of the histogram; ink = clearly darker than it
+    hist = smooth.histogram()
+    total = sum(hist)
+    seen, paper = 0, 255
+    for level in range(255, -1, -1):
+        seen += hist[level]
+        if seen >= total * 0.5:
+            paper = level
+            break
+    cutoff = max(0, paper - max(40, paper // 4))
+    return smooth.point(lambda v: 255 if v < cutoff else 0)
+
+
+def _row_profile_score(mask: Image.Image) -> float:
+    # variance of per-row ink: text lines give sharp peaks when rows line up with them
+    rows = mask.resize((1, mask.height), Image.Resampling.BOX)
+    return ImageStat.Stat(rows).var[0]
+
+
+def _skew_angle(mask: Image.Image, max_angle: float = 6.0) -> float:
+    """Coarse 1-degree sweep, then quarter degrees around the best one."""
+    if mask.getbbox() is None:
+        return 0.0
+    if max(mask.size) > 500:
+        mask = mask.reduce(2)  # ~400px is plenty to line rows up, and 4x fewer pixels per rotate
+    base = _row_profile_score(mask)
+    scores = {0.0: base}
+
+    def score(angle: float) -> float:
+        if angle not in scores:
+            scores[angle] = _row_profile_score(mask.rotate(angle, resample=Image.Resampling.BILINEAR, fillcolor=0))
+        return scores[angle]
+
+    coarse = max((float(a) for a in range(-int(max_angle), int(max_angle) + 1)), key=score)
+    best = max((coarse + d for d in (-0.75, -0.5, -0.25, 0.0, 0.25, 0.5, 0.75)), key=score)
+    # flat-ish profiles (drawings, sparse pages) — don't rotate on noise
+    return best if scores[best] > base * 1.15 else 0.0
+
+
+def _is_colourful(img: Image.Image) -> bool:
+    """Bright saturated pixels (highlighter, red pen, diagrams) — dark ink counts as gray."""
+    _, sat, val = img.convert("HSV").split()
+    min_sat = int(_env_float("ATLUS_VISION_COLOUR_SATURATION", 80))
+    both = ImageChops.darker(
+        sat.point(lambda v: 255 if v >= min_sat else 0),
+        val.point(lambda v: 255 if v >= 110 else 0),
+    )
+    return both.histogram()[255] >= 0.005 * img.width * img.height
+
+
+def _fit_tiles(w: int, h: int, slack: float) -> tuple:
+    """Shave up to `slack` off the OpenAI-visible size when it drops a row / column of tiles."""
+    tw, th = high_detail_size(w, h)
+    best = (tw, th)
+    best_tiles = math.ceil(tw / TILE) * math.ceil(th / TILE)
+    for cols in range(1, math.ceil(tw / TILE) + 1):
+        for rows in range(1, math.ceil(th / TILE) + 1):
+            s = min(cols * TILE / tw, rows * TILE / th, 1.0)
+            if s < 1.0 - slack or cols * rows >= best_tiles:
+                continue
+            best, best_tiles = (max(1, int(tw * s)), max(1, int(th * s))), cols * rows
+    return best
+
+
+def _target_size(w: float, h: float, detail: str, slack: float) -> tuple:
+    if detail == "low":
+        s = min(1.0, TILE / max(w, h))
+        return max(1, int(w * s)), max(1, int(h * s))
+    return _fit_tiles(max(1, int(w)), max(1, int(h)), slack)
+
+
+def _load(image_bytes: bytes, at_least: tuple | None = None) -> Image.Image:
+    """Decode, upright, RGB. JPEGs decode straight at 1/2, 1/4 or 1/8 size when that still covers at_least."""
+    img = Image.open(io.BytesIO(image_bytes))
+    if at_least and img.format == "JPEG":
+        img.draft("RGB", (max(1, math.ceil(at_least[0])), max(1, math.ceil(at_least[1]))))
+    return _flatten(ImageOps.exif_transpose(img))
+
+
+def prepare(image_bytes: bytes) -> PreparedImage:
+    """Cropped, deskewed, tile-sized JPEG plus the detail level to ask for.
+
+    Everything is decided on a small copy; the image is then decoded again at (about) the output
+    resolution and cropped / rotated the same way, so a 12MP photo is never resampled at full size.
+    """
+    if _env("ATLUS_VISION_PREPROCESS", "1") in ("0", "false", "no", "off"):
+        return prepare_basic(image_bytes)
+
+    raw = Image.open(io.BytesIO(image_bytes))
+    raw_w, raw_h = raw.size  # stored orientation; scale factors below don't care about EXIF rotation
+    a = min(1.0, _ANALYSIS_SIDE / max(raw_w, raw_h))
+    small = _load(image_bytes, (raw_w * a, raw_h * a))
+    full_w, full_h = (raw_h, raw_w) if raw.getexif().get(0x0112) in (5, 6, 7, 8) else (raw_w, raw_h)  # EXIF rotation
+    if small.width != round(full_w * a):
+        s = round(full_w * a) / small.width
+        small = small.resize((max(1, round(small.width * s)), max(1, round(small.height * s))), Image.Resampling.BILINEAR)
+    a = small.width / full_w
+
+    paper = _paper_box(small.convert("L"))
+    if paper:
+        small = small.crop(paper)
+
+    angle = _skew_angle(_ink_mask(small.convert("L")))
+    rotated = small
+    page = (0, 0, small.width, small.height)
+    if angle:
+        rotated = small.rotate(angle, resample=Image.Resampling.BILINEAR, expand=True, fillcolor=(255, 255, 255))
+        page = (0, 0, rotated.width, rotated.height)
+        if paper:
+            # the sheet's bounding box still has desk in its corners; once upright the sheet is
+            # the centred pw x ph rectangle that box was wrapped around
+            c, s = math.cos(math.radians(angle)), abs(math.sin(math.radians(angle)))
+            w, h = small.size
+            pw, ph = (w * c - h * s) / (c * c - s * s), (h * c - w * s) / (c * c - s * s)
+            if pw > 0 and ph > 0:
+                inset = 0.01 * max(pw, ph)
+                cx, cy = rotated.width / 2, rotated.height / 2
+                page = (
+                    max(0, round(cx - pw / 2 + inset)),
+                    max(0, round(cy - ph / 2 + inset)),
+                    min(rotated.width, round(cx + pw / 2 - inset)),
+                    min(rotated.height, round(cy + ph / 2 - inset)),
+                )
+    mask = _ink_mask(rotated.crop(page).convert("L"))
+
+    ink = mask.getbbox() or (0, 0, mask.width, mask.height)
+    margin = int(0.02 * max(mask.size)) + 2
+    ink = (
+        page[0] + max(0, ink[0] - margin),
+        page[1] + max(0, ink[1] - margin),
+        page[0] + min(mask.width, ink[2] + margin),
+        page[1] + min(mask.height, ink[3] + margin),
+    )
+    content = rotated.crop(ink)
+
+    # keep the pixels-per-letter OpenAI used to see for the whole upload, but only for the content
+    # (cropping to a wide strip would otherwise let the 768px short-side rule *add* tiles)
+    keep = high_detail_size(full_w, full_h)[0] / full_w
+    want_w, want_h = content.width / a * keep, content.height / a * keep
+    slack = _env_float("ATLUS_VISION_TILE_SLACK", 0.12)
+    detail = _env("ATLUS_VISION_DETAIL", "auto")
+    if detail not in ("low", "high"):
+        # fits one 512px tile (give or take the slack) → low is a flat 85 tokens
+        detail = "low" if max(want_w, want_h) <= TILE * (1 + slack) else "high"
+    target = _target_size(want_w, want_h, detail, slack)
+
+    r = min(1.0, target[0] / (content.width / a) * 1.05)  # output scale vs. the original, a little headroom
+    img = _load(image_bytes, (raw_w * r, raw_h * r))
+    d = img.width / full_w
+    if paper:
+        img = img.crop(tuple(min(round(v * d / a), lim) for v, lim in zip(paper, img.size * 2)))
+    if d > r * 1.01:
+        img = img.resize((max(1, round(img.width * r / d)), max(1, round(img.height * r / d))), Image.Resampling.LANCZOS)
+    if angle:
+        img = img.rotate(angle, resample=Image.Resampling.BICUBIC, expand=True, fillcolor=(255, 255, 255))
+    k = img.width / rotated.width
+    img = img.crop(tuple(min(round(v * k), lim) for v, lim in zip(ink, img.size * 2)))
+    if img.size != target:
+        img = img.resize(target, Image.Resampling.LANCZOS)
+
+    grayscale = _env("ATLUS_VISION_GRAYSCALE", "auto")
+    if grayscale in ("1", "true", "yes") or (grayscale == "auto" and not _is_colourful(content)):
+        img = img.convert("L")
+
+    out = io.BytesIO()
+    quality = int(_env_float("OCR_JPEG_QUALITY", 85))
+    img.save(out, format="JPEG", quality=max(60, min(quality, 100)), optimize=True)
+    return PreparedImage(out.getvalue(), "image/jpeg", detail, img.width, img.height)
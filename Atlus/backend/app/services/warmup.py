@@ -0,0 +1,91 @@
+"""Load the heavy libraries ahead of the first request that needs them.
+
+create_app() only imports Flask, SQLAlchemy and the route modules; services import their SDKs on
+first use (openai + httpx ~0.5 s, PyPDF2 / python-docx / python-pptx ~0.1 s, easyocr + torch
+several seconds). Left at that, the first upload or chat after a deploy pays for all of it.
+init_app() does those imports on a daemon thread right after boot instead, while the server is
+already answering logins and note reads. run() does them inline; a preforking server calls it
+before the fork, so every worker starts with them loaded.
+
+WARMUP: background (default) | sync | off. easyocr (torch) is only warmed with WARMUP_EASYOCR,
+since it is the fallback OCR path and costs a few hundred MB per process.
+"""
+import importlib
+import logging
+import threading
+import time
+from typing import Dict
+
+log = logging.getLogger(__name__)
+
+# in the order a first upload / chat needs them
+MODULES = (
+    "app.services.openai_service",
+    "openai",
+    "httpx",
+    "app.services.ingestion_pipeline",
+    "PyPDF2",
+    "fitz",
+    "docx",
+    "pptx",
+    "PIL.Image",
+    "app.services.ocr_service",
+    "app.services.syllabus_pipeline",
+    "app.services.transcription",
+    "app.services.tts",
+)
+
+_lock = threading.Lock()
+_state: Dict = {"status": "idle", "seconds": {}}
+
+
+def status() -> Dict:
+    with _lock:
+        return {"status": _state["status"], "seconds": dict(_state["seconds"])}
+
+
+def run(easyocr: bool = False) -> Dict[str, float]:
+    """Import everything in MODULES (missing optional ones are skipped); returns seconds per module."""
+    with _lock:
+        if _state["status"] in ("running", "done"):
+            return dict(_state["seconds"])
+        _state["status"] = "running"
+    started = time.perf_counter()
+    names = MODULES + (("easyocr",) if easyocr else ())
+    for name in names:
+        t = time.perf_counter()
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        except Exception:
+            log.warning("warm-up import of %s failed", name, exc_info=True)
+            continue
+        with _lock:
+            _state["seconds"][name] = round(time.perf_counter() - t, 4)
+    if easyocr:
+        try:
+            from app.services.ocr_service import _get_reader
+
+            t = time.perf_counter()
+            _get_reader()
+            with _lock:
+                _state["seconds"]["easyocr.Reader"] = round(time.perf_counter() - t, 4)
+        except Exception:
+            log.warning("easyocr warm-up failed", exc_info=True)
+    with _lock:
+        _state["status"] = "done"
+        seconds = dict(_state["seconds"])
+    log.info("warm-up done in %.2fs", time.perf_counter() - started)
+    return seconds
+
+
+def init_app(app) -> None:
+    mode = (app.config.get("WARMUP") or "background").strip().lower()
+    easyocr = bool(app.config.get("WARMUP_EASYOCR"))
+    if mode in ("0", "off", "false", "no"):
+        return
+    if mode == "sync":
+        run(easyocr)
+        return
+    threading.Thread(target=run, args=(easyocr,), name="warmup", daemon=True).start()
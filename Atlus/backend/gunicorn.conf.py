@@ -0,0 +1,120 @@
+"""gunicorn settings. From backend/: gunicorn wsgi:app (gunicorn reads ./gunicorn.conf.py by default).
+
+ATLUS_SERVER_ROLE picks the profile; a split deployment runs one pool of each on its own ATLUS_BIND:
+
+    all     one pool serves everything (default; a single small box)
+    web     logins, notes, calendar, search, chat: many workers, short timeout
+    ingest  uploads and anything that runs minutes (extraction, OCR, transcription, TTS):
+            few workers, each fanning extraction out to INGEST_EXTRACT_PROCESSES processes,
+            long timeout and drain
+
+For the split, route the long paths to the ingest pool at the proxy, e.g. nginx:
+
+    location ~ ^/api/(brain/(create|ingest|ocr|syllabus|generate-nodes)|brain/[^/]+/ingest-jobs/resume|classes/syllabus|audio/|uploads) {
+        proxy_pass http://atlus_ingest;
+    }
+    location /api/ { proxy_pass http://atlus_web; }
+
+so a 300-page PDF never holds the workers that answer the sidebar.
+
+preload_app: the master builds the app once (schema migrations included) and imports the heavy
+libraries synchronously (services/warmup.run; easyocr's model too with ATLUS_WARMUP_EASYOCR=1)
+before forking. Workers share those pages copy-on-write and start in milliseconds. post_fork
+drops the database connections the master opened.
+
+SIGTERM: workers stop accepting, finish in-flight requests, and give ingestion jobs
+ATLUS_INGEST_DRAIN_SECONDS to finish. After that, jobs stop at their next checkpoint and can be
+resumed right away (services/background_jobs.py). graceful_timeout leaves CHECKPOINT_SECONDS more
+for that last batch before the master kills the worker.
+
+Sizes come from the CPU count; ATLUS_WORKERS / ATLUS_THREADS override them.
+"""
+import os
+import signal
+import time
+
+CHECKPOINT_SECONDS = 60  # one commit batch of LLM calls, worst case
+
+_cpu = os.cpu_count() or 1
+role = os.environ.get("ATLUS_SERVER_ROLE", "all").strip().lower()
+
+if role == "web":
+    # request time is mostly waiting on SQLite / OpenAI: more processes than cores, a few threads each
+    _workers, _threads, _timeout, _drain, _port = 2 * _cpu + 1, 4, 30, 10, 8000
+elif role == "ingest":
+    # each worker owns an extraction process pool, so keep them few and let those use the cores
+    _workers, _threads, _timeout, _drain, _port = max(1, min(4, _cpu // 2)), 4, 300, 120, 8001
+else:
+    role = "all"
+    _workers, _threads, _timeout, _drain, _port = _cpu + 1, 8, 300, 60, 8000
+
+workers = int(os.environ.get("ATLUS_WORKERS") or _workers)
+threads = int(os.environ.get("ATLUS_THREADS") or _threads)
+worker_class = "gthread"
+bind = os.environ.get("ATLUS_BIND") or f"0.0.0.0:{_port}"
+timeout = _timeout
+keepalive = 5
+drain_seconds = float(os.environ.get("ATLUS_INGEST_DRAIN_SECONDS") or _drain)
+graceful_timeout = int(drain_seconds + CHECKPOINT_SECONDS)
+preload_app = True
+accesslog = os.environ.get("ATLUS_ACCESS_LOG") or None
+
+# read by app.config when the app is preloaded below, so they must be set before it
+os.environ.setdefault("ATLUS_WARMUP", "sync")  # heavy imports in the master, before the fork
+if role == "web":
+    os.environ.setdefault("ATLUS_INGEST_EXTRACT_PROCESSES", "0")
+else:
+    os.environ.setdefault("ATLUS_INGEST_EXTRACT_PROCESSES", str(max(1, _cpu // workers)))
+
+_term_at = None
+
+
+def on_starting(server):
+    server.log.info(
+        "atlus %s pool: %d workers x %d threads, timeout %ss, drain %ss",
+        role, workers, threads, timeout, int(drain_seconds),
+    )
+
+
+def post_fork(server, worker):
+    from app.extensions import db
+
+    # the master's pooled connections (migrations, warm-up) must not be shared across processes
+    with server.app.wsgi().app_context():
+        db.engine.dispose(close=False)
+
+
+def post_worker_init(worker):
+    from app.services import background_jobs
+
+    gunicorn_handler = signal.getsignal(signal.SIGTERM)
+
+    def on_term(signum, frame):
+        global _term_at
+        if _term_at is None:
+            _term_at = time.monotonic()
+            background_jobs.begin_drain(drain_seconds)
+        gunicorn_handler(signum, frame)
+
+    signal.signal(signal.SIGTERM, on_term)
+    signal.siginterrupt(signal.SIGTERM, False)  # as gunicorn set it: don't break requests' syscalls
+
+
+def worker_int(worker):
+    # SIGINT / SIGQUIT: quick shutdown, jobs stop at their next checkpoint
+    from app.services import background_jobs
+
+    background_jobs.begin_drain(0)
+
+
+def worker_exit(server, worker):
+    global _term_at
+    from app.services import background_jobs
+
+    if _term_at is None:  # max_requests restart, or the worker is going down on its own
+        _term_at = time.monotonic()
+        background_jobs.begin_drain(drain_seconds)
+    left = graceful_timeout - (time.monotonic() - _term_at) - 2
+    if background_jobs.inflight():
+        server.log.info("worker %s: waiting up to %.0fs for %d ingestion job(s)", worker.pid, left, background_jobs.inflight())
+    background_jobs.drain(max(1.0, left))
@@ -0,0 +1,275 @@
+"""
+End-to-end ingestion benchmark: ingest_documents -> extraction / OCR -> chunking -> LLM metadata -> DB,
+against scripts/mock_openai_server.py instead of the real API (no spend, no key needed).
+Run from the backend directory: python scripts/bench_ingestion.py [--kinds pdf docx pptx image scanned]
+    [--pages 40] [--files 2] [--latency 0.3] [--jitter 0.1] [--error-rate 0.02]
+
+Fixtures are generated on the fly: text PDFs, DOCX, PPTX, handwriting-style PNGs, and image-only
+"scanned" PDFs (rasterize + vision OCR path). Each kind is one multi-file upload into a fresh brain
+in a temp SQLite DB (--database-uri for Postgres). Reports pages/s, chunks/s, p50/p95 per pipeline
+stage (the app's own stage_timing spans) and peak RSS (this process + extraction workers). --governor keeps the OpenAI rate governor on.
+"""
+import argparse
+import io
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+_backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _backend_dir not in sys.path:
+    sys.path.insert(0, _backend_dir)
+os.chdir(_backend_dir)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+WORDS = (
+    "recursion invariant amortized complexity heap graph traversal dynamic programming memoization "
+    "pointer allocation scheduler semaphore deadlock transaction isolation normalization index"
+).split()
+
+
+def _paragraph(seed, words=90):
+    return " ".join(WORDS[(seed * 7 + i * 3) % len(WORDS)] for i in range(words)).capitalize() + "."
+
+
+def make_pdf(pages):
+    import fitz
+
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        body = f"Chapter {p + 1} Topic {p}\n\n" + "\n".join(_paragraph(p * 5 + i, 9) for i in range(60))
+        page.insert_text((54, 60), body, fontsize=8)
+    return doc.tobytes()
+
+
+def make_scanned_pdf(pages):
+    """Image-only pages: no text layer, so ingestion has to rasterize and OCR."""
+    import fitz
+
+    src = fitz.open(stream=make_pdf(pages), filetype="pdf")
+    out = fitz.open()
+    for page in src:
+        pix = page.get_pixmap(matrix=fitz.Matrix(1.5, 1.5), alpha=False)
+        new = out.new_page(width=page.rect.width, height=page.rect.height)
+        new.insert_image(new.rect, stream=pix.tobytes("png"))
+    return out.tobytes()
+
+
+def make_docx(pages):
+    import docx
+
+    d = docx.Document()
+    for p in range(pages):
+        d.add_heading(f"Section {p + 1} Topic {p}", level=1)
+        for i in range(6):
+            d.add_paragraph(_paragraph(p * 6 + i))
+    buf = io.BytesIO()
+    d.save(buf)
+    return buf.getvalue()
+
+
+def make_pptx(pages):
+    from pptx import Presentation
+
+    prs = Presentation()
+    for p in range(pages):
+        slide = prs.slides.add_slide(prs.slide_layouts[1])
+        slide.shapes.title.text = f"Lecture {p + 1} Topic {p}"
+        slide.placeholders[1].text = "\n".join(_paragraph(p * 4 + i, 20) for i in range(4))
+    buf = io.BytesIO()
+    prs.save(buf)
+    return buf.getvalue()
+
+
+def make_image(pages):
+    from PIL import Image, ImageDraw
+
+    img = Image.new("RGB", (1700, 2200), "white")
+    draw = ImageDraw.Draw(img)
+    for i in range(40):
+        draw.text((80, 80 + i * 50), _paragraph(i, 12), fill="black")
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+FIXTURES = {
+    "pdf": ("pdf", make_pdf),
+    "docx": ("docx", make_docx),
+    "pptx": ("pptx", make_pptx),
+    "image": ("png", make_image),
+    "scanned": ("pdf", make_scanned_pdf),
+}
+
+
+def _vmrss_kb(pid="self"):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+class RssPeak:
+    """Samples VmRSS of this process and of live extraction workers (Linux /proc).
+
+    Elsewhere it falls back to ru_maxrss, which only covers this process.
+    """
+
+    def __init__(self, interval=0.02):
+        self.interval = interval
+        self.peak_kb = 0
+        self.workers_peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _sample(self):
+        own = _vmrss_kb()
+        if own is None:
+            rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            own = rss // 1024 if sys.platform == "darwin" else rss
+        workers = sum(_vmrss_kb(p.pid) or 0 for p in multiprocessing.active_children())
+        self.peak_kb = max(self.peak_kb, own)
+        self.workers_peak_kb = max(self.workers_peak_kb, workers)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def __enter__(self):
+        self._sample()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def warm_up(app):
+    """Start the extraction process pool so the first kind doesn't pay the spawn cost."""
+    from app.services import ingestion_pipeline
+
+    with app.app_context():
+        pool = ingestion_pipeline._get_extract_pool()
+        if pool is not None:
+            list(pool.map(ingestion_pipeline.extract_document_text, ["txt"] * pool._max_workers, [b""] * pool._max_workers))
+
+
+def run_kind(app, kind, files, pages):
+    from werkzeug.datastructures import FileStorage
+
+    from app.extensions import db
+    from app.models.brain import Brain, Node
+    from app.models.user import User
+    from app.services.ingestion_pipeline import ingest_documents
+    from app.services.stage_timing import collect
+
+    ext, make = FIXTURES[kind]
+    blobs = [make(pages) for _ in range(files)]
+    with app.app_context():
+        user = User.query.filter_by(email="bench@example.com").first()
+        brain_id = str(uuid.uuid4())
+        db.session.add(Brain(id=brain_id, name=f"bench {kind}", badge="Notes", user_id=user.id))
+        db.session.commit()
+        uploads = [
+            FileStorage(stream=io.BytesIO(b), filename=f"{kind}-{i}.{ext}") for i, b in enumerate(blobs)
+        ]
+        with RssPeak() as rss, collect() as timings:
+            start = time.perf_counter()
+            result = ingest_documents(brain_id, user.id, uploads)
+            elapsed = time.perf_counter() - start
+        chunks = Node.query.filter_by(brain_id=brain_id).count()
+
+    total_pages = files * (1 if kind == "image" else pages)
+    print(
+        f"\n{kind}: {files} file(s) x {1 if kind == 'image' else pages} page(s), "
+        f"{sum(len(b) for b in blobs) / 1024:.0f} KB  ->  {chunks} nodes in {elapsed:.2f}s"
+    )
+    print(
+        f"  {total_pages / elapsed:8.2f} pages/s   {chunks / elapsed:8.2f} chunks/s   "
+        f"peak RSS {rss.peak_kb / 1024:.0f} MB (+ extract workers {rss.workers_peak_kb / 1024:.0f} MB)"
+    )
+    samples = defaultdict(list)
+    for stage, seconds in timings.events():
+        samples[stage].append(seconds)
+    for stage, values in samples.items():
+        print(
+            f"  {stage:<14} n={len(values):<5} p50 {_pct(values, 50) * 1000:9.1f} ms   "
+            f"p95 {_pct(values, 95) * 1000:9.1f} ms   total {sum(values):8.2f}s"
+        )
+    if result.get("errors"):
+        print(f"  errors: {result['errors'][:3]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--kinds", nargs="+", default=list(FIXTURES), choices=list(FIXTURES))
+    parser.add_argument("--pages", type=int, default=40, help="pages / slides / sections per document")
+    parser.add_argument("--files", type=int, default=2, help="files per upload")
+    parser.add_argument("--latency", type=float, default=0.3, help="mock seconds per OpenAI call")
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of mock calls answered 503")
+    parser.add_argument("--base-url", default=None, help="use an already-running mock server")
+    parser.add_argument("--database-uri", default=None)
+    parser.add_argument("--governor", action="store_true", help="keep the OpenAI rate governor on")
+    args = parser.parse_args()
+
+    from mock_openai_server import point_backend_at, serve
+
+    server = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        server, base_url = serve(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate)
+    point_backend_at(base_url, governor=args.governor)
+
+    from app import create_app
+    from app.config import Config
+    from app.extensions import db
+    from app.models.user import User
+
+    workdir = tempfile.mkdtemp(prefix="atlus-ingest-bench-")
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = args.database_uri or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+        UPLOAD_FOLDER = os.path.join(workdir, "uploads")
+
+    app = create_app(BenchConfig)
+    with app.app_context():
+        if not User.query.filter_by(email="bench@example.com").first():
+            db.session.add(User(email="bench@example.com", role="user"))
+            db.session.commit()
+
+    print(
+        f"mock {base_url}  latency {args.latency}s +/-{args.jitter}  errors {args.error_rate:.0%}  "
+        f"db {BenchConfig.SQLALCHEMY_DATABASE_URI.split('@')[-1]}"
+    )
+    warm_up(app)
+    try:
+        for kind in args.kinds:
+            run_kind(app, kind, args.files, args.pages)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Concurrent OpenAI throughput: sync client on a thread per in-flight call vs. AsyncOpenAI tasks on the shared loop.
+Run from the backend directory: python scripts/bench_openai_async.py [--requests 400] [--concurrency 8 32 128]
+Starts scripts/mock_openai_server.py in-process (--latency seconds per call) unless --base-url is given,
+and turns the rate governor off so only the client path is measured. Never touches the real API.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+_backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _backend_dir not in sys.path:
+    sys.path.insert(0, _backend_dir)
+os.chdir(_backend_dir)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+MESSAGES = [
+    {"role": "system", "content": "You extract structure from a chunk of textbook content."},
+    {"role": "user", "content": "Section: Recursion\n\nA recursive function calls itself on a smaller input."},
+]
+
+
+def _pct(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def _client_threads():
+    # leave out the in-process mock server's per-connection handler threads
+    return sum(1 for t in threading.enumerate() if "process_request_thread" not in t.name)
+
+
+class _ThreadPeak:
+    def __init__(self):
+        self.peak = _client_threads()
+        self._stop = threading.Event()
+        self._t = threading.Thread(target=self._watch, daemon=True)
+
+    def _watch(self):
+        while not self._stop.wait(0.01):
+            self.peak = max(self.peak, _client_threads())
+
+    def __enter__(self):
+        self._t.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._t.join()
+
+
+def bench_sync(n, concurrency):
+    from app.services import openai_service
+
+    os.environ["ATLUS_OPENAI_ASYNC"] = "0"
+    latencies = []
+
+    def one(_):
+        t0 = time.perf_counter()
+        openai_service._chat(model="gpt-4o-mini", messages=MESSAGES, temperature=0.3)
+        latencies.append(time.perf_counter() - t0)
+
+    with _ThreadPeak() as peak:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(one, range(n)))
+        elapsed = time.perf_counter() - start
+    return elapsed, latencies, peak.peak
+
+
+def bench_async(n, concurrency):
+    from app.services import openai_async, openai_service
+
+    os.environ["ATLUS_OPENAI_ASYNC"] = "1"
+    latencies = []
+
+    async def fan_out():
+        sem = asyncio.Semaphore(concurrency)
+
+        async def one():
+            async with sem:
+                t0 = time.perf_counter()
+                await openai_service._achat(model="gpt-4o-mini", messages=MESSAGES, temperature=0.3)
+                latencies.append(time.perf_counter() - t0)
+
+        await asyncio.gather(*(one() for _ in range(n)))
+
+    with _ThreadPeak() as peak:
+        start = time.perf_counter()
+        openai_async.run(fan_out())
+        elapsed = time.perf_counter() - start
+    return elapsed, latencies, peak.peak
+
+
+def _report(label, n, elapsed, latencies, threads):
+    print(
+        f"  {label:<8} {n / elapsed:>8.1f} req/s   p50 {_pct(latencies, 50) * 1000:>7.1f} ms"
+        f"   p95 {_pct(latencies, 95) * 1000:>7.1f} ms   peak threads {threads}"
+    )
+    return n / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[8, 32, 128])
+    parser.add_argument("--latency", type=float, default=0.2, help="mock server seconds per call")
+    parser.add_argument("--pool-size", type=int, default=None, help="ATLUS_OPENAI_POOL_SIZE for both clients")
+    parser.add_argument("--base-url", default=None, help="use an already-running mock instead of starting one")
+    args = parser.parse_args()
+
+    from mock_openai_server import point_backend_at, serve
+
+    server = None
+    if args.base_url:
+        base_url = args.base_url
+    else:
+        server, base_url = serve(latency=args.latency)
+    point_backend_at(base_url)
+    os.environ["ATLUS_OPENAI_POOL_SIZE"] = str(args.pool_size or max(args.concurrency))
+
+    print(f"mock at {base_url}, {args.requests} chat calls per run, pool {os.environ['ATLUS_OPENAI_POOL_SIZE']}")
+    try:
+        for c in args.concurrency:
+            print(f"\nconcurrency {c}")
+            sync_rate = _report("sync", args.requests, *bench_sync(args.requests, c))
+            async_rate = _report("async", args.requests, *bench_async(args.requests, c))
+            print(f"  -> async x{async_rate / sync_rate:.2f}")
+    finally:
+        if server is not None:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Read-endpoint load test: requests/sec and latency for the JSON reads the UI polls, served by the
+Flask dev server (run.py) and by gunicorn (gunicorn.conf.py, web profile).
+Run from the backend directory: python scripts/bench_read_endpoints.py [--server both] [--clients 16] [--seconds 10]
+
+Each server starts on a free port against a throwaway SQLite database, seeded through the API
+with one account, --brains classes, --notes notes each and a few deadlines. Then --clients
+threads, each with its own keep-alive session, hit READS in turn for --seconds. No OpenAI key is
+needed: none of the read endpoints call the model.
+--etag also sends If-None-Match, the way the frontend polls, so unchanged reads answer 304.
+--url skips starting a server and loads an existing deployment (--email / --password must log in there).
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+_backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _backend_dir not in sys.path:
+    sys.path.insert(0, _backend_dir)
+os.chdir(_backend_dir)
+
+import requests
+
+# path templates; {brain} / {node} are filled from the seeded data
+READS = (
+    "/api/brain/list",
+    "/api/brain/{brain}/nodes",
+    "/api/me/notes",
+    "/api/me/summary",
+    "/api/classes",
+    "/api/calendar-events",
+    "/api/brain/{brain}/calendar-events",
+    "/api/nodes/{node}",
+    "/api/brain/search?q=photosynthesis",
+)
+
+_DEV_SERVER = "from app import create_app; create_app().run(host='127.0.0.1', port={port}, threaded=True)"
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind: str, db_dir: str):
+    port = _free_port()
+    env = dict(os.environ)
+    env.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{os.path.join(db_dir, f'bench_{kind}.db')}",
+        ATLUS_UPLOAD_FOLDER=os.path.join(db_dir, f"uploads_{kind}"),
+        ATLUS_SERVER_ROLE="web",
+        ATLUS_BIND=f"127.0.0.1:{port}",
+        OPENAI_API_KEY="",
+    )
+    if kind == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "wsgi:app"]
+    else:
+        cmd = [sys.executable, "-c", _DEV_SERVER.format(port=port)]
+    proc = subprocess.Popen(cmd, cwd=_backend_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"{kind} server exited with {proc.returncode}")
+        try:
+            requests.get(url + "/api/health", timeout=1)
+            return proc, url
+        except requests.ConnectionError:
+            time.sleep(0.2)
+    proc.kill()
+    raise SystemExit(f"{kind} server did not come up")
+
+
+def stop_server(proc) -> None:
+    proc.terminate()
+    try:
+        proc.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def seed(url: str, email: str, password: str, brains: int, notes: int) -> dict:
+    """Account + classes + notes + deadlines through the API; returns auth header and ids for READS."""
+    s = requests.Session()
+    s.post(url + "/api/register", json={"email": email, "password": password})
+    r = s.post(url + "/api/login", json={"email": email, "password": password})
+    r.raise_for_status()
+    headers = {"Authorization": f"Bearer {r.json()['access_token']}"}
+    brain_ids, node_ids = [], []
+    existing = s.get(url + "/api/brain/list", headers=headers).json().get("brains") or []
+    for b in existing[:brains]:
+        brain_ids.append(b["id"])
+    while len(brain_ids) < brains:
+        r = s.post(url + "/api/brain/create", data={"name": f"Class {len(brain_ids) + 1}"}, headers=headers)
+        r.raise_for_status()
+        brain_ids.append(r.json()["brain"]["id"])
+        bid = brain_ids[-1]
+        for i in range(notes):
+            body = f"Lecture {i}: photosynthesis, cellular respiration and the Krebs cycle. " * 20
+            r = s.post(url + f"/api/brain/{bid}/nodes", json={"title": f"Note {i}", "markdown_content": body}, headers=headers)
+            r.raise_for_status()
+            node_ids.append(r.json()["id"])
+        for i in range(5):
+            s.post(
+                url + f"/api/brain/{bid}/calendar-events",
+                json={"title": f"Quiz {i}", "event_type": "quiz", "due_at": f"2026-11-{10 + i}T09:00:00"},
+                headers=headers,
+            )
+    if not node_ids:
+        nodes = s.get(url + f"/api/brain/{brain_ids[0]}/nodes", headers=headers).json().get("nodes") or []
+        node_ids = [n["id"] for n in nodes]
+    return {"headers": headers, "brain": brain_ids[0], "node": node_ids[0] if node_ids else ""}
+
+
+def _pct(values, p):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def load(url: str, ctx: dict, clients: int, seconds: float, etag: bool):
+    paths = [p.format(brain=ctx["brain"], node=ctx["node"]) for p in READS]
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    not_modified = defaultdict(int)
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + seconds
+
+    def client(offset: int):
+        session = requests.Session()
+        tags = {}
+        i = offset
+        mine, bad, cached = defaultdict(list), defaultdict(int), defaultdict(int)
+        while time.perf_counter() < stop_at:
+            path = paths[i % len(paths)]
+            i += 1
+            headers = dict(ctx["headers"])
+            if etag and path in tags:
+                headers["If-None-Match"] = tags[path]
+            t = time.perf_counter()
+            try:
+                r = session.get(url + path, headers=headers, timeout=30)
+                r.content
+            except requests.RequestException:
+                bad[path] += 1
+                continue
+            mine[path].append(time.perf_counter() - t)
+            if r.status_code == 304:
+                cached[path] += 1
+            elif r.status_code != 200:
+                bad[path] += 1
+            elif r.headers.get("ETag"):
+                tags[path] = r.headers["ETag"]
+        with lock:
+            for k, v in mine.items():
+                latencies[k].extend(v)
+            for k, v in bad.items():
+                errors[k] += v
+            for k, v in cached.items():
+                not_modified[k] += v
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    total = sum(len(v) for v in latencies.values())
+    for path, label in zip(paths, READS):
+        lat = latencies[path]
+        extra = f"   304 {not_modified[path]}" if etag else ""
+        print(
+            f"  {label:<44} {len(lat) / elapsed:>8.1f} req/s   p50 {_pct(lat, 50) * 1000:>7.1f} ms"
+            f"   p95 {_pct(lat, 95) * 1000:>7.1f} ms   errors {errors[path]}{extra}"
+        )
+    every = [x for v in latencies.values() for x in v]
+    print(
+        f"  {'all':<44} {total / elapsed:>8.1f} req/s   p50 {_pct(every, 50) * 1000:>7.1f} ms"
+        f"   p95 {_pct(every, 95) * 1000:>7.1f} ms   errors {sum(errors.values())}"
+    )
+    return total / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--server", choices=("dev", "gunicorn", "both"), default="both")
+    parser.add_argument("--url", default=None, help="load an already-running server instead")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--brains", type=int, default=3)
+    parser.add_argument("--notes", type=int, default=40, help="notes per class")
+    parser.add_argument("--etag", action="store_true", help="send If-None-Match like the frontend's polling")
+    parser.add_argument("--email", default="loadtest@example.com")
+    parser.add_argument("--password", default="loadtest-password")
+    args = parser.parse_args()
+
+    if args.url:
+        ctx = seed(args.url, args.email, args.password, args.brains, args.notes)
+        print(f"{args.url}: {args.clients} clients, {args.seconds:.0f}s")
+        load(args.url, ctx, args.clients, args.seconds, args.etag)
+        return
+
+    kinds = ("dev", "gunicorn") if args.server == "both" else (args.server,)
+    rates = {}
+    with tempfile.TemporaryDirectory() as db_dir:
+        for kind in kinds:
+            proc, url = start_server(kind, db_dir)
+            try:
+                ctx = seed(url, args.email, args.password, args.brains, args.notes)
+                print(f"\n{kind} ({url}): {args.clients} clients, {args.seconds:.0f}s, {os.cpu_count()} CPUs")
+                rates[kind] = load(url, ctx, args.clients, args.seconds, args.etag)
+            finally:
+                stop_server(proc)
+    if len(rates) == 2:
+        print(f"\n-> gunicorn x{rates['gunicorn'] / rates['dev']:.2f} the dev server's requests/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Cold-start benchmark: how long `from app import create_app; create_app()` takes in a fresh
+interpreter, which modules it spends that on, and whether any heavy library slipped back into the
+startup path.
+Run from the backend directory: python scripts/bench_startup.py [--runs 5] [--budget-ms 900] [--warmup]
+
+Each run is a new `python -X importtime` process with ATLUS_WARMUP=off and a throwaway SQLite
+database, so the figure is imports + create_app() (schema migrations, blueprints) and nothing
+else. The importtime log gives the per-package split (self time, summed per root package).
+Fails (exit 1) if the median wall time is over --budget-ms or if any module in HEAVY is in
+sys.modules once create_app() returns: those load on first use or in services/warmup.py.
+--warmup also times warmup.run() in the same process (what the background thread costs, per module).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+_backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _backend_dir not in sys.path:
+    sys.path.insert(0, _backend_dir)
+os.chdir(_backend_dir)
+
+# must not be imported by create_app(); each costs 50 ms to several seconds
+HEAVY = (
+    "openai",
+    "httpx",
+    "easyocr",
+    "torch",
+    "pinecone",
+    "PyPDF2",
+    "fitz",
+    "docx",
+    "pptx",
+    "PIL",
+    "numpy",
+    "google.auth.transport.requests",
+    "google_auth_oauthlib",
+)
+
+_CHILD = """
+import json, sys, time
+t = time.perf_counter()
+from app import create_app
+create_app()
+wall = time.perf_counter() - t
+sys.stderr.write("BENCH-STARTED\\n")
+sys.stderr.flush()
+out = {"wall": wall, "heavy": [m for m in HEAVY if m in sys.modules]}
+if WARMUP:
+    from app.services import warmup
+    t = time.perf_counter()
+    out["warmup"] = warmup.run()
+    out["warmup_wall"] = time.perf_counter() - t
+print("BENCH " + json.dumps(out))
+"""
+
+
+def parse_importtime(stderr: str):
+    """importtime lines up to create_app() returning -> {package: seconds}.
+
+    Self time summed per root package (sqlalchemy.orm.* counts as sqlalchemy), so a package pulled
+    in deep under app.* is still charged to itself and not to whoever imported it first.
+    """
+    totals = defaultdict(float)
+    for line in stderr.splitlines():
+        if line == "BENCH-STARTED":
+            break  # the rest is --warmup
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        if not own.strip().isdigit():
+            continue  # header row
+        totals[name.strip().split(".")[0]] += int(own) / 1e6
+    return dict(totals)
+
+
+def run_once(db_dir: str, warmup: bool):
+    env = dict(os.environ)
+    env["ATLUS_WARMUP"] = "off"
+    env["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(db_dir, 'bench_startup.db')}"
+    code = f"HEAVY = {HEAVY!r}\nWARMUP = {warmup!r}\n" + _CHILD
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=_backend_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    result = next((line[6:] for line in proc.stdout.splitlines() if line.startswith("BENCH ")), None)
+    if proc.returncode != 0 or result is None:
+        sys.stderr.write(proc.stderr[-4000:])
+        raise SystemExit(f"create_app() failed (exit {proc.returncode})")
+    return json.loads(result), parse_importtime(proc.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=900, help="median create_app() cold start allowed")
+    parser.add_argument("--top", type=int, default=12, help="packages to list by import time")
+    parser.add_argument("--warmup", action="store_true", help="also time warmup.run() after create_app()")
+    args = parser.parse_args()
+
+    walls = []
+    modules = defaultdict(list)
+    heavy = set()
+    warmups = []
+    with tempfile.TemporaryDirectory() as db_dir:
+        for i in range(args.runs):
+            # the first run creates the schema; later ones see an existing database, like a restart
+            out, imports = run_once(db_dir, args.warmup)
+            walls.append(out["wall"])
+            heavy.update(out["heavy"])
+            for name, seconds in imports.items():
+                modules[name].append(seconds)
+            if args.warmup:
+                warmups.append(out)
+            print(f"  run {i + 1}: {out['wall'] * 1000:7.1f} ms")
+
+    median = statistics.median(walls)
+    print(f"\ncreate_app() cold start: median {median * 1000:.1f} ms, min {min(walls) * 1000:.1f} ms, budget {args.budget_ms:.0f} ms")
+    print(f"\ntop {args.top} packages by import time (median self time)")
+    ranked = sorted(((statistics.median(v), k) for k, v in modules.items()), reverse=True)
+    for seconds, name in ranked[: args.top]:
+        print(f"  {seconds * 1000:8.1f} ms  {name}")
+
+    if warmups:
+        print(f"\nwarmup.run(): median {statistics.median(w['warmup_wall'] for w in warmups) * 1000:.1f} ms")
+        for name in warmups[-1]["warmup"]:
+            print(f"  {statistics.median(w['warmup'].get(name, 0) for w in warmups) * 1000:8.1f} ms  {name}")
+
+    failed = False
+    if heavy:
+        print(f"\nFAIL: imported during create_app(): {', '.join(sorted(heavy))}")
+        failed = True
+    if median * 1000 > args.budget_ms:
+        print(f"\nFAIL: cold start {median * 1000:.1f} ms over the {args.budget_ms:.0f} ms budget")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("\nOK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+Syllabus fast-path benchmark: accuracy and latency of the rule parser on a fixture set, and which
+documents it would still send to the model.
+Run from the backend directory: python scripts/bench_syllabus_rules.py [--llm] [--repeat 20]
+
+Fixtures are small syllabi written the ways real ones are (numeric dates, weekday + month names,
+DOCX schedule tables, "Week N" rows against a term start, PDF column text, a spring term crossing
+the new year, prose with no dates). Each fixture lists the deadlines and profile fields a person
+would pull out. Events are matched on (event_type, due date); profile fields are matched
+case-insensitively.
+--llm also runs extract_calendar_events / extract_syllabus_profile (OPENAI_API_KEY or
+OPENAI_BASE_URL, e.g. scripts/mock_openai_server.py) for a side-by-side latency / accuracy figure.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import date
+
+_backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _backend_dir not in sys.path:
+    sys.path.insert(0, _backend_dir)
+os.chdir(_backend_dir)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+TODAY = date(2026, 8, 1)
+
+FIXTURES = [
+    {
+        "name": "numeric_dates",
+        "text": """CPSC 491 - Senior Capstone Project
+Section 02, Fall 2026
+Instructor: Dr. Jane Smith (jsmith@school.edu)
+Meets: MW 9:00 AM - 10:15 AM, Room CS-201
+Office hours: Tue 2:00 PM - 4:00 PM
+
+Grading: Quizzes 20%, Midterm 25%, Project 35%, Final 20%
+
+Important dates
+- Quiz 1 09/11/2026
+- Project proposal due 09/25/2026
+- Midterm exam 10/14/2026
+- Quiz 2 10/30/2026
+- Final project demo 12/02/2026
+- Final exam 12/09/2026 8:00 AM
+""",
+        "events": [("quiz", "2026-09-11"), ("project", "2026-09-25"), ("midterm", "2026-10-14"),
+                   ("quiz", "2026-10-30"), ("project", "2026-12-02"), ("final", "2026-12-09")],
+        "profile": {"class_number": "CPSC 491", "term": "Fall 2026", "professor": "Dr. Jane Smith",
+                    "meeting_days": "Monday/Wednesday", "meeting_time": "9:00 AM - 10:15 AM", "section": "02"},
+        "escalate": False,
+    },
+    {
+        "name": "month_names",
+        "text": """BIOL 210: Cell Biology — Fall 2026
+Professor: Alan Reyes
+Lectures Tuesday and Thursday, 1:00 - 2:15 PM in Science Hall 104
+Office Hours: Wednesdays 10-11 AM
+
+Exams and deadlines
+Midterm 1 — Tuesday, September 29
+Lab report 1 due Friday, October 9 by 11:59 PM
+Midterm 2 — Thursday, October 29
+Research paper due Monday, November 23
+Final Exam: Thursday, December 10, 10:00 AM
+""",
+        "events": [("midterm", "2026-09-29"), ("assignment", "2026-10-09"), ("midterm", "2026-10-29"),
+                   ("assignment", "2026-11-23"), ("final", "2026-12-10")],
+        "profile": {"class_number": "BIOL 210", "term": "Fall 2026", "professor": "Alan Reyes",
+                    "meeting_days": "Tuesday/Thursday", "meeting_time": "1:00 PM - 2:15 PM"},
+        "escalate": False,
+    },
+    {
+        "name": "docx_table",
+        "text": """MATH 150A Calculus I
+Spring 2027
+Instructor: Prof. Lee
+Class meets TR 10:30 AM - 11:45 AM
+
+Week | Date | Topic | Due
+Week 1 | Jan 19 | Limits |
+Week 3 | Feb 2 | Derivatives | Quiz 1
+Week 5 | Feb 16 | Chain rule | HW 2
+Week 8 | Mar 9 | Review | Midterm
+Week 12 | Apr 13 | Integrals | Quiz 2
+Week 16 | May 11 | Review | Final exam
+""",
+        "events": [("quiz", "2027-02-02"), ("assignment", "2027-02-16"), ("midterm", "2027-03-09"),
+                   ("quiz", "2027-04-13"), ("final", "2027-05-11")],
+        "profile": {"class_number": "MATH 150A", "term": "Spring 2027", "professor": "Prof. Lee",
+                    "meeting_days": "Tuesday/Thursday", "meeting_time": "10:30 AM - 11:45 AM"},
+        "escalate": False,
+    },
+    {
+        "name": "week_relative",
+        "text": """HIST 101 World History
+Fall 2026, Section 5
+Instructor: Maria Gomez
+Class meets Monday/Wednesday 2:30 PM - 3:45 PM
+Classes begin Monday, August 24, 2026.
+
+Schedule
+Week 3: Quiz 1 on chapters 1-3
+Week 6: Essay 1 due
+Week 8: Midterm exam
+Week 12: Essay 2 due
+Week 15: Final exam
+""",
+        "events": [("quiz", "2026-09-07"), ("assignment", "2026-09-28"), ("midterm", "2026-10-12"),
+                   ("assignment", "2026-11-09"), ("final", "2026-11-30")],
+        "profile": {"class_number": "HIST 101", "term": "Fall 2026", "professor": "Maria Gomez",
+                    "meeting_days": "Monday/Wednesday", "meeting_time": "2:30 PM - 3:45 PM", "section": "5"},
+        "escalate": False,
+    },
+    {
+        "name": "pdf_columns",
+        "text": """ECON 201       Principles of Microeconomics       Fall 2026
+Lecturer: Dr. Priya Natarajan            Office: Econ 310
+Time: MWF 11:00 AM - 11:50 AM            Location: Econ Hall 120
+
+Assessment            Date                 Weight
+Problem Set 1         Fri 9/18             5%
+Quiz 1                Mon 9/28             5%
+Problem Set 2         Fri 10/16            5%
+Midterm               Wed 10/21            25%
+Problem Set 3         Fri 11/13            5%
+Final Examination     Mon 12/14            30%
+""",
+        "events": [("assignment", "2026-09-18"), ("quiz", "2026-09-28"), ("assignment", "2026-10-16"),
+                   ("midterm", "2026-10-21"), ("assignment", "2026-11-13"), ("final", "2026-12-14")],
+        "profile": {"class_number": "ECON 201", "term": "Fall 2026", "professor": "Dr. Priya Natarajan",
+                    "meeting_days": "Monday/Wednesday/Friday", "meeting_time": "11:00 AM - 11:50 AM"},
+        "escalate": False,
+    },
+    {
+        "name": "winter_cross_year",
+        "text": """PHYS 240 Modern Physics, Winter 2027
+Instructor: Sam Okafor
+Lecture: Tu/Th 4:00 PM - 5:20 PM
+
+Key dates
+Problem set 1 due Dec 18 (before break)
+Quiz 1 Jan 12
+Midterm Feb 4
+Final exam March 16
+""",
+        "events": [("assignment", "2026-12-18"), ("quiz", "2027-01-12"), ("midterm", "2027-02-04"),
+                   ("final", "2027-03-16")],
+        "profile": {"class_number": "PHYS 240", "term": "Winter 2027", "professor": "Sam Okafor",
+                    "meeting_days": "Tuesday/Thursday", "meeting_time": "4:00 PM - 5:20 PM"},
+        "escalate": False,
+    },
+    {
+        "name": "prose_no_dates",
+        "text": """Introduction to Philosophy
+This seminar meets weekly. There will be a midterm around the middle of the term and a final
+paper due at the end of the semester; exact dates are announced in class on Tuesday. Short
+reading responses are due most weeks. Quizzes may be given without notice.
+""",
+        "events": [],
+        "profile": {},
+        "escalate": True,
+    },
+]
+
+
+def _event_set(events):
+    return {(e["event_type"], e["due_at"].date().isoformat()) for e in events}
+
+
+def _score_events(got, want):
+    got, want = _event_set(got), set(want)
+    hit = len(got & want)
+    return hit, len(got), len(want)
+
+
+def _score_profile(got, want):
+    ok = sum(1 for k, v in want.items() if (got.get(k) or "").strip().lower() == v.lower())
+    return ok, len(want)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--llm", action="store_true", help="also time the model extractors")
+    parser.add_argument("--threshold", type=float, default=0.75, help="confidence needed to skip the model")
+    parser.add_argument("-v", "--verbose", action="store_true", help="print what was extracted")
+    args = parser.parse_args()
+
+    from app.services import syllabus_rules
+
+    header = f"{'fixture':<18} {'events':>7} {'prec':>5} {'recall':>6} {'profile':>8} {'ev conf':>7} {'pr conf':>7} {'model?':>6} {'ms':>6}"
+    print(header)
+    print("-" * len(header))
+    tot = {"hit": 0, "got": 0, "want": 0, "pok": 0, "pn": 0, "right_call": 0}
+    times = []
+    for fx in FIXTURES:
+        runs = []
+        for _ in range(args.repeat):
+            t = time.perf_counter()
+            parsed = syllabus_rules.parse(fx["text"], today=TODAY)
+            runs.append(time.perf_counter() - t)
+        ms = statistics.median(runs) * 1000
+        times.append(ms)
+        hit, got, want = _score_events(parsed.events, fx["events"])
+        pok, pn = _score_profile(parsed.profile, fx["profile"])
+        escalate = parsed.events_confidence < args.threshold or parsed.profile_confidence < args.threshold
+        tot["hit"] += hit
+        tot["got"] += got
+        tot["want"] += want
+        tot["pok"] += pok
+        tot["pn"] += pn
+        tot["right_call"] += escalate == fx["escalate"]
+        prec = f"{hit / got:.2f}" if got else "-"
+        rec = f"{hit / want:.2f}" if want else "-"
+        print(
+            f"{fx['name']:<18} {got:>3}/{want:<3} {prec:>5} {rec:>6} {pok:>4}/{pn:<3} "
+            f"{parsed.events_confidence:>7.2f} {parsed.profile_confidence:>7.2f} {'yes' if escalate else 'no':>6} {ms:>6.2f}"
+        )
+        if args.verbose:
+            for e in parsed.events:
+                print(f"    {e['event_type']:<10} {e['due_at']:%Y-%m-%d %H:%M}  {e['confidence']:.2f}  {e['title']}")
+            print(f"    {parsed.profile}")
+    print()
+    print(
+        f"events   precision {tot['hit'] / max(tot['got'], 1):.2f}  recall {tot['hit'] / max(tot['want'], 1):.2f}   "
+        f"profile fields {tot['pok']}/{tot['pn']}   model-call decision right on {tot['right_call']}/{len(FIXTURES)}"
+    )
+    print(f"rules    median {statistics.median(times):.2f} ms / syllabus")
+
+    if args.llm:
+        from app.services.openai_service import _has_openai
+        from app.services.syllabus_calendar import extract_calendar_events
+        from app.services.syllabus_profile import extract_syllabus_profile
+
+        if not _has_openai():
+            print("--llm: no OPENAI_API_KEY, skipping")
+            return
+        hit = got = want = pok = pn = 0
+        llm_times = []
+        for fx in FIXTURES:
+            t = time.perf_counter()
+            events = extract_calendar_events(fx["text"])
+            profile = extract_syllabus_profile(fx["text"])
+            llm_times.append((time.perf_counter() - t) * 1000)
+            h, g, w = _score_events(events, fx["events"])
+            hit, got, want = hit + h, got + g, want + w
+            o, n = _score_profile(profile, fx["profile"])
+            pok, pn = pok + o, pn + n
+        print(
+            f"model    precision {hit / max(got, 1):.2f}  recall {hit / max(want, 1):.2f}   profile fields {pok}/{pn}   "
+            f"median {statistics.median(llm_times):.0f} ms / syllabus (2 calls)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Vision OCR preprocessing benchmark: bytes uploaded and image tokens billed per page, old path vs. adaptive.
+Run from the backend directory: python scripts/bench_vision_preprocess.py [page.jpg ...] [--repeat 3]
+With no files, synthetic pages are generated (phone photo on a desk, tilted scan, half-filled page,
+sticky note, small snippet, colour diagram). Tokens use OpenAI's gpt-4o tile formula, i.e. what the vision call is billed
+for the image; no API calls are made.
+"""
+import argparse
+import base64
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+_backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _backend_dir not in sys.path:
+    sys.path.insert(0, _backend_dir)
+os.chdir(_backend_dir)
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from PIL import Image, ImageDraw, ImageFont
+
+WORDS = "the mitochondria derivative integral vector entropy osmosis theorem proof lemma matrix".split()
+
+
+def _page(w, h, lines, font_size, ink=(30, 30, 60), paper=(250, 248, 240), seed=0):
+    rnd = random.Random(seed)
+    img = Image.new("RGB", (w, h), paper)
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.load_default(size=font_size)
+    y = int(h * 0.08)
+    for _ in range(lines):
+        text = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(4, 9)))
+        draw.text((int(w * 0.08) + rnd.randint(0, 20), y), text, fill=ink, font=font)
+        y += int(font_size * 1.8)
+        if y > h * 0.9:
+            break
+    return img
+
+
+def _jpeg(img, quality=92):
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=quality)
+    return out.getvalue()
+
+
+def make_phone_photo():
+    """12MP photo: page covering the middle of a dark desk, rotated a few degrees."""
+    page = _page(2200, 2900, 30, 56, seed=1).rotate(3, expand=True, fillcolor=(70, 55, 45))
+    desk = Image.new("RGB", (4032, 3024), (70, 55, 45)).rotate(0)
+    desk = desk.resize((3024, 4032))
+    desk.paste(page, ((3024 - page.width) // 2, (4032 - page.height) // 2))
+    return _jpeg(desk)
+
+
+def make_tilted_scan():
+    """300dpi letter scan, lots of white margin, 2 degrees off."""
+    page = _page(2550, 3300, 22, 48, paper=(255, 255, 255), seed=2)
+    return _jpeg(page.rotate(-2, expand=False, fillcolor=(255, 255, 255)))
+
+
+def make_half_page():
+    """Notebook page with notes on the top third only."""
+    return _jpeg(_page(2550, 3300, 8, 52, seed=5))
+
+
+def make_sticky_note():
+    """Square phone shot of a sticky note with three lines on it."""
+    return _jpeg(_page(1500, 1500, 3, 44, paper=(250, 240, 150), seed=6))
+
+
+def make_snippet():
+    """A couple of lines cropped out of a page (screenshot-sized)."""
+    return _jpeg(_page(700, 260, 3, 28, seed=3))
+
+
+def make_colour_diagram():
+    img = _page(1600, 1200, 6, 40, seed=4)
+    draw = ImageDraw.Draw(img)
+    draw.ellipse((300, 600, 800, 1000), outline=(220, 30, 30), width=10)
+    draw.rectangle((900, 600, 1400, 1000), outline=(30, 120, 220), width=10)
+    draw.line((800, 800, 900, 800), fill=(30, 160, 60), width=10)
+    return _jpeg(img)
+
+
+FIXTURES = {
+    "phone_photo": make_phone_photo,
+    "tilted_scan": make_tilted_scan,
+    "half_page": make_half_page,
+    "sticky_note": make_sticky_note,
+    "snippet": make_snippet,
+    "colour_diagram": make_colour_diagram,
+}
+
+
+def measure(fn, data, repeat):
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        prepared = fn(data)
+        times.append(time.perf_counter() - t)
+    return {
+        "bytes": len(base64.standard_b64encode(prepared.data)),
+        "tokens": prepared.tokens,
+        "size": f"{prepared.width}x{prepared.height}",
+        "detail": prepared.detail,
+        "mode": Image.open(io.BytesIO(prepared.data)).mode,
+        "ms": statistics.median(times) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("files", nargs="*", help="page images to use instead of the synthetic ones")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    from app.services.vision_preprocess import prepare, prepare_basic
+
+    if args.files:
+        pages = {os.path.basename(p): open(p, "rb").read() for p in args.files}
+    else:
+        pages = {name: make() for name, make in FIXTURES.items()}
+
+    header = f"{'page':<16} {'path':<9} {'size':>10} {'mode':>4} {'detail':>6} {'b64 KB':>8} {'tokens':>6} {'prep ms':>8}"
+    print(header)
+    print("-" * len(header))
+    totals = {"basic": [0, 0], "adaptive": [0, 0]}
+    for name, data in pages.items():
+        for label, fn in (("basic", prepare_basic), ("adaptive", prepare)):
+            r = measure(fn, data, args.repeat)
+            totals[label][0] += r["bytes"]
+            totals[label][1] += r["tokens"]
+            print(
+                f"{name:<16} {label:<9} {r['size']:>10} {r['mode']:>4} {r['detail']:>6} "
+                f"{r['bytes'] / 1024:>8.0f} {r['tokens']:>6} {r['ms']:>8.1f}"
+            )
+    n = len(pages)
+    (bb, bt), (ab, at) = totals["basic"], totals["adaptive"]
+    print()
+    print(f"per page   basic: {bb / n / 1024:.0f} KB, {bt / n:.0f} tokens   adaptive: {ab / n / 1024:.0f} KB, {at / n:.0f} tokens")
+    print(f"saved      {100 * (1 - ab / bb):.0f}% bytes, {100 * (1 - at / bt):.0f}% image tokens")
+
+
+if __name__ == "__main__":
+    main()
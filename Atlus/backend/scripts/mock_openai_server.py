@@ -0,0 +1,205 @@
+"""
+Local stand-in for the OpenAI endpoints the backend uses, for benchmarks and offline runs.
+Run from the backend directory: python scripts/mock_openai_server.py [--port 8765] [--latency 0.2]
+then start the app with OPENAI_BASE_URL=http://127.0.0.1:8765/v1 OPENAI_API_KEY=mock.
+
+Serves /v1/chat/completions (node-metadata shaped JSON, or a filled-in instance of the request's
+json_schema response_format), /v1/audio/speech (silent MP3 frames) and /v1/audio/transcriptions
+(verbose_json: one numbered sentence per 5 s of the upload, timed from its WAV header or size).
+Every response sleeps --latency seconds (+/- --jitter) to model network and model time;
+--error-rate returns that fraction of requests as 503s, --truncate-rate cuts that fraction of chat
+replies in half with finish_reason "length".
+"""
+import argparse
+import importlib
+import io
+import json
+import os
+import random
+import threading
+import time
+import wave
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# one MPEG-1 layer III frame header + padding; players treat it as a sliver of silence
+_SILENT_MP3_FRAME = b"\xff\xfb\x90\x64" + b"\x00" * 413
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+    disable_nagle_algorithm = True  # headers and body go out in separate writes
+    latency = 0.2
+    jitter = 0.0
+    error_rate = 0.0
+    truncate_rate = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        delay = self.latency + random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+        if self.error_rate and random.random() < self.error_rate:
+            self._send(503, {"error": {"message": "mock overload", "type": "server_error"}})
+            return
+        path = self.path.split("?", 1)[0]
+        if path.endswith("/chat/completions"):
+            self._send(200, self._chat(raw))
+        elif path.endswith("/audio/speech"):
+            self._send(200, _SILENT_MP3_FRAME * 24, content_type="audio/mpeg")
+        elif path.endswith("/audio/transcriptions"):
+            self._send(200, _transcription(raw))
+        else:
+            self._send(404, {"error": {"message": f"no mock for {path}", "type": "invalid_request_error"}})
+
+    def _chat(self, raw):
+        try:
+            req = json.loads(raw or b"{}")
+        except ValueError:
+            req = {}
+        messages = req.get("messages") or []
+        user = ""
+        for m in messages:
+            if m.get("role") == "user" and isinstance(m.get("content"), str):
+                user = m["content"]
+        lines = [l.strip() for l in user.splitlines() if l.strip()]
+        title = (lines[0][:80] if lines else "Mock note").removeprefix("Section: ")
+        fmt = req.get("response_format") or {}
+        schema = (fmt.get("json_schema") or {}).get("schema") if fmt.get("type") == "json_schema" else None
+        if schema and fmt["json_schema"].get("name") != "node_metadata":
+            content = json.dumps(_instance(schema, "", title, user))
+        else:
+            content = json.dumps({
+                "title": title,
+                "summary": " ".join(lines[1:3])[:300] or "Mock summary.",
+                "concepts": sorted({w.lower() for w in user.split() if len(w) > 7})[:5],
+            })
+        finish = "stop"
+        if self.truncate_rate and random.random() < self.truncate_rate:
+            content, finish = content[: len(content) // 2], "length"
+        prompt_tokens = sum(len(str(m.get("content") or "")) for m in messages) // 4
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": req.get("model") or "gpt-4o-mini",
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": finish}
+            ],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 60, "total_tokens": prompt_tokens + 60},
+        }
+
+
+def _transcription(raw):
+    if b"verbose_json" not in raw:
+        return {"text": "This is a mock transcription."}
+    duration = len(raw) / 4000
+    at = raw.find(b"RIFF")
+    if at >= 0:
+        try:
+            with wave.open(io.BytesIO(raw[at:])) as w:
+                duration = w.getnframes() / w.getframerate()
+        except (wave.Error, EOFError):
+            pass
+    segments = []
+    t = 0.0
+    while t < duration:
+        end = min(duration, t + 5)
+        segments.append({"id": len(segments), "start": t, "end": end, "text": f" Mock sentence {len(segments) + 1}."})
+        t = end
+    return {
+        "task": "transcribe",
+        "language": "english",
+        "duration": duration,
+        "text": "".join(s["text"] for s in segments).strip(),
+        "segments": segments,
+    }
+
+
+def _instance(schema, key, title, user):
+    """Smallest plausible value for a strict json_schema: nullable -> null, one item per array."""
+    type_ = schema.get("type")
+    if isinstance(type_, list):
+        return None if "null" in type_ else _instance({**schema, "type": type_[0]}, key, title, user)
+    if type_ == "object":
+        return {k: _instance(v, k, title, user) for k, v in schema.get("properties", {}).items()}
+    if type_ == "array":
+        return [_instance(schema.get("items") or {}, key, title, user)]
+    if type_ in ("number", "integer"):
+        return 0.9
+    if type_ == "boolean":
+        return True
+    if schema.get("enum"):
+        return schema["enum"][0]
+    if key == "due_at":
+        return (datetime.now(timezone.utc) + timedelta(days=14)).strftime("%Y-%m-%dT23:59:00Z")
+    if key == "markdown":
+        return user
+    return title if "title" in key else "mock"
+
+
+class _MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # benchmarks open a lot of sockets at once
+
+
+def serve(host="127.0.0.1", port=0, latency=0.2, jitter=0.0, error_rate=0.0, truncate_rate=0.0):
+    """Start the mock on a daemon thread; returns (server, base_url). server.shutdown() stops it."""
+    handler = type(
+        "Handler",
+        (MockOpenAIHandler,),
+        {"latency": latency, "jitter": jitter, "error_rate": error_rate, "truncate_rate": truncate_rate},
+    )
+    server = _MockServer((host, port), handler)
+    threading.Thread(target=server.serve_forever, name="mock-openai", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def point_backend_at(base_url, governor=False):
+    """Route this process's OpenAI calls to the mock. Call before the first API request.
+
+    app.config loads backend/.env with override=True, so import it first or a real key there
+    would win over ours.
+    """
+    importlib.import_module("app.config")  # for its side effect: loads backend/.env
+
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ["OPENAI_API_KEY"] = "mock"
+    if not governor:
+        # measure the client / pipeline, not our own rate limits
+        os.environ["ATLUS_OPENAI_GOVERNOR"] = "0"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--truncate-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    server, url = serve(args.host, args.port, args.latency, args.jitter, args.error_rate, args.truncate_rate)
+    print(f"mock OpenAI listening on {url}  (latency {args.latency}s)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,4 @@
+"""Production entry point: `gunicorn wsgi:app` from backend/ (settings in gunicorn.conf.py). run.py is the dev server."""
+from app import create_app
+
+app = create_app()
@@ -49,8 +49,8 @@ export async function api(path, options = {}) {
   return data;
 }
 
-// text -> mp3 from backend tts
-export async function apiAudioTts(text, voice = 'alloy', signal) {
+// tts request; throws on http errors, returns the (streaming) response
+async function ttsResponse(text, voice, signal) {
   const token = localStorage.getItem('access_token');
   const headers = { 'Content-Type': 'application/json' };
   if (token) headers.Authorization = `Bearer ${token}`;
@@ -81,9 +81,63 @@ export async function apiAudioTts(text, voice = 'alloy', signal) {
     }
     throw new Error(msg);
   }
+  return res;
+}
+
+// text -> mp3 from backend tts
+export async function apiAudioTts(text, voice = 'alloy', signal) {
+  const res = await ttsResponse(text, voice, signal);
   return res.blob();
 }
 
+// voice + text -> cached clip url from an earlier /audio/tts (plain file, seekable with ranges)
+const ttsClips = new Map();
+
+// text -> url an <audio> can play. replays use the cached clip; long replies stream in segments,
+// so feed them through MediaSource and start playing on the first one (blob url where unsupported)
+export async function apiAudioTtsUrl(text, voice = 'alloy', signal) {
+  const clipKey = `${voice}\n${text}`;
+  const clipUrl = ttsClips.get(clipKey);
+  if (clipUrl) {
+    const head = await fetch(clipUrl, { method: 'HEAD', signal }).catch(() => null);
+    if (head && head.ok) return clipUrl;
+    ttsClips.delete(clipKey);
+  }
+  const res = await ttsResponse(text, voice, signal);
+  // signed + expiring; once it stops answering the HEAD above we ask /audio/tts again (cached, no API call)
+  const clipPath = res.headers.get('X-TTS-Clip-Url');
+  if (clipPath) {
+    if (ttsClips.size >= 50) ttsClips.delete(ttsClips.keys().next().value);
+    ttsClips.set(clipKey, `${API_URL}${clipPath}`);
+  }
+  const MS = typeof window !== 'undefined' ? window.MediaSource : undefined;
+  if (!res.body || !MS || !MS.isTypeSupported('audio/mpeg')) {
+    return URL.createObjectURL(await res.blob());
+  }
+  const media = new MS();
+  const url = URL.createObjectURL(media);
+  media.addEventListener(
+    'sourceopen',
+    async () => {
+      const buffer = media.addSourceBuffer('audio/mpeg');
+      const reader = res.body.getReader();
+      try {
+        for (;;) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          buffer.appendBuffer(value);
+          await new Promise((resolve) => buffer.addEventListener('updateend', resolve, { once: true }));
+        }
+        if (media.readyState === 'open') media.endOfStream();
+      } catch {
+        if (media.readyState === 'open') media.endOfStream('network');
+      }
+    },
+    { once: true }
+  );
+  return url;
+}
+
 // send audio recording, get back json w text
 export async function apiAudioTranscribe(blob) {
   const token = localStorage.getItem('access_token');
@@ -190,3 +244,81 @@ export function apiUploadWithProgress(path, fields = {}, files = [], onProgress
     xhr.send(form);
   });
 }
+
+// big files: resumable upload in byte ranges (POST /api/uploads, PUT ranges, finalize) -> upload_id
+// to pass as upload_ids to /api/brain/ingest etc. a failed range is retried; after a reload the
+// same file picks its session back up (localStorage) and only sends what the server doesnt have yet
+const RESUMABLE_KEY = 'atlus_resumable_uploads';
+
+function savedUploads() {
+  try {
+    return JSON.parse(localStorage.getItem(RESUMABLE_KEY) || '{}');
+  } catch {
+    return {};
+  }
+}
+
+function rememberUpload(key, uploadId) {
+  const all = savedUploads();
+  if (uploadId) all[key] = uploadId;
+  else delete all[key];
+  localStorage.setItem(RESUMABLE_KEY, JSON.stringify(all));
+}
+
+async function sha256Hex(blob) {
+  if (!window.crypto?.subtle) return null; // plain http on a LAN ip - server just skips the chunk check
+  const digest = await window.crypto.subtle.digest('SHA-256', await blob.arrayBuffer());
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+}
+
+async function putRange(uploadId, file, start, end) {
+  const blob = file.slice(start, end);
+  const headers = {
+    'Content-Type': 'application/octet-stream',
+    'Content-Range': `bytes ${start}-${end - 1}/${file.size}`,
+  };
+  const digest = await sha256Hex(blob);
+  if (digest) headers['X-Chunk-SHA256'] = digest;
+  return api(`/api/uploads/${uploadId}`, { method: 'PUT', headers, body: blob });
+}
+
+export async function apiResumableUpload(file, onProgress = null) {
+  const key = `${file.name}:${file.size}:${file.lastModified}`;
+  const saved = savedUploads()[key];
+  let state = saved ? await api(`/api/uploads/${saved}`).catch(() => null) : null;
+  if (!state) {
+    state = await api('/api/uploads', {
+      method: 'POST',
+      body: JSON.stringify({ filename: file.name, size: file.size }),
+    });
+    rememberUpload(key, state.upload_id);
+  }
+  const uploadId = state.upload_id;
+  if (!state.ready) {
+    const chunk = state.chunk_size || 8 * 1024 * 1024;
+    const have = (start, end) => (state.received || []).some(([a, b]) => a <= start && end <= b);
+    for (let start = 0; start < file.size; start += chunk) {
+      const end = Math.min(file.size, start + chunk);
+      if (have(start, end)) continue;
+      for (let attempt = 0; ; attempt += 1) {
+        try {
+          state = await putRange(uploadId, file, start, end);
+          break;
+        } catch (err) {
+          // network drop / 5xx / 422 (chunk checksum) -> send the range again; other 4xx are final
+          if ((err.status && err.status < 500 && err.status !== 422) || attempt >= 4) throw err;
+          await new Promise((r) => setTimeout(r, 1000 * 2 ** attempt));
+        }
+      }
+      if (onProgress) onProgress(Math.round((state.bytes_received / file.size) * 100));
+    }
+    try {
+      state = await api(`/api/uploads/${uploadId}/finalize`, { method: 'POST', body: '{}' });
+    } catch (err) {
+      rememberUpload(key, null); // checksum mismatch drops the session: next try starts over
+      throw err;
+    }
+  }
+  rememberUpload(key, null);
+  return uploadId;
+}
@@ -1,7 +1,7 @@
 import { useCallback, useEffect, useRef, useState } from 'react';
 import ReactMarkdown from 'react-markdown';
 import { useMeSummary, useClassesAssistant } from '../../api/brainQueries';
-import { apiAudioTts, apiAudioTranscribe } from '../../api/client';
+import { apiAudioTtsUrl, apiAudioTranscribe } from '../../api/client';
 
 const UI_MODEL_KEY = 'atlus_assistant_ui_model';
 const TTS_VOICE_KEY = 'atlus_assistant_tts_voice';
@@ -250,12 +250,12 @@ export default function ClassAssistantChat({ embedded = false }) {
       ttsAbortRef.current = ttsAc;
       setAssistantOutputActive(true);
       try {
-        const blob = await apiAudioTts(text, ttsVoice, ttsAc.signal);
+        const url = await apiAudioTtsUrl(text, ttsVoice, ttsAc.signal);
         if (ttsAc.signal.aborted) {
+          URL.revokeObjectURL(url);
           setAssistantOutputActive(false);
           return;
         }
-        const url = URL.createObjectURL(blob);
         const audio = new Audio(url);
         audioRef.current = audio;
         audio.onended = () => {
@@ -55,7 +55,9 @@ export default function HandwrittenSplitEditor({ classId, sourceFileId, filename
     setErr(null);
     (async () => {
       try {
-        const res = await fetch(`${API_URL}/api/brain/${classId}/sources/${sourceFileId}/file`, {
+        // photos come back as a ~1280px webp render instead of the full-resolution upload
+        const variant = fileType === 'image' ? '?variant=preview' : '';
+        const res = await fetch(`${API_URL}/api/brain/${classId}/sources/${sourceFileId}/file${variant}`, {
           headers: token ? { Authorization: `Bearer ${token}` } : {},
         });
         if (!res.ok) {
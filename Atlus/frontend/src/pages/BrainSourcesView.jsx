@@ -6,7 +6,22 @@ import { useBrains, useBrainSources, useDeleteSource } from '../api/brainQueries
 
 const API_URL = import.meta.env.VITE_API_URL ?? '';
 
-function useAuthFileUrl(classId, sourceId, enabled, sourceFileType) {
+async function fetchSourceBlob(classId, sourceId, sourceFileType, variant) {
+  const token = localStorage.getItem('access_token');
+  const query = variant ? `?variant=${variant}` : '';
+  const res = await fetch(`${API_URL}/api/brain/${classId}/sources/${sourceId}/file${query}`, {
+    headers: token ? { Authorization: `Bearer ${token}` } : {},
+  });
+  if (!res.ok) throw new Error('Could not load file');
+  const buf = await res.arrayBuffer();
+  const ct = (res.headers.get('content-type') || '').toLowerCase();
+  return ct.includes('pdf') || sourceFileType === 'pdf'
+    ? new Blob([buf], { type: 'application/pdf' })
+    : new Blob([buf], { type: ct && !ct.includes('octet-stream') ? ct : 'application/octet-stream' });
+}
+
+// variant 'preview' = the server's downscaled image; the original only loads on "Open original"
+function useAuthFileUrl(classId, sourceId, enabled, sourceFileType, variant) {
   const [url, setUrl] = useState(null);
   const [err, setErr] = useState(null);
   const [loading, setLoading] = useState(false);
@@ -17,24 +32,14 @@ function useAuthFileUrl(classId, sourceId, enabled, sourceFileType) {
       setErr(null);
       return;
     }
-    const token = localStorage.getItem('access_token');
     let revoked = false;
     let objectUrl = null;
     setLoading(true);
     setErr(null);
     (async () => {
       try {
-        const res = await fetch(`${API_URL}/api/brain/${classId}/sources/${sourceId}/file`, {
-          headers: token ? { Authorization: `Bearer ${token}` } : {},
-        });
-        if (!res.ok) throw new Error('Could not load file');
-        const buf = await res.arrayBuffer();
+        const blob = await fetchSourceBlob(classId, sourceId, sourceFileType, variant);
         if (revoked) return;
-        const ct = (res.headers.get('content-type') || '').toLowerCase();
-        const blob =
-          ct.includes('pdf') || sourceFileType === 'pdf'
-            ? new Blob([buf], { type: 'application/pdf' })
-            : new Blob([buf], { type: ct && !ct.includes('octet-stream') ? ct : 'application/octet-stream' });
         objectUrl = URL.createObjectURL(blob);
         setUrl(objectUrl);
       } catch (e) {
@@ -47,7 +52,7 @@ function useAuthFileUrl(classId, sourceId, enabled, sourceFileType) {
       revoked = true;
       if (objectUrl) URL.revokeObjectURL(objectUrl);
     };
-  }, [classId, sourceId, enabled, sourceFileType]);
+  }, [classId, sourceId, enabled, sourceFileType, variant]);
 
   return { url, err, loading };
 }
@@ -69,7 +74,8 @@ export default function BrainSourcesView() {
     classId,
     open,
     !!open && !!preview?.has_file,
-    preview?.file_type
+    preview?.file_type,
+    isImage ? 'preview' : undefined
   );
 
   const handleView = (s) => {
@@ -80,9 +86,26 @@ export default function BrainSourcesView() {
     setPreview(s);
   };
 
-  const openInNewTab = () => {
+  const openInNewTab = async () => {
     if (!url) return;
-    window.open(url, '_blank', 'noopener,noreferrer');
+    if (!isImage) {
+      window.open(url, '_blank', 'noopener,noreferrer');
+      return;
+    }
+    // open the tab during the click (popup blockers), then point it at the full-size file
+    const tab = window.open('', '_blank');
+    try {
+      const blob = await fetchSourceBlob(classId, preview.id, preview.file_type);
+      const original = URL.createObjectURL(blob);
+      if (tab) {
+        tab.opener = null;
+        tab.location.href = original;
+      }
+      setTimeout(() => URL.revokeObjectURL(original), 60000);
+    } catch (e) {
+      if (tab) tab.close();
+      window.alert(e.message || 'Could not load file');
+    }
   };
 
   return (
@@ -204,7 +227,7 @@ export default function BrainSourcesView() {
               <div className="flex gap-2 shrink-0 items-center">
                 {(isPdf || isImage) && url ? (
                   <button type="button" onClick={openInNewTab} className="text-link" style={{ fontSize: '0.75rem' }}>
-                    Open in new tab
+                    {isImage ? 'Open original' : 'Open in new tab'}
                   </button>
                 ) : null}
                 <button type="button" onClick={() => setPreview(null)} className="text-link">
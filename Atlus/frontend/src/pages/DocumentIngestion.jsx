@@ -1,14 +1,18 @@
 import { useState, useEffect } from 'react';
 import { Link, useSearchParams } from 'react-router-dom';
 import TopBar from '../components/home/TopBar';
-import { api, apiUpload } from '../api/client';
+import { api, apiResumableUpload, apiUpload } from '../api/client';
 import { useUploadSyllabus } from '../api/brainQueries';
 
 const ALLOWED_EXT = [
   '.pdf', '.docx', '.pptx', '.txt', '.md', '.markdown',
   '.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff',
+  '.mp3', '.m4a', '.wav', '.webm', '.ogg', '.oga', '.flac', '.mp4', '.mpeg', '.mpga',
 ];
 
+// bigger than this goes up in resumable ranges first (a dropped connection doesnt restart a 300 MB file)
+const RESUMABLE_BYTES = 16 * 1024 * 1024;
+
 function isDocument(file) {
   const ext = '.' + (file.name?.split('.').pop() || '').toLowerCase();
   return ALLOWED_EXT.includes(ext);
@@ -85,7 +89,18 @@ export default function DocumentIngestion() {
     }
     setIngesting(true);
     try {
-      const result = await apiUpload('/api/brain/ingest', { brain_id: selectedClassId }, files);
+      const uploadIds = [];
+      for (const f of files.filter((x) => x.size > RESUMABLE_BYTES)) {
+        setMessage({ info: `Uploading ${f.name}…` });
+        uploadIds.push(
+          await apiResumableUpload(f, (pct) => setMessage({ info: `Uploading ${f.name}… ${pct}%` })),
+        );
+      }
+      const result = await apiUpload(
+        '/api/brain/ingest',
+        { brain_id: selectedClassId, upload_ids: uploadIds.join(',') },
+        files.filter((x) => x.size <= RESUMABLE_BYTES),
+      );
       const nodes = result?.nodes_created ?? 0;
       const errors = result?.errors ?? [];
       const errText = errors.length ? errors.join(' ') : '';
@@ -200,12 +215,12 @@ export default function DocumentIngestion() {
             style={dropStyle}
           >
             <p style={{ color: 'rgb(var(--muted))', marginBottom: '1rem' }}>
-              Drag and drop here, or browse — includes PDFs, Office docs, Markdown/text, and photos (JPG, PNG, …) for OCR.
+              Drag and drop here, or browse — includes PDFs, Office docs, Markdown/text, photos (JPG, PNG, …) for OCR, and lecture recordings (MP3, M4A, WAV, …) for transcription.
             </p>
             <input
               type="file"
               multiple
-              accept=".pdf,.docx,.pptx,.txt,.md,.markdown,.jpg,.jpeg,.png,.webp,.gif,.bmp,.tif,.tiff"
+              accept=".pdf,.docx,.pptx,.txt,.md,.markdown,.jpg,.jpeg,.png,.webp,.gif,.bmp,.tif,.tiff,.mp3,.m4a,.wav,.webm,.ogg,.oga,.flac,.mp4,.mpeg,.mpga"
               onChange={handleFileSelect}
               style={{ display: 'none' }}
               id="file-input"